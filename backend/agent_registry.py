@@ -0,0 +1,219 @@
+import asyncio
+import importlib
+import logging
+import os
+import tempfile
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# builder(helper, agent_definition, logs_dir) -> agent
+AgentBuilder = Callable[[Any, dict, str], Awaitable[Any]]
+
+
+class AgentTypeRegistry:
+    """Maps team agent definitions to the code that builds them.
+
+    A builder is registered for an agent ``type`` (``Custom``, ``RAG``, ...)
+    or for a ``type`` and ``name`` pair (the built-in MagenticOne agents).
+    Builders import their agent classes and heavy dependencies (Playwright,
+    Docker, faiss, Azure SDKs) inside the function, so importing the backend
+    only pays for the agent types a team actually uses.
+
+    Extra agent types can be added without touching the backend: modules
+    listed in AGENT_TYPE_PLUGINS (comma-separated) are imported on the first
+    lookup and call ``register`` themselves.
+    """
+
+    def __init__(self, plugin_modules: Optional[List[str]] = None):
+        self._builders: Dict[Tuple[str, Optional[str]], AgentBuilder] = {}
+        self._plugin_modules = plugin_modules or []
+        self._plugins_loaded = False
+
+    def register(self, agent_type: str, name: Optional[str] = None):
+        def decorator(builder: AgentBuilder) -> AgentBuilder:
+            self._builders[(agent_type, name)] = builder
+            return builder
+        return decorator
+
+    def _load_plugins(self) -> None:
+        if self._plugins_loaded:
+            return
+        self._plugins_loaded = True
+        for module_name in self._plugin_modules:
+            try:
+                importlib.import_module(module_name)
+            except Exception as e:
+                logging.getLogger("agent_registry").error(f"Could not load agent plugin '{module_name}': {e}")
+
+    def get(self, agent_type: str, name: Optional[str] = None) -> Optional[AgentBuilder]:
+        self._load_plugins()
+        return self._builders.get((agent_type, name)) or self._builders.get((agent_type, None))
+
+    def types(self) -> List[str]:
+        self._load_plugins()
+        return sorted(f"{t}:{n}" if n else t for t, n in self._builders)
+
+    async def build(self, helper, agent: dict, logs_dir: str):
+        builder = self.get(agent["type"], agent.get("name"))
+        if builder is None:
+            raise ValueError('Unknown Agent!')
+        return await builder(helper, agent, logs_dir)
+
+
+_registry: Optional[AgentTypeRegistry] = None
+
+
+def get_agent_registry() -> AgentTypeRegistry:
+    global _registry
+    if _registry is None:
+        plugins = [m.strip() for m in os.getenv("AGENT_TYPE_PLUGINS", "").split(",") if m.strip()]
+        _registry = AgentTypeRegistry(plugins)
+        _register_builtin_types(_registry)
+    return _registry
+
+
+def _load_rag_docs() -> List[str]:
+    """Documents for the local faiss index of RAG agents."""
+    docs_dir = os.environ.get(
+        "RAG_DOCS_PATH",
+        os.path.join(os.path.dirname(__file__), "data", "ai-search-index"),
+    )
+    docs: List[str] = []
+    if os.path.isdir(docs_dir):
+        for root, _, files in os.walk(docs_dir):
+            for fname in files:
+                file_path = os.path.join(root, fname)
+                try:
+                    with open(file_path, "r", encoding="utf-8") as f:
+                        docs.append(f.read())
+                except Exception:
+                    try:
+                        with open(file_path, "rb") as f:
+                            docs.append(f.read().decode("utf-8", errors="ignore"))
+                    except Exception:
+                        pass
+    return docs
+
+
+def _register_builtin_types(registry: AgentTypeRegistry) -> None:
+
+    # This is default MagenticOne agent - Coder
+    @registry.register("MagenticOne", "Coder")
+    async def build_coder(helper, agent, logs_dir):
+        from autogen_ext.agents.magentic_one import MagenticOneCoderAgent
+
+        coder_client = helper._build_client(agent_name="Coder", agent_type="MagenticOne")
+        return MagenticOneCoderAgent("Coder", model_client=coder_client)
+
+    # This is default MagenticOne agent - Executor
+    @registry.register("MagenticOne", "Executor")
+    async def build_executor(helper, agent, logs_dir):
+        from autogen_agentchat.agents import CodeExecutorAgent
+
+        # handle local = local docker execution
+        if helper.run_locally:
+            from code_executor_pool import executor_pool_enabled, get_executor_pool
+
+            # docker - lease a warm container from the shared pool
+            if executor_pool_enabled():
+                code_executor = await get_executor_pool().acquire(helper.session_id)
+                helper._leased_executor = True
+            else:
+                from autogen_ext.code_executors.docker import DockerCommandLineCodeExecutor
+
+                code_executor = DockerCommandLineCodeExecutor(work_dir=logs_dir)
+                await code_executor.start()
+
+        # or remote = Azure ACA Dynamic Sessions execution
+        else:
+            from autogen_ext.code_executors.azure import ACADynamicSessionsCodeExecutor
+            from magentic_one_helper import get_azure_credential
+
+            pool_endpoint = os.getenv("POOL_MANAGEMENT_ENDPOINT")
+            assert pool_endpoint, "POOL_MANAGEMENT_ENDPOINT environment variable is not set"
+            with tempfile.TemporaryDirectory() as temp_dir:# Define the correct path to the data folder for file access
+                code_executor = ACADynamicSessionsCodeExecutor(
+                    pool_management_endpoint=pool_endpoint,
+                    credential=get_azure_credential(),
+                    work_dir=temp_dir
+                )
+        try:
+            executor_client = helper._build_client(agent_name="Executor", agent_type="MagenticOne")
+            return CodeExecutorAgent("Executor", code_executor=code_executor, model_client=executor_client)
+        except Exception:
+            # the session never gets the agent: give the container back to the pool
+            if helper._leased_executor:
+                helper._leased_executor = False
+                await get_executor_pool().release(helper.session_id)
+            raise
+
+    # This is default MagenticOne agent - WebSurfer
+    @registry.register("MagenticOne", "WebSurfer")
+    async def build_web_surfer(helper, agent, logs_dir):
+        from browser_pool import browser_pool_enabled, get_browser_pool
+
+        web_client = helper._build_client(agent_name="WebSurfer", agent_type="MagenticOne")
+        if browser_pool_enabled():
+            # browse in a context of the shared browser pool, closed when the session ends
+            from magentic_one_pooled_web_surfer import PooledMultimodalWebSurfer
+
+            helper._uses_browser_pool = True
+            return PooledMultimodalWebSurfer("WebSurfer", web_client, get_browser_pool(), helper.session_id)
+        from autogen_ext.agents.web_surfer import MultimodalWebSurfer
+
+        return MultimodalWebSurfer("WebSurfer", model_client=web_client)
+
+    # This is default MagenticOne agent - FileSurfer
+    @registry.register("MagenticOne", "FileSurfer")
+    async def build_file_surfer(helper, agent, logs_dir):
+        from autogen_ext.agents.file_surfer import FileSurfer
+
+        file_client = helper._build_client(agent_name="FileSurfer", agent_type="MagenticOne")
+        file_surfer = FileSurfer("FileSurfer", model_client=file_client)
+        file_surfer._browser.set_path(os.path.join(os.getcwd(), "data"))  # Set the path to the data folder in the current working directory
+        return file_surfer
+
+    # This is custom agent - simple SYSTEM message and DESCRIPTION is used inherited from AssistantAgent
+    @registry.register("Custom")
+    async def build_custom(helper, agent, logs_dir):
+        from magentic_one_custom_agent import MagenticOneCustomAgent
+
+        custom_client = helper._build_client(agent_name=agent["name"], agent_type="Custom")
+        return MagenticOneCustomAgent(
+            agent["name"],
+            model_client=custom_client,
+            system_message=agent["system_message"],
+            description=agent["description"]
+        )
+
+    @registry.register("CustomMCP")
+    async def build_custom_mcp(helper, agent, logs_dir):
+        from magentic_one_custom_mcp_agent import MagenticOneCustomMCPAgent
+        from tool_execution import ToolLimits
+
+        custom_client = helper._build_client(agent_name=agent["name"], agent_type="CustomMCP")
+        return await MagenticOneCustomMCPAgent.create(
+            agent["name"],
+            custom_client,
+            agent["system_message"] + "\n\n in case of email use this address as TO: " + helper.user_id,
+            agent["description"],
+            helper.user_id,
+            tool_limits=ToolLimits.from_config(agent),
+        )
+
+    # This is custom agent - RAG agent - you need to specify index_name and Azure Cognitive Search service endpoint and admin key in .env file
+    @registry.register("RAG")
+    async def build_rag(helper, agent, logs_dir):
+        from magentic_one_custom_rag_agent import MagenticOneRAGAgent
+        from tool_execution import ToolLimits
+
+        rag_client = helper._build_client(agent_name=agent["name"], agent_type="RAG")
+        rag_agent = MagenticOneRAGAgent(
+            agent["name"],
+            model_client=rag_client,
+            index_name=agent["index_name"],
+            description=agent["description"],
+            tool_limits=ToolLimits.from_config(agent),
+        )
+        if os.getenv("RAG_BACKEND", "azure").lower() == "faiss":
+            await rag_agent.load_faiss_data(await asyncio.to_thread(_load_rag_docs))
+        return rag_agent
@@ -7,7 +7,8 @@ import numpy as np
 import faiss
 from fastapi import UploadFile
 
-from llm_config import build_embedding_client, LITELLM_EMBED_MODEL
+from embedding_batcher import get_embedding_batcher
+from llm_config import LITELLM_EMBED_MODEL
 
 EMBEDDING_MODEL_NAME = LITELLM_EMBED_MODEL
 
@@ -30,9 +31,7 @@ async def process_upload_and_index(index_name: str, upload_files: List[UploadFil
         except Exception:
             docs.append(content.decode("utf-8", errors="ignore"))
 
-    embedding_client = build_embedding_client()
-    response = embedding_client.embeddings.create(input=docs, model=EMBEDDING_MODEL_NAME)
-    embeddings = np.array([d.embedding for d in response.data])
+    embeddings = np.array(await get_embedding_batcher().embed(docs, EMBEDDING_MODEL_NAME))
     index = faiss.IndexFlatL2(embeddings.shape[1])
     index.add(embeddings)
 
@@ -0,0 +1,317 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import signal
+import sys
+import time
+import uuid
+from typing import Dict, List, Optional
+
+# autogenbench subsamples scenario lines with this seed
+_SUBSAMPLE_SEED = 425
+
+
+def _plan(scenario: str, repeats: int, subsample: Optional[float]) -> List[dict]:
+    """Repetitions to run for a scenario file or folder, in the order ``autogenbench run`` runs them."""
+    if os.path.isfile(scenario):
+        files = [scenario]
+    elif os.path.isdir(scenario):
+        files = [
+            os.path.join(scenario, f) for f in os.listdir(scenario)
+            if f.lower().endswith(".jsonl") and os.path.isfile(os.path.join(scenario, f))
+        ]
+    else:
+        raise FileNotFoundError(f"Scenario not found: {scenario}")
+
+    rng = random.Random(_SUBSAMPLE_SEED)
+    units = []
+    for scenario_file in files:
+        scenario_name = os.path.basename(scenario_file).rsplit(".", 1)[0]
+        scenario_dir = os.path.dirname(os.path.realpath(scenario_file))
+        with open(scenario_file, "rt") as f:
+            lines = [line for line in f if line.strip()]
+        if subsample is not None:
+            # a proportion below 1, otherwise a count
+            n = int(len(lines) * subsample + 0.5) if 0 <= subsample < 1 else int(subsample)
+            lines = rng.sample(lines, max(0, min(n, len(lines))))
+        for line in lines:
+            instance = json.loads(line)
+            for repeat in range(repeats):
+                units.append({
+                    "scenario_dir": scenario_dir,
+                    "scenario_name": scenario_name,
+                    "instance": instance,
+                    "repeat": repeat,
+                })
+    return units
+
+
+def _score(path: str) -> Optional[bool]:
+    from autogenbench.tabulate_cmd import default_scorer
+
+    return default_scorer(path)
+
+
+def _kill(process: asyncio.subprocess.Process, sig: int = signal.SIGTERM) -> None:
+    # the repetition runs in its own session: signal run.sh and the scenario too
+    try:
+        os.killpg(process.pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+class BenchJob:
+    def __init__(self, scenario: str, config: Optional[str], results_dir: str, repeats: int, parallel: int,
+                 subsample: Optional[float], units: List[dict]):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.scenario = scenario
+        self.config = config
+        self.results_dir = results_dir
+        self.repeats = repeats
+        self.parallel = parallel
+        self.subsample = subsample
+        self.units = units
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.results: List[dict] = []
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    def to_dict(self, results: bool = True) -> dict:
+        data = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "scenario": self.scenario,
+            "results_dir": self.results_dir,
+            "repeats": self.repeats,
+            "parallel": self.parallel,
+            "subsample": self.subsample,
+            "total": len(self.units),
+            "done": len(self.results),
+            "succeeded": sum(1 for r in self.results if r.get("success")),
+            "errors": sum(1 for r in self.results if r["status"] == "error"),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if results:
+            data["results"] = list(self.results)
+        return data
+
+
+class BenchJobRunner:
+    """Runs AutoGenBench scenarios as background jobs.
+
+    Each repetition of a scenario instance runs in its own worker process
+    (``autogenbench`` changes the working directory and blocks on the
+    scenario's output, so it cannot share the API process), at most
+    ``max_processes`` at a time over all jobs and ``parallel`` per job.
+    Results are written by autogenbench into ``results_dir`` as each
+    repetition finishes, and the job record (status, per-repetition outcome)
+    is saved to ``jobs_dir`` after each one. Cancelling a job kills its
+    running repetitions and removes their partial result folders, so a
+    later run repeats them instead of skipping them.
+
+    Tabulations of a results folder are cached until a job of this runner
+    adds results to it.
+    """
+
+    def __init__(self, max_processes: int = 2, default_parallel: int = 2, jobs_dir: str = "./data/bench_jobs"):
+        self.max_processes = max(1, max_processes)
+        self.default_parallel = max(1, default_parallel)
+        self.jobs_dir = jobs_dir
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._jobs: Dict[str, BenchJob] = {}
+        self._versions: Dict[str, int] = {}
+        self._tables: Dict[str, tuple] = {}
+
+    async def submit(self, scenario: str, config: Optional[str] = None, results_dir: str = "bench_results",
+                     repeats: int = 1, parallel: Optional[int] = None, subsample: Optional[float] = None) -> BenchJob:
+        units = await asyncio.to_thread(_plan, scenario, repeats, subsample)
+        parallel = min(parallel or self.default_parallel, self.max_processes)
+        job = BenchJob(scenario, config, results_dir, repeats, max(1, parallel), subsample, units)
+        self._jobs[job.job_id] = job
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_processes)
+        job._task = asyncio.create_task(self._run(job))
+        return job
+
+    def get(self, job_id: str) -> Optional[BenchJob]:
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> List[BenchJob]:
+        return sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> Optional[BenchJob]:
+        job = self._jobs.get(job_id)
+        if job is not None and not job.finished and job.status != "cancelling":
+            job._task.cancel()
+            if job.status == "running":
+                # "cancelled" once its worker processes are gone
+                job.status = "cancelling"
+            else:
+                # its task never starts, so _run does not finish and save it
+                job.status = "cancelled"
+                job.finished_at = time.time()
+                self._save(job)
+        return job
+
+    async def _run(self, job: BenchJob) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        per_job = asyncio.Semaphore(job.parallel)
+
+        async def run_unit(unit: dict):
+            async with per_job, self._slots:
+                result = await self._run_unit(job, unit)
+            job.results.append(result)
+            self._invalidate(job, unit)
+            self._save(job)
+
+        tasks = [asyncio.create_task(run_unit(unit)) for unit in job.units]
+        try:
+            await asyncio.gather(*tasks)
+            job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            logging.getLogger("bench_jobs").exception(f"Benchmark job {job.job_id} failed")
+            job.status = "failed"
+            job.error = str(e)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            job.finished_at = time.time()
+            self._save(job)
+
+    async def _run_unit(self, job: BenchJob, unit: dict) -> dict:
+        path = os.path.join(job.results_dir, unit["scenario_name"], unit["instance"]["id"], str(unit["repeat"]))
+        result = {
+            "scenario": unit["scenario_name"],
+            "instance": unit["instance"]["id"],
+            "repeat": unit["repeat"],
+            "path": path,
+        }
+        if os.path.isdir(path):
+            # like autogenbench: results that are already there are kept, not re-run
+            result.update(status="skipped", success=await asyncio.to_thread(_score, path))
+            return result
+
+        started = time.monotonic()
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__), "run",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
+        request = dict(unit, path=path, config=job.config)
+        try:
+            _, stderr = await process.communicate(json.dumps(request).encode("utf-8"))
+        except asyncio.CancelledError:
+            _kill(process)
+            try:
+                await asyncio.wait_for(process.wait(), 10)
+            except asyncio.TimeoutError:
+                _kill(process, signal.SIGKILL)
+                await process.wait()
+            await asyncio.to_thread(shutil.rmtree, path, True)
+            raise
+        result["duration"] = round(time.monotonic() - started, 2)
+        if process.returncode == 0:
+            result.update(status="done", success=await asyncio.to_thread(_score, path))
+        else:
+            result.update(status="error", success=False,
+                          error=stderr.decode("utf-8", "replace")[-2000:] or f"exit code {process.returncode}")
+        return result
+
+    def _invalidate(self, job: BenchJob, unit: dict) -> None:
+        # tabulate is pointed at either the results folder or one scenario inside it
+        for path in (job.results_dir, os.path.join(job.results_dir, unit["scenario_name"])):
+            key = os.path.abspath(path)
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+    def _save(self, job: BenchJob) -> None:
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        path = os.path.join(self.jobs_dir, f"{job.job_id}.json")
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(job.to_dict(), f, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+    async def tabulate(self, results_dir: str) -> dict:
+        """CSV tabulation of ``results_dir`` by ``autogenbench tabulate``, cached until new results arrive."""
+        key = os.path.abspath(results_dir)
+        version = self._versions.get(key, 0)
+        cached = self._tables.get(key)
+        if cached is not None and cached[0] == version:
+            return {"csv": cached[1], "cached": True}
+        # in a worker process: default_tabulate prints to stdout and exits on bad arguments
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__), "tabulate", results_dir,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(stderr.decode("utf-8", "replace")[-2000:] or f"exit code {process.returncode}")
+        csv = stdout.decode("utf-8")
+        self._tables[key] = (version, csv)
+        return {"csv": csv, "cached": False}
+
+    async def close(self) -> None:
+        running = [job._task for job in self._jobs.values() if not job.finished and job._task is not None]
+        for job in self._jobs.values():
+            self.cancel(job.job_id)
+        await asyncio.gather(*running, return_exceptions=True)
+
+
+_runner: Optional[BenchJobRunner] = None
+
+
+def get_bench_runner() -> BenchJobRunner:
+    global _runner
+    if _runner is None:
+        _runner = BenchJobRunner(
+            max_processes=int(os.getenv("BENCH_MAX_PROCESSES", 2)),
+            default_parallel=int(os.getenv("BENCH_PARALLEL_REPEATS", 2)),
+            jobs_dir=os.getenv("BENCH_JOBS_DIR", "./data/bench_jobs"),
+        )
+    return _runner
+
+
+async def shutdown() -> None:
+    if _runner is not None:
+        await _runner.close()
+
+
+# ---------------------------------------------------------------------------
+# Worker process
+# ---------------------------------------------------------------------------
+
+def _run_repetition(request: dict) -> None:
+    from autogen import config_list_from_json
+    from autogenbench.run_cmd import expand_scenario, get_scenario_env, run_scenario_natively
+
+    config_list = config_list_from_json(env_or_file=request["config"])
+    expand_scenario(request["scenario_dir"], request["instance"], request["path"], None)
+    run_scenario_natively(request["path"], get_scenario_env(config_list))
+
+
+if __name__ == "__main__":
+    if sys.argv[1] == "run":
+        _run_repetition(json.loads(sys.stdin.read()))
+    elif sys.argv[1] == "tabulate":
+        from autogenbench.tabulate_cmd import default_tabulate
+
+        default_tabulate(["bench", sys.argv[2], "--csv"])
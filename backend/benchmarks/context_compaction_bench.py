@@ -0,0 +1,142 @@
+"""Prompt tokens per round with and without context compaction.
+
+Replays a synthetic MagenticOne session against one agent: every round the
+orchestrator gives an instruction, the agent calls a tool that returns a
+bulky result (a CSV dump or page markdown, alternating) and answers. The
+agent resends its whole history with each request, as AssistantAgent does.
+The same history is sent through a plain client and through
+``CompactingChatCompletionClient`` (summaries written by a fake model), and
+the prompt tokens of each round's request are reported, with the prefill
+time they imply at ``--prefill-tps``.
+
+    cd backend
+    python -m benchmarks.context_compaction_bench --rounds 30
+    python -m benchmarks.context_compaction_bench --max-tokens 4000 --prefill-tps 400 --json compaction.json
+"""
+import argparse
+import asyncio
+import json
+
+from autogen_core import FunctionCall
+from autogen_core.models import (
+    AssistantMessage,
+    CreateResult,
+    FunctionExecutionResult,
+    FunctionExecutionResultMessage,
+    RequestUsage,
+    SystemMessage,
+    UserMessage,
+)
+
+from context_compaction import CompactingChatCompletionClient, ContextPolicy, estimate_tokens
+
+_WORDS = "the sensor readings of line four show rising vibration while temperature stays within the expected range".split()
+
+
+def _words(n: int, seed: int) -> str:
+    return " ".join(_WORDS[(seed + i) % len(_WORDS)] for i in range(n))
+
+
+def _csv(rows: int, seed: int) -> str:
+    return "EquipmentID,Timestamp,Temperature,Vibration,Pressure\n" + "\n".join(
+        f"EQ-{(seed + i) % 97},2025-01-{1 + i % 28:02}T{i % 24:02}:00,{20 + i % 9}.{i % 10},{i % 5}.{i % 7},{100 + i % 13}"
+        for i in range(rows)
+    )
+
+
+def _markdown(sections: int, seed: int) -> str:
+    return "\n\n".join(
+        f"## Section {i}\n\n{_words(60, seed + i)} [source](https://example.com/doc/{seed}/{i})"
+        for i in range(sections)
+    )
+
+
+class _RecordingClient:
+    """Stands in for the model: records prompt sizes and writes fixed-size summaries."""
+
+    def __init__(self, summary_words: int):
+        self.summary_words = summary_words
+        self.summaries = 0
+
+    async def create(self, messages, **kwargs) -> CreateResult:
+        self.summaries += 1
+        return CreateResult(
+            finish_reason="stop",
+            content="\n".join(f"- {_words(12, i)}" for i in range(max(1, self.summary_words // 12))),
+            usage=RequestUsage(prompt_tokens=estimate_tokens(messages), completion_tokens=self.summary_words),
+            cached=False,
+        )
+
+
+def history(rounds: int, csv_rows: int, page_sections: int):
+    """Yield the agent's prompt for each round."""
+    messages = [SystemMessage(content="You are a data analyst agent. " + _words(120, 0))]
+    for r in range(rounds):
+        messages.append(UserMessage(content=f"Step {r + 1}: {_words(40, r)}", source="MagenticOneOrchestrator"))
+        yield list(messages)
+        call = FunctionCall(id=f"call_{r}", name="data_provider" if r % 2 == 0 else "fetch_webpage",
+                            arguments=json.dumps({"query": _words(6, r)}))
+        output = _csv(csv_rows, r) if r % 2 == 0 else _markdown(page_sections, r)
+        messages.append(AssistantMessage(content=[call], source="Analyst"))
+        messages.append(FunctionExecutionResultMessage(
+            content=[FunctionExecutionResult(content=output, name=call.name, call_id=call.id, is_error=False)]
+        ))
+        messages.append(AssistantMessage(content=_words(250, r), source="Analyst"))
+
+
+async def run(args) -> dict:
+    policy = ContextPolicy(max_tokens=args.max_tokens, keep_recent=args.keep_recent,
+                           tool_output_tokens=args.tool_output_tokens, summary_tokens=args.summary_tokens)
+    model = _RecordingClient(summary_words=args.summary_tokens * 3 // 4)
+    client = CompactingChatCompletionClient(model, policy, agent_name="Analyst")
+    rows = []
+    for r, prompt in enumerate(history(args.rounds, args.csv_rows, args.page_sections), 1):
+        compacted = await client.compactor.compact(prompt)
+        rows.append({
+            "round": r,
+            "raw_tokens": estimate_tokens(prompt),
+            "compacted_tokens": estimate_tokens(compacted),
+            "summaries": model.summaries,
+        })
+    raw = sum(row["raw_tokens"] for row in rows)
+    compacted = sum(row["compacted_tokens"] for row in rows)
+    return {
+        "policy": vars(policy),
+        "rounds": rows,
+        "total_raw_tokens": raw,
+        "total_compacted_tokens": compacted,
+        "reduction": round(1 - compacted / raw, 3) if raw else 0.0,
+        "summaries": model.summaries,
+        "prefill_seconds_raw": round(raw / args.prefill_tps, 1),
+        "prefill_seconds_compacted": round(compacted / args.prefill_tps, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt tokens per round with and without context compaction")
+    parser.add_argument("--rounds", type=int, default=30)
+    parser.add_argument("--max-tokens", type=int, default=8000)
+    parser.add_argument("--keep-recent", type=int, default=6)
+    parser.add_argument("--tool-output-tokens", type=int, default=400)
+    parser.add_argument("--summary-tokens", type=int, default=500)
+    parser.add_argument("--csv-rows", type=int, default=300, help="rows of each CSV tool result")
+    parser.add_argument("--page-sections", type=int, default=30, help="sections of each page markdown result")
+    parser.add_argument("--prefill-tps", type=float, default=500.0, help="model prefill speed (tokens/s)")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(f"{'round':>5} {'raw':>9} {'compacted':>10} {'summaries':>10}")
+    for row in report["rounds"]:
+        print(f"{row['round']:>5} {row['raw_tokens']:>9} {row['compacted_tokens']:>10} {row['summaries']:>10}")
+    print(f"total prompt tokens: {report['total_raw_tokens']} raw, {report['total_compacted_tokens']} compacted "
+          f"({report['reduction']:.0%} less), {report['summaries']} summary requests")
+    print(f"prefill at {args.prefill_tps:.0f} tokens/s: {report['prefill_seconds_raw']}s raw, "
+          f"{report['prefill_seconds_compacted']}s compacted")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Throughput and latency of RAG searches with and without embedding batching.
+
+Starts the mock OpenAI-compatible server of ``benchmarks.mock_llm`` in this
+process, serving one embedding request at a time (like Ollama behind
+LiteLLM's ``max_concurrent_requests: 1``), builds a FAISS index of
+``--documents`` documents through the batcher and runs ``do_search`` of a
+``MagenticOneRAGAgent`` from 1, 10 and 100 concurrent searchers, each
+making ``--searches`` searches in a row:
+
+- ``direct``: every search sends its own embedding request (as before),
+- ``batched``: searches go through the process-wide ``EmbeddingBatcher``.
+
+Reports searches per second, p50/p99 search latency, the embedding
+requests the server received and their average size.
+
+    cd backend
+    python -m benchmarks.embedding_batch_bench
+    python -m benchmarks.embedding_batch_bench --concurrency 1,10,100 --request-latency 0.05 --json embeddings.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.load_test import _free_port, _percentile, _serve, _shutdown
+from benchmarks.mock_llm import MockScript, create_llm_app
+from embedding_batcher import EmbeddingBatcher
+
+MODES = ("direct", "batched")
+
+
+class DirectEmbeddings:
+    """One embedding request per call, off the event loop: what ``do_search`` did before the batcher."""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def embed(self, texts, model):
+        response = await asyncio.to_thread(self.client.embeddings.create, input=list(texts), model=model)
+        return [d.embedding for d in response.data]
+
+
+async def _agent(embeddings, documents, workdir: str):
+    from magentic_one_custom_rag_agent import MagenticOneRAGAgent
+
+    # Only the attributes build_faiss_index and do_search use; no chat model.
+    agent = MagenticOneRAGAgent.__new__(MagenticOneRAGAgent)
+    agent._embeddings = embeddings
+    agent.embedding_model = "mock-embed"
+    agent.faiss_index_path = os.path.join(workdir, "bench.faiss")
+    agent._faiss_pending, agent._index_build = None, None
+    await agent.build_faiss_index(documents)
+    return agent
+
+
+async def _searcher(agent, index: int, searches: int, latencies: list, errors: list) -> None:
+    for i in range(searches):
+        started = time.perf_counter()
+        result = await agent.do_search(f"searcher {index} question {i} about pump vibration")
+        latencies.append(time.perf_counter() - started)
+        errors.extend(r["error"] for r in result["faiss"] if "error" in r)
+
+
+async def run(args) -> dict:
+    from openai import OpenAI
+
+    script = MockScript(embedding_dim=args.dim, embedding_latency=args.request_latency,
+                        embedding_item_latency=args.item_latency, embedding_slots=args.server_slots)
+    port = _free_port()
+    server = await _serve(create_llm_app(script), port)
+    client = OpenAI(base_url=f"http://127.0.0.1:{port}/v1", api_key="mock", timeout=120)
+    documents = [f"Document {i}: maintenance note {i} on equipment EQ-{i % 97}." for i in range(args.documents)]
+    batcher = EmbeddingBatcher(client, max_batch=args.batch_size, max_wait=args.wait_ms / 1000)
+    report = {"settings": {k: v for k, v in vars(args).items() if k != "json"}, "runs": []}
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            started = time.perf_counter()
+            agent = await _agent(batcher, documents, workdir)
+            report["index_build_s"] = round(time.perf_counter() - started, 3)
+            for concurrency in args.concurrency:
+                for mode in args.modes:
+                    agent._embeddings = batcher if mode == "batched" else DirectEmbeddings(client)
+                    script.requests.clear()
+                    latencies, errors = [], []
+                    started = time.perf_counter()
+                    await asyncio.gather(*[_searcher(agent, i, args.searches, latencies, errors)
+                                           for i in range(concurrency)])
+                    elapsed = time.perf_counter() - started
+                    requests = script.requests["embedding"]
+                    report["runs"].append({
+                        "concurrency": concurrency,
+                        "mode": mode,
+                        "searches": len(latencies),
+                        "searches_per_s": round(len(latencies) / elapsed, 1),
+                        "p50_ms": round(_percentile(latencies, 0.5) * 1000, 1),
+                        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 1),
+                        "embedding_requests": requests,
+                        "avg_batch": round(len(latencies) / requests, 1) if requests else 0.0,
+                        "errors": len(errors),
+                    })
+    finally:
+        await _shutdown(server)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAG search throughput with and without embedding batching")
+    parser.add_argument("--concurrency", default="1,10,100", type=lambda s: [int(n) for n in s.split(",")],
+                        help="comma-separated numbers of concurrent searchers")
+    parser.add_argument("--modes", default=",".join(MODES), type=lambda s: s.split(","))
+    parser.add_argument("--searches", type=int, default=10, help="searches per searcher")
+    parser.add_argument("--documents", type=int, default=500, help="documents in the FAISS index")
+    parser.add_argument("--dim", type=int, default=384, help="embedding dimensions")
+    parser.add_argument("--request-latency", type=float, default=0.02, help="mock seconds per embedding request")
+    parser.add_argument("--item-latency", type=float, default=0.0005, help="mock seconds per embedded text")
+    parser.add_argument("--server-slots", type=int, default=1, help="embedding requests the mock serves at once")
+    parser.add_argument("--batch-size", type=int, default=64, help="EMBEDDING_BATCH_SIZE")
+    parser.add_argument("--wait-ms", type=float, default=5, help="EMBEDDING_BATCH_WAIT_MS")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(f"index of {args.documents} documents built in {report['index_build_s']}s")
+    print(f"{'searchers':>9} {'mode':<8} {'searches/s':>11} {'p50 ms':>9} {'p99 ms':>9} {'requests':>9} {'batch':>6}")
+    for row in report["runs"]:
+        print(f"{row['concurrency']:>9} {row['mode']:<8} {row['searches_per_s']:>11.1f} {row['p50_ms']:>9.1f} "
+              f"{row['p99_ms']:>9.1f} {row['embedding_requests']:>9} {row['avg_batch']:>6.1f}"
+              + (f"  errors: {row['errors']}" if row["errors"] else ""))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
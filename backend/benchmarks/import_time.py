@@ -0,0 +1,96 @@
+"""Import-time budget for backend cold start and worker respawn.
+
+Imports a module (``main`` by default) in a fresh interpreter with
+``python -X importtime``, prints the slowest imports by cumulative time and
+fails when the total is over the budget or when a dependency that must stay
+lazy (browser automation, Docker, faiss, Azure SDKs, the tracing SDK) was
+imported. ``tests/test_import_time.py`` runs the same check under pytest.
+
+    cd backend
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --module magentic_one_helper --budget-ms 1500
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "2500"))
+
+# Loaded only when a team uses the agent type (or endpoint) that needs them.
+LAZY_MODULES = (
+    "playwright",
+    "autogen_ext.agents.web_surfer",
+    "autogen_ext.agents.file_surfer",
+    "autogen_ext.code_executors.docker",
+    "autogen_ext.code_executors.azure",
+    "docker",
+    "faiss",
+    "azure.identity",
+    "azure.search",
+    "aisearch",
+    "magentic_one_custom_rag_agent",
+    "magentic_one_custom_mcp_agent",
+    "magentic_one_pooled_web_surfer",
+    "mcp_sessions",
+    "tools",
+    "opentelemetry.sdk",
+)
+
+
+def profile(module: str):
+    """Return ``[(module, self_us, cumulative_us)]`` from ``-X importtime`` of ``module``."""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=backend_dir,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def check(module: str = "main"):
+    """Profile ``module``; returns its import time in ms, the lazy modules it imported and the profile rows."""
+    rows = profile(module)
+    total_ms = next(cumulative for name, _, cumulative in reversed(rows) if name == module) / 1000
+    imported = {name for name, _, _ in rows}
+    eager = sorted(m for m in LAZY_MODULES if m in imported)
+    return total_ms, eager, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend import-time budget")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    total_ms, eager, rows = check(args.module)
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+    print(f"\nimport {args.module}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms), {len(rows)} modules")
+    failed = False
+    if eager:
+        print(f"FAILED: imported at start-up but should be lazy: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print("FAILED: over the import-time budget")
+        failed = True
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
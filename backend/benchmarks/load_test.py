@@ -0,0 +1,302 @@
+"""End-to-end load test of the backend with a mock model and stub tools.
+
+Starts the mock OpenAI-compatible server and the MCP stub from
+``benchmarks.mock_llm`` in this process, then the backend (``uvicorn
+main:app``) as a subprocess pointed at them, with RAG agents on FAISS over the
+mock embeddings. N concurrent users each run sessions through ``/start`` and
+``/chat-stream``, so session setup, the orchestrator loop, persistence and
+SSE fan-out are measured without a model in the way.
+
+Reports sessions and events per second, p50/p99 of ``/start`` latency, time
+to first event and session duration, and the backend's memory (RSS of the
+process and its session workers) per concurrent session.
+
+Needs a running MongoDB (``COSMOS_DB_URI``, ``mongodb://localhost:27017`` by
+default): the backend stores the sessions in a throwaway ``load_test_<id>``
+database, dropped at the end.
+
+    cd backend
+    python -m benchmarks.load_test --users 20 --sessions-per-user 2
+    python -m benchmarks.load_test --users 50 --workers 4 --latency 0.5 --json load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+import uvicorn
+
+from benchmarks.mock_llm import MockScript, create_llm_app, create_mcp_stub
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+AGENTS = {
+    "custom": {"input_key": "0001", "type": "Custom", "name": "Analyst", "icon": "🧑‍💼",
+               "system_message": "You are an analyst. Answer briefly.",
+               "description": "Analyses the request and writes short answers."},
+    "rag": {"input_key": "0002", "type": "RAG", "name": "Researcher", "icon": "🔍", "index_name": "load-test",
+            "system_message": "", "description": "Searches the document index."},
+    "mcp": {"input_key": "0003", "type": "CustomMCP", "name": "DataAgent", "icon": "📊",
+            "system_message": "You query tables and send emails.",
+            "description": "Lists tables, queries data and sends emails."},
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))] if values else 0.0
+
+
+def _tree_rss(pid: int) -> int:
+    """Resident memory in bytes of ``pid`` and its children (Linux /proc)."""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                pending.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return total
+
+
+async def _serve(app, port: int):
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    return server, task
+
+
+async def _shutdown(*servers) -> None:
+    for server, _ in servers:
+        server.should_exit = True
+    await asyncio.wait([task for _, task in servers], timeout=10)
+
+
+async def _wait_for_backend(url: str, process: subprocess.Popen, timeout: float = 120) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"Backend exited during start-up with code {process.returncode}")
+            try:
+                await client.get(f"{url}/health", timeout=1)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.3)
+    raise RuntimeError("Backend did not start")
+
+
+async def _session(client: httpx.AsyncClient, url: str, user_id: str, agents: list, priority: str) -> dict:
+    """Run one session; returns its timings (seconds) and event count."""
+    result = {"ok": False, "events": 0, "start": None, "first_event": None, "duration": None, "error": None}
+    started = time.perf_counter()
+    try:
+        response = await client.post(f"{url}/start", json={
+            "content": f"Load test task {uuid.uuid4().hex[:8]}: summarise the sensor data and email the result.",
+            "agents": json.dumps(agents),
+            "user_id": user_id,
+            "priority": priority,
+        })
+        response.raise_for_status()
+        session_id = response.json()["response"]
+        result["start"] = time.perf_counter() - started
+        stream_started = time.perf_counter()
+        async with client.stream("GET", f"{url}/chat-stream", params={"session_id": session_id, "user_id": user_id}) as stream:
+            stream.raise_for_status()
+            async for line in stream.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                if result["first_event"] is None:
+                    result["first_event"] = time.perf_counter() - stream_started
+                result["events"] += 1
+        result["duration"] = time.perf_counter() - started
+        result["ok"] = result["events"] > 0
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+async def _user(client: httpx.AsyncClient, url: str, index: int, sessions: int, agents: list, priority: str,
+                results: list) -> None:
+    for _ in range(sessions):
+        results.append(await _session(client, url, f"load-user-{index}", agents, priority))
+
+
+def _check_mongodb(uri: str) -> None:
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+
+    client = MongoClient(uri, serverSelectionTimeoutMS=3000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError as e:
+        raise RuntimeError(f"The load test needs MongoDB at {uri} (set COSMOS_DB_URI): {e}") from None
+    finally:
+        client.close()
+
+
+def _drop_database(uri: str, database: str) -> None:
+    from pymongo import MongoClient
+
+    client = MongoClient(uri, serverSelectionTimeoutMS=3000)
+    try:
+        client.drop_database(database)
+    finally:
+        client.close()
+
+
+async def run(args) -> dict:
+    mongo_uri = os.getenv("COSMOS_DB_URI", "mongodb://localhost:27017")
+    database = f"load_test_{uuid.uuid4().hex[:8]}"
+    _check_mongodb(mongo_uri)
+    script = MockScript(rounds=args.rounds, completion_tokens=args.completion_tokens, latency=args.latency,
+                        tokens_per_second=args.tokens_per_second, embedding_latency=args.embedding_latency)
+    llm_port, mcp_port, backend_port = _free_port(), _free_port(), _free_port()
+    llm_server = await _serve(create_llm_app(script), llm_port)
+    mcp_server = await _serve(create_mcp_stub(args.tool_latency).sse_app(), mcp_port)
+
+    env = dict(
+        os.environ,
+        PYTHONPATH=BACKEND_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""),
+        LITELLM_BASE_URL=f"http://127.0.0.1:{llm_port}/v1",
+        LITELLM_API_KEY="mock",
+        LITELLM_CHAT_MODEL="mock",
+        MCP_SERVER_MODE="sse",
+        MCP_SERVER_URI=f"http://127.0.0.1:{mcp_port}",
+        RAG_BACKEND="faiss",
+        LLM_CACHE_MODE="off",
+        CODE_EXECUTOR_POOL="false",
+        SESSION_WORKERS=str(args.workers),
+        USE_LOCAL_DB="true",
+        COSMOS_DB_URI=mongo_uri,
+        COSMOS_DB_DATABASE=database,
+    )
+    # Files (checkpoints, logs) go to a scratch directory, not the working tree.
+    workdir = tempfile.mkdtemp(prefix="load-test-")
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(backend_port),
+         "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=None if args.verbose else subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{backend_port}"
+    agents = [AGENTS[name] for name in args.agents.split(",")]
+    try:
+        await _wait_for_backend(url, backend)
+        timeout = httpx.Timeout(args.session_timeout, connect=10)
+        limits = httpx.Limits(max_connections=args.users * 2, max_keepalive_connections=args.users * 2)
+        async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+            # One session first, so lazy imports and connections are not measured.
+            warmup = await _session(client, url, "load-warmup", agents, args.priority)
+            if not warmup["ok"]:
+                raise RuntimeError(f"Warm-up session failed: {warmup['error']}")
+            baseline_rss = _tree_rss(backend.pid)
+            peak_rss = baseline_rss
+
+            results: list = []
+            done = asyncio.Event()
+
+            async def sample_memory():
+                nonlocal peak_rss
+                while not done.is_set():
+                    peak_rss = max(peak_rss, _tree_rss(backend.pid))
+                    await asyncio.sleep(0.25)
+
+            sampler = asyncio.create_task(sample_memory())
+            started = time.perf_counter()
+            await asyncio.gather(*[
+                _user(client, url, i, args.sessions_per_user, agents, args.priority, results) for i in range(args.users)
+            ])
+            elapsed = time.perf_counter() - started
+            done.set()
+            await sampler
+    finally:
+        backend.terminate()
+        backend.wait(30)
+        await _shutdown(llm_server, mcp_server)
+        _drop_database(mongo_uri, database)
+
+    ok = [r for r in results if r["ok"]]
+    errors = [r["error"] for r in results if not r["ok"]]
+
+    def timings(key):
+        values = [r[key] for r in ok if r[key] is not None]
+        return {"p50_ms": round(_percentile(values, 0.5) * 1000, 1), "p99_ms": round(_percentile(values, 0.99) * 1000, 1)}
+
+    report = {
+        "users": args.users,
+        "workers": args.workers,
+        "sessions": len(results),
+        "failed": len(errors),
+        "elapsed_s": round(elapsed, 2),
+        "sessions_per_s": round(len(ok) / elapsed, 3),
+        "events_per_s": round(sum(r["events"] for r in ok) / elapsed, 1),
+        "start": timings("start"),
+        "first_event": timings("first_event"),
+        "session": timings("duration"),
+        "rss_baseline_mb": round(baseline_rss / 2**20, 1),
+        "rss_peak_mb": round(peak_rss / 2**20, 1),
+        "rss_per_session_mb": round((peak_rss - baseline_rss) / 2**20 / min(args.users, max(1, len(results))), 2),
+        "mock_requests": dict(script.requests),
+        "errors": sorted(set(errors))[:10],
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend end-to-end load test with a mock LLM")
+    parser.add_argument("--users", type=int, default=10, help="concurrent users")
+    parser.add_argument("--sessions-per-user", type=int, default=2)
+    parser.add_argument("--agents", default="custom,rag,mcp", help=f"comma-separated, from: {', '.join(AGENTS)}")
+    parser.add_argument("--workers", type=int, default=0, help="SESSION_WORKERS of the backend")
+    parser.add_argument("--rounds", type=int, default=3, help="orchestrator rounds per session")
+    parser.add_argument("--latency", type=float, default=0.2, help="mock LLM seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=40.0)
+    parser.add_argument("--completion-tokens", type=int, default=60)
+    parser.add_argument("--embedding-latency", type=float, default=0.01)
+    parser.add_argument("--tool-latency", type=float, default=0.05, help="seconds per MCP stub tool call")
+    parser.add_argument("--session-timeout", type=float, default=600)
+    parser.add_argument("--priority", default="bench",
+                        help="LLM scheduler class of the test sessions; bench yields to interactive sessions")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the backend's output")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(f"users={report['users']} workers={report['workers']} sessions={report['sessions']} "
+          f"failed={report['failed']} elapsed={report['elapsed_s']}s")
+    print(f"throughput: {report['sessions_per_s']} sessions/s, {report['events_per_s']} events/s")
+    print(f"{'':<14} {'p50 ms':>9} {'p99 ms':>9}")
+    for key, label in (("start", "/start"), ("first_event", "first event"), ("session", "session")):
+        print(f"{label:<14} {report[key]['p50_ms']:>9.1f} {report[key]['p99_ms']:>9.1f}")
+    print(f"memory: baseline {report['rss_baseline_mb']} MB, peak {report['rss_peak_mb']} MB, "
+          f"{report['rss_per_session_mb']} MB per concurrent session")
+    print(f"mock LLM requests: {report['mock_requests']}")
+    for error in report["errors"]:
+        print(f"error: {error}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
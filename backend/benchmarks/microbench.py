@@ -0,0 +1,459 @@
+"""Microbenchmarks for the backend code that runs on every event or query.
+
+Covers ``crud.save_message`` at growing conversation sizes,
+``display_log_message`` for each event type, ``convert_objectid`` on large
+documents, FAISS index build and search (through the RAG agent) at several
+corpus sizes, the HTML-to-markdown conversion of ``fetch_webpage``, and
+``generate_session_name`` / team JSON parsing.
+
+Each case is calibrated to run for at least ``--min-time`` per round and
+timed over ``--rounds`` rounds; min/median/mean/stddev per call are
+reported. ``--save`` writes them as baseline JSON, ``--compare`` checks a run
+against a baseline and exits non-zero when a case's median is more than
+``--threshold`` times slower, so regressions can be caught between commits.
+Groups whose dependencies are not installed are skipped.
+
+    cd backend
+    python -m benchmarks.microbench --save baseline.json
+    python -m benchmarks.microbench --compare baseline.json --threshold 1.25
+    python -m benchmarks.microbench --filter faiss --rounds 20
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Case:
+    """A benchmarked call; ``setup`` runs untimed before every call when given."""
+
+    def __init__(self, name: str, func, setup=None):
+        self.name = name
+        self.func = func
+        self.setup = setup
+        self.is_async = inspect.iscoroutinefunction(func)
+
+
+async def _call(case: Case, number: int) -> float:
+    total = 0.0
+    for _ in range(number):
+        if case.setup is not None:
+            case.setup()
+        started = time.perf_counter()
+        if case.is_async:
+            await case.func()
+        else:
+            case.func()
+        total += time.perf_counter() - started
+    return total
+
+
+async def measure(case: Case, rounds: int, min_time: float) -> dict:
+    """Per-call timings (seconds) of ``case`` over ``rounds`` rounds."""
+    # calibrate the calls per round so that a round lasts at least min_time
+    number = 1
+    while True:
+        elapsed = await _call(case, number)
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+    times = [await _call(case, number) / number for _ in range(rounds)]
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "stddev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "rounds": rounds,
+        "iterations": number,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+_WORDS = "the agent looked at the sensor data and found that temperature and vibration agree with the plan".split()
+
+
+def _text(words: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def _stored_message(i: int) -> dict:
+    """A message as display_log_message stores it (AutoGenMessage.to_json)."""
+    return {
+        "time": "2025-01-01T00:00:00",
+        "type": "TextMessage",
+        "source": "Coder" if i % 2 else "MagenticOneOrchestrator",
+        "content": _text(120, i),
+        "stop_reason": None,
+        "models_usage": json.dumps({"prompt_tokens": 1200, "completion_tokens": 150}),
+        "content_image": None,
+        "session_id": "bench-session",
+        "session_user": "bench-user",
+    }
+
+
+def _page(rows: int) -> str:
+    body = "".join(
+        f"<div class='row'><h3>Item {i}</h3><p>{_text(40, i)} <a href='/item/{i}'>details</a>"
+        f" <img src='/img/{i}.png' alt='item {i}'></p>"
+        f"<table><tr><th>key</th><th>value</th></tr><tr><td>id</td><td>{i}</td></tr></table></div>"
+        for i in range(rows)
+    )
+    return (f"<html><head><style>.row {{ margin: 0 }}</style><script>var x = 1;</script></head>"
+            f"<body><nav><a href='/'>Home</a></nav>{body}</body></html>")
+
+
+class _FakeEmbeddings:
+    """``embeddings.create`` of the OpenAI client with deterministic vectors and no network."""
+
+    def __init__(self, dim: int):
+        import numpy as np
+
+        self._np = np
+        self.dim = dim
+        # cached, so index builds measure the index and not the fake model
+        self._vectors = {}
+
+    def create(self, input, model=None):
+        from types import SimpleNamespace
+
+        vectors = []
+        for text in input:
+            if text not in self._vectors:
+                rng = self._np.random.default_rng(abs(hash(text)) % (2**32))
+                self._vectors[text] = SimpleNamespace(embedding=rng.random(self.dim, dtype="float32"))
+            vectors.append(self._vectors[text])
+        return SimpleNamespace(data=vectors)
+
+
+class _MemoryDB:
+    """The parts of CosmosDB that display_log_message and get_team_config use, in memory."""
+
+    def __init__(self, teams: dict):
+        self.teams = teams
+
+    def store_conversation(self, conversation, conversation_details, conversation_dict):
+        return None
+
+    def get_team(self, team_id: str):
+        return self.teams.get(team_id)
+
+
+def _team_definitions() -> list:
+    folder = os.path.join(BACKEND_DIR, "data", "teams-definitions")
+    teams = []
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(".json"):
+            with open(os.path.join(folder, name), "r") as f:
+                teams.append(f.read())
+    return teams
+
+
+# ---------------------------------------------------------------------------
+# Benchmark groups
+# ---------------------------------------------------------------------------
+
+def crud_cases(workdir: str) -> list:
+    import crud
+
+    cases = []
+    for size in (10, 100, 1000):
+        session_id = f"bench-{size}"
+        path = crud.get_conversation_filepath("bench-user", session_id)
+        conversation = {
+            "id": "bench", "user_id": "bench-user", "session_id": session_id,
+            "messages": [_stored_message(i) for i in range(size)],
+            "agents": [], "run_mode_locally": True, "timestamp": "2025-01-01T00:00:00", "team_config": {},
+        }
+        data = json.dumps(conversation, indent=2)
+
+        def reset(path=path, data=data):
+            with open(path, "w") as f:
+                f.write(data)
+
+        message = _stored_message(size)
+
+        def save(session_id=session_id, message=message):
+            crud.save_message(id=None, user_id="bench-user", session_id=session_id, message=dict(message),
+                              agents=None, run_mode_locally=None, timestamp="2025-01-01T00:00:00")
+
+        cases.append(Case(f"crud.save_message[{size} messages]", save, setup=reset))
+    return cases
+
+
+def display_log_message_cases(workdir: str) -> list:
+    from autogen_agentchat.base import TaskResult
+    from autogen_agentchat.messages import (
+        MultiModalMessage, SelectSpeakerEvent, TextMessage, ToolCallExecutionEvent, ToolCallRequestEvent,
+        ToolCallSummaryMessage,
+    )
+    from autogen_core import FunctionCall, Image
+    from autogen_core.models import FunctionExecutionResult, RequestUsage
+    from PIL import Image as PILImage
+
+    import main
+
+    main.app.state.db = _MemoryDB({})
+    usage = RequestUsage(prompt_tokens=1200, completion_tokens=150)
+    sender = {"sender": "Coder"}
+    image = Image(PILImage.new("RGB", (64, 64), "white"))
+    executor_output = ("Plot saved. {'type': 'image', 'format': 'png', 'base64_data': '"
+                       + "iVBORw0KGgo" * 200 + "'} done")
+    events = {
+        "TextMessage": TextMessage(content=_text(200), source="Coder", metadata=sender, models_usage=usage),
+        "TextMessage(Executor image)": TextMessage(content=executor_output, source="Executor",
+                                                   metadata={"sender": "Executor"}),
+        "MultiModalMessage": MultiModalMessage(content=[_text(50), image], source="WebSurfer", metadata=sender),
+        "ToolCallRequestEvent": ToolCallRequestEvent(
+            content=[FunctionCall(id="call_1", name="do_search", arguments=json.dumps({"query": _text(10)}))],
+            source="Coder", metadata=sender, models_usage=usage),
+        "ToolCallExecutionEvent": ToolCallExecutionEvent(
+            content=[FunctionExecutionResult(content=_text(300), name="do_search", call_id="call_1", is_error=False)],
+            source="Coder", metadata=sender),
+        "ToolCallSummaryMessage": ToolCallSummaryMessage(content=_text(300), source="Coder", metadata=sender),
+        "SelectSpeakerEvent": SelectSpeakerEvent(content=["Coder"], source="MagenticOneOrchestrator",
+                                                 metadata=sender),
+        "TaskResult": TaskResult(messages=[TextMessage(content=_text(50), source="MagenticOneOrchestrator")],
+                                 stop_reason="done"),
+    }
+    path = main.crud.get_conversation_filepath("bench-user", "bench-events")
+    data = json.dumps({"id": "bench", "user_id": "bench-user", "session_id": "bench-events",
+                       "messages": [_stored_message(i) for i in range(20)], "agents": [],
+                       "run_mode_locally": True, "timestamp": "2025-01-01T00:00:00", "team_config": {}}, indent=2)
+
+    def reset():
+        with open(path, "w") as f:
+            f.write(data)
+
+    cases = []
+    for name, event in events.items():
+        async def display(event=event):
+            await main.display_log_message(event, workdir, "bench-events", "bench-user")
+
+        cases.append(Case(f"display_log_message[{name}]", display, setup=reset))
+    return cases
+
+
+def convert_objectid_cases(workdir: str) -> list:
+    from bson import ObjectId
+
+    from database import convert_objectid
+
+    def document(messages: int) -> dict:
+        return {
+            "_id": ObjectId(),
+            "user_id": "bench-user",
+            "session_id": "bench",
+            "messages": [dict(_stored_message(i), _id=ObjectId(), meta={"ref": ObjectId(), "tags": ["a", "b"]})
+                         for i in range(messages)],
+            "agents": [{"input_key": f"{i:04}", "name": f"Agent{i}", "type": "Custom"} for i in range(8)],
+        }
+
+    cases = []
+    for size in (100, 1000, 10000):
+        doc = document(size)
+        cases.append(Case(f"convert_objectid[{size} messages]", lambda doc=doc: convert_objectid(doc)))
+    return cases
+
+
+def faiss_cases(workdir: str) -> list:
+    from embedding_batcher import EmbeddingBatcher
+    from magentic_one_custom_rag_agent import MagenticOneRAGAgent
+
+    cases = []
+    for size in (1000, 5000, 20000):
+        documents = [f"doc {i}: {_text(30, i)}" for i in range(size)]
+        # Only the attributes build_faiss_index and do_search use; no model client or network.
+        agent = MagenticOneRAGAgent.__new__(MagenticOneRAGAgent)
+        # one search at a time: no batching window
+        agent._embeddings = EmbeddingBatcher(type("Client", (), {"embeddings": _FakeEmbeddings(1536)})(), max_wait=0)
+        agent.embedding_model = "bench"
+        agent.faiss_index_path = os.path.join(workdir, f"bench-{size}.faiss")
+        agent._faiss_pending, agent._index_build = None, None
+
+        async def build(agent=agent, documents=documents):
+            await agent.build_faiss_index(documents)
+
+        async def search(agent=agent, i=iter(range(10**9))):
+            await agent.do_search(f"query {next(i)}")
+
+        # the build case runs first and leaves the index the searches use
+        cases.append(Case(f"faiss.build[{size} docs]", build))
+        cases.append(Case(f"faiss.do_search[{size} docs]", search))
+    return cases
+
+
+def fetch_webpage_cases(workdir: str) -> list:
+    from tools.fetch_webpage import html_to_markdown
+
+    cases = []
+    for rows, label in ((20, "small"), (200, "medium"), (1000, "large")):
+        html = _page(rows)
+        cases.append(Case(f"html_to_markdown[{label} {len(html) // 1024} KiB]",
+                          lambda html=html: html_to_markdown(html, "https://example.com/page")))
+    return cases
+
+
+def session_cases(workdir: str) -> list:
+    import main
+    from magentic_one_helper import generate_session_name
+
+    teams = [json.loads(raw) for raw in _team_definitions()]
+    agents_payloads = [json.dumps(team.get("agents", [])) for team in teams]
+    main.app.state.db = _MemoryDB({team["team_id"]: dict(team, budgets={"max_tokens": 100000})
+                                   for team in teams if team.get("team_id")})
+    team_ids = list(main.app.state.db.teams) or ["missing"]
+    raw_definitions = _team_definitions()
+
+    def parse_agents():
+        for payload in agents_payloads:
+            json.loads(payload)
+
+    def parse_definitions():
+        for raw in raw_definitions:
+            json.loads(raw)
+
+    def team_config():
+        for team_id in team_ids:
+            main.get_team_config(team_id)
+
+    return [
+        Case("generate_session_name", generate_session_name),
+        Case(f"json.loads[/start agents x{len(agents_payloads)}]", parse_agents),
+        Case(f"json.loads[team definitions x{len(raw_definitions)}]", parse_definitions),
+        Case(f"get_team_config[x{len(team_ids)}]", team_config),
+    ]
+
+
+GROUPS = {
+    "crud": crud_cases,
+    "display_log_message": display_log_message_cases,
+    "convert_objectid": convert_objectid_cases,
+    "faiss": faiss_cases,
+    "fetch_webpage": fetch_webpage_cases,
+    "session": session_cases,
+}
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _format(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+async def run(args) -> dict:
+    results = {}
+    skipped = {}
+    # crud and the logs of display_log_message write relative to the working directory
+    workdir = tempfile.mkdtemp(prefix="microbench-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        for group, build in GROUPS.items():
+            if args.group and group not in args.group.split(","):
+                continue
+            try:
+                cases = build(workdir)
+            except ImportError as e:
+                skipped[group] = f"{type(e).__name__}: {e}"
+                print(f"skipping {group}: {e}")
+                continue
+            for case in cases:
+                if args.filter and args.filter not in case.name:
+                    continue
+                stats = await measure(case, args.rounds, args.min_time)
+                results[case.name] = dict(stats, group=group)
+                print(f"{case.name:<48} median {_format(stats['median']):>10}  min {_format(stats['min']):>10}"
+                      f"  stddev {_format(stats['stddev']):>10}")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "meta": {
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "rounds": args.rounds,
+            "min_time": args.min_time,
+        },
+        "benchmarks": results,
+        "skipped": skipped,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list:
+    """Print current vs baseline medians; returns the names of cases slower than ``threshold`` times."""
+    regressions = []
+    print(f"\ncompared with {baseline['meta'].get('commit') or 'baseline'} (threshold x{threshold}):")
+    for name, stats in report["benchmarks"].items():
+        previous = baseline["benchmarks"].get(name)
+        if previous is None:
+            print(f"{name:<48} new")
+            continue
+        ratio = stats["median"] / previous["median"] if previous["median"] else float("inf")
+        flag = "REGRESSION" if ratio > threshold else ("faster" if ratio < 1 / threshold else "")
+        print(f"{name:<48} {_format(previous['median']):>10} -> {_format(stats['median']):>10}  x{ratio:.2f} {flag}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend hot-path microbenchmarks")
+    parser.add_argument("--group", help=f"comma-separated groups, from: {', '.join(GROUPS)}")
+    parser.add_argument("--filter", help="only cases whose name contains this")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--min-time", type=float, default=0.02, help="minimum seconds per round")
+    parser.add_argument("--save", help="write the results as baseline JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="fail when a median is more than this many times the baseline's")
+    args = parser.parse_args()
+
+    sys.path.insert(0, BACKEND_DIR)
+    report = asyncio.run(run(args))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
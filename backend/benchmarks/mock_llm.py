@@ -0,0 +1,257 @@
+"""Local stand-ins for the services a session talks to, for load tests.
+
+``create_llm_app`` is an OpenAI-compatible server (``/v1/chat/completions``,
+``/v1/embeddings``, ``/v1/models``) with scripted answers, so full MagenticOne
+sessions run without a model:
+
+- progress ledger prompts get a valid ledger JSON; the request is reported
+  satisfied after ``rounds`` ledgers for the same task, and the next speaker
+  rotates through the team,
+- requests that offer tools get one tool call (arguments filled in from the
+  tool's schema) and a plain answer once the tool result is in,
+- everything else gets ``completion_tokens`` words of filler.
+
+Latency is ``latency`` (time to first token) plus ``completion_tokens /
+tokens_per_second``; streamed answers are paced at that rate. Embeddings are
+deterministic pseudo-random vectors, taking ``embedding_latency`` per request
+plus ``embedding_item_latency`` per text; with ``embedding_slots`` set only
+that many embedding requests are served at once (Ollama behind LiteLLM's
+``max_concurrent_requests: 1``).
+
+``create_mcp_stub`` is an MCP server with the tools of the ``mcp`` package
+(``show_tables``, ``data_provider``, ``mailer``) answering canned results
+after ``latency`` seconds.
+
+    cd backend
+    python -m benchmarks.mock_llm --port 4001 --latency 0.2 --tokens-per-second 40
+"""
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import json
+import random
+import re
+import time
+import uuid
+from collections import defaultdict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+_LEDGER_TASK = re.compile(r"Recall we are working on the following request:\s*(.*?)\s*And we have assembled", re.S)
+_LEDGER_NAMES = re.compile(r"select from: ([^)]+)\)")
+_WORDS = "the agent looked at the data and found that the numbers agree with the plan so far".split()
+
+
+class MockScript:
+    """Decides the answer to a chat completion request."""
+
+    def __init__(self, rounds: int = 3, completion_tokens: int = 60, latency: float = 0.2,
+                 tokens_per_second: float = 40.0, use_tools: bool = True, embedding_dim: int = 768,
+                 embedding_latency: float = 0.01, embedding_item_latency: float = 0.0,
+                 embedding_slots: int | None = None):
+        self.rounds = rounds
+        self.completion_tokens = completion_tokens
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.use_tools = use_tools
+        self.embedding_dim = embedding_dim
+        self.embedding_latency = embedding_latency
+        self.embedding_item_latency = embedding_item_latency
+        self.embedding_slots = embedding_slots
+        self._ledgers = defaultdict(int)
+        self.requests = defaultdict(int)
+
+    @staticmethod
+    def _text(message: dict) -> str:
+        content = message.get("content") or ""
+        if isinstance(content, list):
+            return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        return content
+
+    def _filler(self, n: int) -> str:
+        return " ".join(_WORDS[i % len(_WORDS)] for i in range(n))
+
+    def _ledger(self, prompt: str) -> str:
+        task = _LEDGER_TASK.search(prompt)
+        key = task.group(1) if task else prompt[:200]
+        names = [n.strip() for n in _LEDGER_NAMES.search(prompt).group(1).split(",")]
+        self._ledgers[key] += 1
+        count = self._ledgers[key]
+        done = count > self.rounds
+        if done:
+            self._ledgers.pop(key, None)
+
+        def answer(value):
+            return {"reason": "scripted by the mock server", "answer": value}
+
+        return json.dumps({
+            "is_request_satisfied": answer(done),
+            "is_in_loop": answer(False),
+            "is_progress_being_made": answer(True),
+            "next_speaker": answer(names[(count - 1) % len(names)]),
+            "instruction_or_question": answer(f"Please continue with step {count} of the plan."),
+        })
+
+    @staticmethod
+    def _arguments(schema: dict) -> dict:
+        samples = {"string": "load test", "integer": 1, "number": 1.0, "boolean": True, "object": {}, "array": []}
+        properties = schema.get("properties", {})
+        return {name: samples.get(properties.get(name, {}).get("type"), "load test")
+                for name in schema.get("required", list(properties))}
+
+    def respond(self, body: dict) -> dict:
+        """``{"content", "tool_calls", "completion_tokens"}`` for a request body."""
+        messages = body.get("messages", [])
+        last = messages[-1] if messages else {}
+        prompt = self._text(last)
+        tools = body.get("tools") or []
+        if "is_request_satisfied" in prompt and _LEDGER_NAMES.search(prompt):
+            self.requests["ledger"] += 1
+            content = self._ledger(prompt)
+            return {"content": content, "tool_calls": None, "completion_tokens": len(content) // 4}
+        if self.use_tools and tools and last.get("role") != "tool":
+            self.requests["tool_call"] += 1
+            tool = random.choice(tools)["function"]
+            call = {
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": tool["name"], "arguments": json.dumps(self._arguments(tool.get("parameters", {})))},
+            }
+            return {"content": None, "tool_calls": [call], "completion_tokens": 20}
+        self.requests["text"] += 1
+        return {"content": self._filler(self.completion_tokens), "tool_calls": None,
+                "completion_tokens": self.completion_tokens}
+
+    def prompt_tokens(self, body: dict) -> int:
+        return sum(len(self._text(m)) for m in body.get("messages", [])) // 4
+
+    def embedding(self, text: str) -> list:
+        rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+        return [rng.uniform(-1, 1) for _ in range(self.embedding_dim)]
+
+
+def create_llm_app(script: MockScript) -> FastAPI:
+    app = FastAPI()
+    embedding_slots = asyncio.Semaphore(script.embedding_slots) if script.embedding_slots else None
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "mock"}]}
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        script.requests["embedding"] += 1
+        async with embedding_slots or contextlib.nullcontext():
+            await asyncio.sleep(script.embedding_latency + script.embedding_item_latency * len(inputs))
+        return {
+            "object": "list",
+            "model": body.get("model", "mock"),
+            "data": [{"object": "embedding", "index": i, "embedding": script.embedding(str(text))}
+                     for i, text in enumerate(inputs)],
+            "usage": {"prompt_tokens": sum(len(str(t)) // 4 for t in inputs), "total_tokens": 0},
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        answer = script.respond(body)
+        usage = {
+            "prompt_tokens": script.prompt_tokens(body),
+            "completion_tokens": answer["completion_tokens"],
+            "total_tokens": script.prompt_tokens(body) + answer["completion_tokens"],
+        }
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        model = body.get("model", "mock")
+        finish_reason = "tool_calls" if answer["tool_calls"] else "stop"
+        generation_time = answer["completion_tokens"] / script.tokens_per_second if script.tokens_per_second else 0
+        await asyncio.sleep(script.latency)
+
+        if not body.get("stream"):
+            await asyncio.sleep(generation_time)
+            message = {"role": "assistant", "content": answer["content"]}
+            if answer["tool_calls"]:
+                message["tool_calls"] = answer["tool_calls"]
+            return {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": usage,
+            }
+
+        async def chunks():
+            def chunk(delta, finish=None, usage=None):
+                choices = [{"index": 0, "delta": delta, "finish_reason": finish}] if delta is not None else []
+                data = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": choices}
+                if usage is not None:
+                    data["usage"] = usage
+                return f"data: {json.dumps(data)}\n\n"
+
+            if answer["tool_calls"]:
+                await asyncio.sleep(generation_time)
+                calls = [dict(call, index=i) for i, call in enumerate(answer["tool_calls"])]
+                yield chunk({"role": "assistant", "tool_calls": calls})
+            else:
+                words = answer["content"].split(" ")
+                for i, word in enumerate(words):
+                    yield chunk({"role": "assistant", "content": word if i == 0 else " " + word})
+                    await asyncio.sleep(generation_time / len(words))
+            yield chunk({}, finish_reason)
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield chunk(None, usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return app
+
+
+def create_mcp_stub(latency: float = 0.05):
+    """MCP server with the tools of the ``mcp`` package, answering canned results."""
+    from mcp.server.fastmcp import FastMCP
+
+    stub = FastMCP("load-test-stub")
+
+    @stub.tool()
+    async def show_tables() -> str:
+        """List the tables available to data_provider."""
+        await asyncio.sleep(latency)
+        return json.dumps({"tables": ["sensor", "maintenance"]})
+
+    @stub.tool()
+    async def data_provider(tablename: str, aggregates: dict = None, group_by: list = None) -> str:
+        """Query a table."""
+        await asyncio.sleep(latency)
+        return "EquipmentID,Temperature (°C)\n" + "\n".join(f"EQ-{i},{20 + i % 7}" for i in range(50))
+
+    @stub.tool()
+    async def mailer(to_address: str, subject: str, plain_text: str, html: str = "") -> str:
+        """Send an email."""
+        await asyncio.sleep(latency)
+        return f"Email queued for delivery with message id {uuid.uuid4().hex}. \n\nTERMINATE."
+
+    return stub
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible server")
+    parser.add_argument("--port", type=int, default=4001)
+    parser.add_argument("--rounds", type=int, default=3, help="orchestrator rounds before the task is satisfied")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=40.0)
+    parser.add_argument("--completion-tokens", type=int, default=60)
+    parser.add_argument("--no-tools", action="store_true", help="never answer with tool calls")
+    args = parser.parse_args()
+    script = MockScript(rounds=args.rounds, completion_tokens=args.completion_tokens, latency=args.latency,
+                        tokens_per_second=args.tokens_per_second, use_tools=not args.no_tools)
+    uvicorn.run(create_llm_app(script), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
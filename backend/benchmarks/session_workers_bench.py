@@ -0,0 +1,82 @@
+"""Load benchmark for the session worker pool.
+
+Runs a fixed number of CPU-bound synthetic sessions (JSON and HTML parsing,
+the kind of work agents do between LLM calls) with 1..N worker processes
+and reports sessions per second, so scaling with cores can be checked
+without a live model.
+
+    cd backend
+    python -m benchmarks.session_workers_bench --sessions 32 --max-workers 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from html.parser import HTMLParser
+
+from autogen_agentchat.messages import TextMessage
+
+from session_workers import SessionWorkerPool
+
+_PAGE = "<html><body>" + "".join(
+    f"<div class='row'><a href='/item/{i}'>Item {i}</a><p>{'lorem ipsum ' * 20}</p></div>" for i in range(400)
+) + "</body></html>"
+
+
+class _TextCollector(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+    def handle_data(self, data):
+        self.chunks.append(data)
+
+
+async def cpu_session(session: dict):
+    """Synthetic session: a few rounds of CPU work, one message per round."""
+    for round_no in range(session.get("rounds", 5)):
+        parser = _TextCollector()
+        parser.feed(_PAGE)
+        doc = {"round": round_no, "chunks": parser.chunks}
+        text = json.dumps(json.loads(json.dumps(doc)))
+        yield TextMessage(content=f"round {round_no}: {len(text)} bytes", source="bench")
+
+
+async def run(workers: int, sessions: int, rounds: int) -> float:
+    pool = SessionWorkerPool(workers, runner="benchmarks.session_workers_bench:cpu_session")
+    pool.start()
+    try:
+        # Warm up every worker so process start-up is not measured.
+        await asyncio.gather(*[_drain(pool, f"warmup-{i}", 1) for i in range(workers)])
+        started = time.perf_counter()
+        await asyncio.gather(*[_drain(pool, f"session-{i}", rounds) for i in range(sessions)])
+        return sessions / (time.perf_counter() - started)
+    finally:
+        await pool.close()
+
+
+async def _drain(pool: SessionWorkerPool, session_id: str, rounds: int) -> None:
+    async for _ in pool.stream_session({"session_id": session_id, "rounds": rounds}):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session worker pool load benchmark")
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    workers = 1
+    baseline = None
+    print(f"{'workers':>8} {'sessions/s':>12} {'speedup':>8}")
+    while workers <= args.max_workers:
+        rate = asyncio.run(run(workers, args.sessions, args.rounds))
+        baseline = baseline or rate
+        print(f"{workers:>8} {rate:>12.2f} {rate / baseline:>7.2f}x")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""Rounds and tokens saved by the early-termination stack on the bundled teams.
+
+Runs each team definition of ``data/teams-definitions`` as a real
+``MagenticOneGroupChat``: the orchestrator talks to the scripted model of
+``benchmarks.mock_llm`` (in process), which only reports the request
+satisfied after ``--ledger-rounds`` ledgers, and the participants are
+scripted agents carrying the team's agent names. Every session follows one
+of these scenarios, switching at a random round:
+
+- ``productive``: every reply brings new findings (the stack must not fire),
+- ``mailer``: an agent sends the report with the mailer tool, which returns
+  ``TERMINATE``, and the team keeps going,
+- ``loop``: the speaking agent repeats the same answer,
+- ``stall``: agents restate what was already said.
+
+Each session runs once with the session budget only (as before) and once
+with the ``TerminationPolicy`` stack. Reported per team and scenario: the
+average agent turns and tokens (orchestrator requests plus an estimate of
+the agents' prompts and replies) and the conditions that fired.
+
+    cd backend
+    python -m benchmarks.termination_bench --sessions 5
+    python -m benchmarks.termination_bench --ledger-rounds 30 --scenarios mailer,loop --json termination.json
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import zlib
+from collections import Counter, defaultdict
+from typing import Sequence
+
+from autogen_agentchat.agents import BaseChatAgent
+from autogen_agentchat.base import Response, TaskResult
+from autogen_agentchat.messages import TextMessage, ToolCallExecutionEvent, ToolCallRequestEvent
+from autogen_agentchat.teams import MagenticOneGroupChat
+from autogen_core import FunctionCall
+from autogen_core.models import (
+    ChatCompletionClient,
+    CreateResult,
+    FunctionExecutionResult,
+    ModelInfo,
+    RequestUsage,
+)
+
+from benchmarks.mock_llm import MockScript
+from orchestration_utils import TerminationPolicy
+from session_budget import SessionBudget, SessionBudgetTermination
+
+SCENARIOS = ("productive", "mailer", "loop", "stall")
+# stop reasons of the conditions of orchestration_utils
+_REASONS = ("Done marker", "Tool result", "Loop detected", "No progress")
+TEAMS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "teams-definitions")
+
+_ENTITIES = ["compressor", "pump", "valve", "turbine", "store", "customer segment", "loan book", "claim queue"]
+_METRICS = ["vibration", "temperature", "pressure", "revenue", "churn", "stock level", "default rate", "backlog"]
+
+
+def _tokens(text: str) -> int:
+    return len(text) // 4 + 4
+
+
+class ScriptClient(ChatCompletionClient):
+    """Orchestrator model answering from ``MockScript`` without a server."""
+
+    def __init__(self, script: MockScript):
+        self._script = script
+        self._usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+
+    async def create(self, messages, **kwargs) -> CreateResult:
+        body = {"messages": [{"role": "user", "content": m.content if isinstance(m.content, str) else str(m.content)}
+                             for m in messages]}
+        answer = self._script.respond(body)
+        usage = RequestUsage(prompt_tokens=self._script.prompt_tokens(body), completion_tokens=answer["completion_tokens"])
+        self._usage = RequestUsage(prompt_tokens=self._usage.prompt_tokens + usage.prompt_tokens,
+                                   completion_tokens=self._usage.completion_tokens + usage.completion_tokens)
+        return CreateResult(finish_reason="stop", content=answer["content"], usage=usage, cached=False)
+
+    async def create_stream(self, messages, **kwargs):
+        yield await self.create(messages, **kwargs)
+
+    async def close(self) -> None:
+        pass
+
+    def actual_usage(self) -> RequestUsage:
+        return self._usage
+
+    def total_usage(self) -> RequestUsage:
+        return self._usage
+
+    def count_tokens(self, messages, **kwargs) -> int:
+        return 0
+
+    def remaining_tokens(self, messages, **kwargs) -> int:
+        return 128000
+
+    @property
+    def capabilities(self):  # type: ignore
+        return self.model_info
+
+    @property
+    def model_info(self) -> ModelInfo:
+        return {"vision": False, "function_calling": False, "json_output": True, "family": "unknown",
+                "structured_output": False}
+
+
+class ScriptedSession:
+    """What the agents of one session say; switches from productive to ``scenario`` at round ``switch``."""
+
+    def __init__(self, scenario: str, switch: int, seed: int):
+        self.scenario = scenario
+        self.switch = switch
+        self.rng = random.Random(seed)
+        self.turns = 0
+        self.thread_tokens = 0
+        self.agent_tokens = 0
+        self.said = []
+        self.repeated = None
+
+    def _finding(self) -> str:
+        entity, metric = self.rng.choice(_ENTITIES), self.rng.choice(_METRICS)
+        return (f"The {metric} of {entity} {self.rng.randint(1, 999)} moved by {self.rng.randint(1, 99)} percent "
+                f"in week {self.rng.randint(1, 52)} after change {self.rng.randint(1000, 9999)}.")
+
+    def turn(self, name: str) -> Response:
+        self.turns += 1
+        inner = []
+        late = self.turns >= self.switch
+        if self.scenario == "mailer" and self.turns == self.switch:
+            call = FunctionCall(id=f"call_{self.turns}", name="mailer",
+                                arguments=json.dumps({"to_address": "ops@example.com", "subject": "Report"}))
+            result = f"Email queued for delivery with message id {self.rng.getrandbits(64):x}. \n\nTERMINATE."
+            inner = [
+                ToolCallRequestEvent(content=[call], source=name),
+                ToolCallExecutionEvent(content=[FunctionExecutionResult(content=result, call_id=call.id,
+                                                                        name="mailer", is_error=False)], source=name),
+            ]
+            text = "I sent the report by email."
+        elif self.scenario == "loop" and late:
+            if self.repeated is None:
+                self.repeated = " ".join(self._finding() for _ in range(3))
+            text = self.repeated
+        elif self.scenario in ("stall", "mailer") and late:
+            # restate earlier findings in another order
+            text = " ".join(self.rng.sample(self.said, min(3, len(self.said)))) or "Nothing new to add."
+        else:
+            sentences = [self._finding() for _ in range(3)]
+            self.said.extend(sentences)
+            text = " ".join(sentences)
+        # the agent's prompt is the thread so far
+        self.agent_tokens += self.thread_tokens + _tokens(text)
+        self.thread_tokens += _tokens(text) + 30
+        return Response(chat_message=TextMessage(content=text, source=name), inner_messages=inner)
+
+
+class ScriptedAgent(BaseChatAgent):
+    def __init__(self, name: str, description: str, session: ScriptedSession):
+        super().__init__(name, description or name)
+        self._session = session
+
+    @property
+    def produced_message_types(self) -> Sequence[type]:
+        return (TextMessage,)
+
+    async def on_messages(self, messages, cancellation_token) -> Response:
+        return self._session.turn(self.name)
+
+    async def on_reset(self, cancellation_token) -> None:
+        pass
+
+
+async def run_session(team: dict, scenario: str, seed: int, policy: TerminationPolicy, stack: bool,
+                      ledger_rounds: int) -> dict:
+    rng = random.Random(seed)
+    session = ScriptedSession(scenario, switch=rng.randint(3, max(3, ledger_rounds // 2)), seed=seed)
+    client = ScriptClient(MockScript(rounds=ledger_rounds, completion_tokens=60))
+    agents = [ScriptedAgent(a["name"], a.get("description", ""), session) for a in team["agents"]]
+    budget = SessionBudget()
+    condition = SessionBudgetTermination(budget)
+    if stack:
+        condition = policy.build(condition)
+    chat = MagenticOneGroupChat(agents, model_client=client, termination_condition=condition,
+                                max_turns=policy.max_turns, max_stalls=policy.max_stalls)
+    stopped_by = "orchestrator"
+    async for item in chat.run_stream(task=f"Analyse the latest data for team {team.get('name')} and report."):
+        if isinstance(item, TaskResult):
+            fired = [reason for reason in _REASONS if reason in (item.stop_reason or "")]
+            stopped_by = ", ".join(fired) or stopped_by
+    usage = client.total_usage()
+    return {
+        "turns": session.turns,
+        "tokens": usage.prompt_tokens + usage.completion_tokens + session.agent_tokens,
+        "stopped_by": stopped_by,
+    }
+
+
+async def run(args) -> dict:
+    policy = TerminationPolicy.from_config(json.loads(args.config) if args.config else None)
+    files = sorted(glob.glob(os.path.join(args.teams, "*.json")))
+    report = {"policy": vars(policy), "teams": []}
+    totals = defaultdict(lambda: [0, 0, 0, 0])
+    for path in files:
+        with open(path) as f:
+            team = json.load(f)
+        entry = {"team": team.get("name", os.path.basename(path)), "scenarios": {}}
+        for scenario in args.scenarios:
+            base, stacked, fired = [], [], Counter()
+            for i in range(args.sessions):
+                seed = zlib.crc32(f"{os.path.basename(path)}:{scenario}:{i}".encode("utf-8"))
+                base.append(await run_session(team, scenario, seed, policy, False, args.ledger_rounds))
+                result = await run_session(team, scenario, seed, policy, True, args.ledger_rounds)
+                stacked.append(result)
+                fired[result["stopped_by"]] += 1
+            row = {
+                "turns_before": sum(r["turns"] for r in base) / len(base),
+                "turns_after": sum(r["turns"] for r in stacked) / len(stacked),
+                "tokens_before": sum(r["tokens"] for r in base) / len(base),
+                "tokens_after": sum(r["tokens"] for r in stacked) / len(stacked),
+                "stopped_by": dict(fired),
+            }
+            entry["scenarios"][scenario] = row
+            t = totals[scenario]
+            t[0] += row["turns_before"]; t[1] += row["turns_after"]; t[2] += row["tokens_before"]; t[3] += row["tokens_after"]
+        report["teams"].append(entry)
+    report["summary"] = {
+        scenario: {
+            "turns_before": round(t[0] / len(files), 1),
+            "turns_after": round(t[1] / len(files), 1),
+            "tokens_saved": round(1 - t[3] / t[2], 3) if t[2] else 0.0,
+        }
+        for scenario, t in totals.items()
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rounds and tokens saved by early termination on the bundled teams")
+    parser.add_argument("--teams", default=TEAMS_DIR, help="folder of team definitions")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), type=lambda s: s.split(","))
+    parser.add_argument("--sessions", type=int, default=3, help="sessions per team and scenario")
+    parser.add_argument("--ledger-rounds", type=int, default=20, help="ledgers before the orchestrator sees it is done")
+    parser.add_argument("--config", help="termination block (JSON) to test instead of the TERMINATION_* defaults")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(f"{'team':<40} {'scenario':<11} {'turns':>13} {'tokens':>19}  stopped by")
+    for entry in report["teams"]:
+        for scenario, row in entry["scenarios"].items():
+            fired = ", ".join(f"{k} x{v}" for k, v in row["stopped_by"].items())
+            print(f"{entry['team'][:40]:<40} {scenario:<11} {row['turns_before']:>6.1f} -> {row['turns_after']:<5.1f} "
+                  f"{row['tokens_before']:>8.0f} -> {row['tokens_after']:<8.0f}  {fired}")
+    print()
+    for scenario, row in report["summary"].items():
+        print(f"{scenario:<11} average turns {row['turns_before']} -> {row['turns_after']}, "
+              f"tokens saved {row['tokens_saved']:.0%}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
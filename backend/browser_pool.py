@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import os
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, BrowserContext, Playwright
+
+# Same user agent MultimodalWebSurfer sets on the contexts it creates itself.
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36 Edg/122.0.0.0"
+
+
+class PooledBrowser:
+    """One Chromium process shared by the contexts of several sessions."""
+
+    def __init__(self, browser: "Browser"):
+        self.browser = browser
+        self.active = 0
+        self.uses = 0
+        self.launched_at = time.monotonic()
+
+    def connected(self) -> bool:
+        return self.browser.is_connected()
+
+    async def close(self) -> None:
+        try:
+            await self.browser.close()
+        except Exception as e:
+            logging.getLogger("browser_pool").warning(f"Closing browser failed: {e}")
+
+
+class BrowserPool:
+    """Process-wide pool of Chromium browsers for WebSurfer agents.
+
+    Every MultimodalWebSurfer used to start its own Playwright driver and
+    Chromium and never closed them. The pool runs one Playwright driver and
+    a few browsers; each session gets its own isolated browser context
+    (cookies, storage and pages are not shared). At most ``max_contexts``
+    contexts are open at once, later sessions wait. A browser serves up to
+    ``contexts_per_browser`` sessions at a time and is recycled (closed once
+    idle, replaced by a fresh one) after ``max_uses`` contexts, so leaks in
+    long-running Chromium processes do not accumulate.
+    """
+
+    def __init__(
+        self,
+        max_contexts: int = 8,
+        contexts_per_browser: int = 4,
+        max_uses: int = 50,
+        headless: bool = True,
+        browser_channel: Optional[str] = None,
+    ):
+        self.max_contexts = max(1, max_contexts)
+        self.contexts_per_browser = max(1, contexts_per_browser)
+        self.max_uses = max(1, max_uses)
+        self.headless = headless
+        self.browser_channel = browser_channel
+
+        self._playwright: Optional["Playwright"] = None
+        self._browsers: List[PooledBrowser] = []
+        self._leases: Dict[str, List[tuple]] = {}
+        self._active = 0
+        self._waiting = 0
+        self._condition: Optional[asyncio.Condition] = None
+        self._launch_lock: Optional[asyncio.Lock] = None
+        self._closed = False
+
+        self.launched = 0
+        self.recycled = 0
+        self.contexts_created = 0
+        self.total_wait = 0.0
+
+    @property
+    def playwright(self) -> Optional["Playwright"]:
+        return self._playwright
+
+    async def _launch(self) -> PooledBrowser:
+        if self._playwright is None:
+            from playwright.async_api import async_playwright
+
+            self._playwright = await async_playwright().start()
+        launch_args = {"headless": self.headless}
+        if self.browser_channel:
+            launch_args["channel"] = self.browser_channel
+        pooled = PooledBrowser(await self._playwright.chromium.launch(**launch_args))
+        self.launched += 1
+        logging.getLogger("browser_pool").info(f"Launched browser #{self.launched}")
+        return pooled
+
+    def _pick(self) -> Optional[PooledBrowser]:
+        """Least busy browser that is alive, has room and is not due for recycling."""
+        candidates = [
+            b for b in self._browsers
+            if b.connected() and b.active < self.contexts_per_browser and b.uses < self.max_uses
+        ]
+        return min(candidates, key=lambda b: b.active) if candidates else None
+
+    async def acquire(self, session_id: str) -> "BrowserContext":
+        """Open a new browser context for ``session_id``, waiting while ``max_contexts`` are in use."""
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+            self._launch_lock = asyncio.Lock()
+        started = time.monotonic()
+        async with self._condition:
+            self._waiting += 1
+            try:
+                while self._active >= self.max_contexts:
+                    await self._condition.wait()
+            finally:
+                self._waiting -= 1
+            self._active += 1
+        try:
+            # Picking and launching are serialized so concurrent sessions do not each launch a browser.
+            async with self._launch_lock:
+                # Browsers that crashed are dropped here; their contexts are gone with them.
+                self._browsers = [b for b in self._browsers if b.connected() or b.active > 0]
+                pooled = self._pick()
+                if pooled is None:
+                    pooled = await self._launch()
+                    self._browsers.append(pooled)
+                pooled.active += 1
+                pooled.uses += 1
+        except Exception:
+            async with self._condition:
+                self._active -= 1
+                self._condition.notify()
+            raise
+        try:
+            context = await pooled.browser.new_context(user_agent=USER_AGENT)
+        except Exception:
+            await self._return(pooled)
+            raise
+        self.contexts_created += 1
+        self._leases.setdefault(session_id, []).append((pooled, context))
+        self.total_wait += time.monotonic() - started
+        return context
+
+    async def release(self, session_id: str) -> None:
+        """Close every context of ``session_id``; safe to call when the session holds none."""
+        for pooled, context in self._leases.pop(session_id, []):
+            try:
+                await context.close()
+            except Exception as e:
+                logging.getLogger("browser_pool").warning(f"Closing browser context of {session_id} failed: {e}")
+            await self._return(pooled)
+
+    async def _return(self, pooled: PooledBrowser) -> None:
+        retire = None
+        async with self._condition:
+            pooled.active -= 1
+            self._active -= 1
+            if pooled.active == 0 and (pooled.uses >= self.max_uses or not pooled.connected() or self._closed):
+                if pooled in self._browsers:
+                    self._browsers.remove(pooled)
+                retire = pooled
+            self._condition.notify()
+        if retire is not None:
+            if retire.uses >= self.max_uses:
+                self.recycled += 1
+            await retire.close()
+
+    def stats(self) -> dict:
+        return {
+            "max_contexts": self.max_contexts,
+            "active_contexts": self._active,
+            "utilization": round(self._active / self.max_contexts, 3),
+            "waiting": self._waiting,
+            "sessions": len(self._leases),
+            "browsers": [
+                {"active": b.active, "uses": b.uses, "connected": b.connected(),
+                 "age": round(time.monotonic() - b.launched_at, 1)}
+                for b in self._browsers
+            ],
+            "launched": self.launched,
+            "recycled": self.recycled,
+            "contexts_created": self.contexts_created,
+            "avg_acquire_wait": round(self.total_wait / max(1, self.contexts_created), 3),
+        }
+
+    async def close(self) -> None:
+        self._closed = True
+        for session_id in list(self._leases):
+            await self.release(session_id)
+        for pooled in self._browsers:
+            await pooled.close()
+        self._browsers.clear()
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+_pool: Optional[BrowserPool] = None
+
+
+def browser_pool_enabled() -> bool:
+    return os.getenv("BROWSER_POOL", "true").lower() == "true"
+
+
+def get_browser_pool() -> BrowserPool:
+    global _pool
+    if _pool is None:
+        _pool = BrowserPool(
+            max_contexts=int(os.getenv("BROWSER_POOL_MAX_CONTEXTS", 8)),
+            contexts_per_browser=int(os.getenv("BROWSER_POOL_CONTEXTS_PER_BROWSER", 4)),
+            max_uses=int(os.getenv("BROWSER_POOL_MAX_USES", 50)),
+            headless=os.getenv("BROWSER_HEADLESS", "true").lower() == "true",
+            browser_channel=os.getenv("BROWSER_CHANNEL") or None,
+        )
+    return _pool
@@ -0,0 +1,354 @@
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import shutil
+import time
+import uuid
+from typing import TYPE_CHECKING, Dict, List, Optional, Set
+
+if TYPE_CHECKING:
+    from autogen_ext.code_executors.docker import DockerCommandLineCodeExecutor
+
+# Packages baked into the executor image so generated code does not pip install them on every run.
+DEFAULT_PACKAGES = "pandas numpy matplotlib seaborn scipy scikit-learn requests beautifulsoup4 openpyxl tabulate"
+
+# Runs inside the container on release: kill everything but the shell (PID 1), then empty the workspace.
+_RESET_COMMAND = "kill -9 -1 2>/dev/null; rm -rf /workspace/* /workspace/.[!.]* /workspace/..?* 2>/dev/null; true"
+
+
+def _image_dockerfile(base_image: str, packages: str) -> str:
+    lines = [f"FROM {base_image}"]
+    if packages.strip():
+        lines.append(f"RUN pip install --no-cache-dir {packages.strip()}")
+    lines.append("WORKDIR /workspace")
+    return "\n".join(lines) + "\n"
+
+
+async def ensure_executor_image(base_image: str, packages: str) -> str:
+    """Return the tag of ``base_image`` with ``packages`` pre-installed, building it once if missing."""
+    if not packages.strip():
+        return base_image
+    import docker
+    from docker.errors import ImageNotFound
+
+    dockerfile = _image_dockerfile(base_image, packages)
+    tag = f"magentic-executor:{hashlib.sha256(dockerfile.encode('utf-8')).hexdigest()[:12]}"
+    client = docker.from_env()
+    try:
+        await asyncio.to_thread(client.images.get, tag)
+    except ImageNotFound:
+        print(f"Building code executor image {tag} ({packages})...")
+        await asyncio.to_thread(
+            client.images.build, fileobj=io.BytesIO(dockerfile.encode("utf-8")), tag=tag, rm=True, pull=True
+        )
+    return tag
+
+
+class PooledExecutor:
+    """A started executor container with its own host work dir."""
+
+    def __init__(self, executor: "DockerCommandLineCodeExecutor", work_dir: str):
+        self.executor = executor
+        self.work_dir = work_dir
+        self.created_at = time.monotonic()
+        self.idle_since = time.monotonic()
+        self.session_id: Optional[str] = None
+        self.uses = 0
+
+    async def healthy(self) -> bool:
+        container = self.executor._container
+        if container is None:
+            return False
+        try:
+            await asyncio.to_thread(container.reload)
+            if container.status != "running":
+                return False
+            result = await asyncio.to_thread(container.exec_run, ["true"])
+            return result.exit_code == 0
+        except Exception:
+            return False
+
+    async def reset(self) -> None:
+        """Kill leftover processes and empty the work dir so the next session starts clean."""
+        container = self.executor._container
+        await asyncio.to_thread(container.exec_run, ["sh", "-c", _RESET_COMMAND])
+        # Files written by the container may belong to root; whatever is left is cleaned from the host side.
+        for name in os.listdir(self.work_dir):
+            path = os.path.join(self.work_dir, name)
+            try:
+                if os.path.isdir(path) and not os.path.islink(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    async def stop(self) -> None:
+        try:
+            await self.executor.stop()
+        except Exception as e:
+            logging.getLogger("code_executor_pool").warning(f"Failed to stop {self.executor.container_name}: {e}")
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+class CodeExecutorPool:
+    """Pool of pre-started Docker code executor containers.
+
+    Starting a container (and checking/pulling its image) used to happen for
+    every session. The pool keeps ``min_idle`` containers warm, leases one
+    container exclusively to a session and, on release, resets and health
+    checks it before handing it to the next session. At most ``max_size``
+    containers exist; idle containers above ``min_idle`` are stopped after
+    ``idle_ttl`` seconds. A session waits at most ``acquire_timeout`` seconds
+    for a container when all of them are leased, or for the executor image
+    to be built.
+
+    Nothing touches Docker before the first ``acquire``: deployments that
+    never run code locally never start a container. When pre-starting a
+    container fails, the pool stops refilling until a session asks again.
+    """
+
+    def __init__(
+        self,
+        image: str = "python:3-slim",
+        packages: str = DEFAULT_PACKAGES,
+        max_size: int = 4,
+        min_idle: int = 1,
+        idle_ttl: float = 600,
+        base_dir: str = "./.cache/executors",
+        timeout: int = 60,
+        acquire_timeout: float = 120,
+    ):
+        self.image = image
+        self.packages = packages
+        self.max_size = max(1, max_size)
+        self.min_idle = max(0, min(min_idle, self.max_size))
+        self.idle_ttl = idle_ttl
+        self.base_dir = base_dir
+        self.timeout = timeout
+        self.acquire_timeout = acquire_timeout
+
+        self._idle: List[PooledExecutor] = []
+        self._leased: Dict[str, PooledExecutor] = {}
+        self._starting = 0
+        self._condition: Optional[asyncio.Condition] = None
+        self._maintainer: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._image_tag: Optional[str] = None
+        self._image_build: Optional[asyncio.Task] = None
+        self._fill_failed = False
+        self._closed = False
+
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.total_wait = 0.0
+
+    @property
+    def size(self) -> int:
+        return len(self._idle) + len(self._leased) + self._starting
+
+    def _ensure_loop_state(self) -> None:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+            self._maintainer = asyncio.create_task(self._maintain())
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _build_image(self) -> str:
+        try:
+            self._image_tag = await ensure_executor_image(self.image, self.packages)
+        except Exception as e:
+            logging.getLogger("code_executor_pool").warning(
+                f"Could not build executor image with packages, using {self.image}: {e}"
+            )
+            self._image_tag = self.image
+        return self._image_tag
+
+    async def _image(self) -> str:
+        # one build shared by all callers; a caller that gives up waiting does not cancel it
+        if self._image_build is None:
+            self._image_build = self._spawn(self._build_image())
+        return await asyncio.shield(self._image_build)
+
+    async def _create(self) -> PooledExecutor:
+        from autogen_ext.code_executors.docker import DockerCommandLineCodeExecutor
+
+        name = f"magentic-exec-{uuid.uuid4().hex[:12]}"
+        work_dir = os.path.join(self.base_dir, name)
+        os.makedirs(work_dir, exist_ok=True)
+        executor = DockerCommandLineCodeExecutor(
+            image=await self._image(),
+            container_name=name,
+            work_dir=work_dir,
+            timeout=self.timeout,
+        )
+        try:
+            await executor.start()
+        except Exception:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise
+        self.created += 1
+        return PooledExecutor(executor, work_dir)
+
+    async def start(self) -> None:
+        """Pre-start ``min_idle`` containers."""
+        self._ensure_loop_state()
+        await self._fill()
+
+    async def _fill(self) -> None:
+        while not self._closed and len(self._idle) + self._starting < self.min_idle and self.size < self.max_size:
+            self._starting += 1
+            try:
+                pooled = await self._create()
+            except Exception as e:
+                logging.getLogger("code_executor_pool").warning(f"Failed to pre-start executor container: {e}")
+                self._fill_failed = True
+                return
+            finally:
+                self._starting -= 1
+            async with self._condition:
+                self._idle.append(pooled)
+                self._condition.notify()
+
+    async def acquire(self, session_id: str) -> "DockerCommandLineCodeExecutor":
+        """Lease a running executor to ``session_id``, waiting up to ``acquire_timeout`` if the pool is at ``max_size``."""
+        self._ensure_loop_state()
+        started = time.monotonic()
+        async with self._condition:
+            while not self._idle and self.size >= self.max_size:
+                remaining = self.acquire_timeout - (time.monotonic() - started)
+                try:
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError
+                    await asyncio.wait_for(self._condition.wait(), remaining)
+                except asyncio.TimeoutError:
+                    raise TimeoutError(
+                        f"No code executor container became free within {self.acquire_timeout:g}s "
+                        f"({len(self._leased)} of {self.max_size} leased); raise CODE_EXECUTOR_POOL_SIZE "
+                        f"or CODE_EXECUTOR_ACQUIRE_TIMEOUT"
+                    ) from None
+            pooled = self._idle.pop() if self._idle else None
+            if pooled is None:
+                self._starting += 1
+        if pooled is None:
+            try:
+                remaining = self.acquire_timeout - (time.monotonic() - started)
+                try:
+                    await asyncio.wait_for(self._image(), max(0.0, remaining))
+                except asyncio.TimeoutError:
+                    raise TimeoutError(
+                        f"The code executor image was not ready within {self.acquire_timeout:g}s; it is still "
+                        f"being built, raise CODE_EXECUTOR_ACQUIRE_TIMEOUT or pre-build it"
+                    ) from None
+                pooled = await self._create()
+            finally:
+                self._starting -= 1
+        else:
+            self.reused += 1
+        pooled.session_id = session_id
+        pooled.uses += 1
+        self._leased[session_id] = pooled
+        self.total_wait += time.monotonic() - started
+        # Keep a warm container ready for the next session.
+        self._fill_failed = False
+        self._spawn(self._fill())
+        return pooled.executor
+
+    async def release(self, session_id: str) -> None:
+        """Return the session's executor to the pool, or discard it if it is no longer healthy."""
+        pooled = self._leased.pop(session_id, None)
+        if pooled is None:
+            return
+        pooled.session_id = None
+        keep = not self._closed
+        if keep:
+            try:
+                await pooled.reset()
+                keep = await pooled.healthy()
+            except Exception as e:
+                logging.getLogger("code_executor_pool").warning(f"Reset of {pooled.executor.container_name} failed: {e}")
+                keep = False
+        if not keep:
+            self.discarded += 1
+            await pooled.stop()
+        async with self._condition:
+            if keep:
+                pooled.idle_since = time.monotonic()
+                self._idle.append(pooled)
+            self._condition.notify()
+
+    async def _maintain(self) -> None:
+        while not self._closed:
+            await asyncio.sleep(min(30.0, max(1.0, self.idle_ttl / 2)))
+            now = time.monotonic()
+            expired = []
+            async with self._condition:
+                # Oldest idle containers first; always keep min_idle warm.
+                self._idle.sort(key=lambda p: p.idle_since)
+                while len(self._idle) > self.min_idle and now - self._idle[0].idle_since > self.idle_ttl:
+                    expired.append(self._idle.pop(0))
+            for pooled in expired:
+                await pooled.stop()
+            unhealthy = [p for p in list(self._idle) if not await p.healthy()]
+            for pooled in unhealthy:
+                if pooled in self._idle:
+                    self._idle.remove(pooled)
+                    self.discarded += 1
+                    await pooled.stop()
+            if not self._fill_failed:
+                await self._fill()
+
+    def stats(self) -> dict:
+        return {
+            "image": self._image_tag or self.image,
+            "max_size": self.max_size,
+            "min_idle": self.min_idle,
+            "idle": len(self._idle),
+            "leased": len(self._leased),
+            "starting": self._starting,
+            "created": self.created,
+            "reused": self.reused,
+            "discarded": self.discarded,
+            "avg_acquire_wait": round(self.total_wait / max(1, self.created + self.reused), 3),
+        }
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._maintainer is not None:
+            self._maintainer.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        for pooled in self._idle + list(self._leased.values()):
+            await pooled.stop()
+        self._idle.clear()
+        self._leased.clear()
+
+
+_pool: Optional[CodeExecutorPool] = None
+
+
+def executor_pool_enabled() -> bool:
+    return os.getenv("CODE_EXECUTOR_POOL", "true").lower() == "true"
+
+
+def get_executor_pool() -> CodeExecutorPool:
+    global _pool
+    if _pool is None:
+        _pool = CodeExecutorPool(
+            image=os.getenv("CODE_EXECUTOR_IMAGE", "python:3-slim"),
+            packages=os.getenv("CODE_EXECUTOR_PACKAGES", DEFAULT_PACKAGES),
+            max_size=int(os.getenv("CODE_EXECUTOR_POOL_SIZE", 4)),
+            min_idle=int(os.getenv("CODE_EXECUTOR_POOL_MIN_IDLE", 1)),
+            idle_ttl=float(os.getenv("CODE_EXECUTOR_IDLE_TTL", 600)),
+            base_dir=os.getenv("CODE_EXECUTOR_WORK_DIR", "./.cache/executors"),
+            timeout=int(os.getenv("CODE_EXECUTOR_TIMEOUT", 60)),
+            acquire_timeout=float(os.getenv("CODE_EXECUTOR_ACQUIRE_TIMEOUT", 120)),
+        )
+    return _pool
@@ -0,0 +1,299 @@
+import hashlib
+import logging
+import os
+from typing import Any, AsyncGenerator, Awaitable, Callable, List, Mapping, Optional, Sequence, Tuple
+
+from autogen_core import FunctionCall, Image
+from autogen_core.models import (
+    AssistantMessage,
+    CreateResult,
+    FunctionExecutionResultMessage,
+    LLMMessage,
+    SystemMessage,
+    UserMessage,
+)
+
+from metrics import CONTEXT_COMPACTIONS_TOTAL, CONTEXT_TOKENS_REMOVED_TOTAL
+from model_clients import DelegatingChatCompletionClient
+from model_routing import routing_role
+
+SUMMARY_SOURCE = "ContextCompaction"
+
+# Rough token estimate without a tokenizer (local models use different ones anyway)
+_CHARS_PER_TOKEN = 4
+_MESSAGE_TOKENS = 4
+_IMAGE_TOKENS = 800
+
+
+def _text_tokens(text: str) -> int:
+    return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+
+
+def message_tokens(message: LLMMessage) -> int:
+    content = message.content
+    if isinstance(content, str):
+        return _text_tokens(content) + _MESSAGE_TOKENS
+    tokens = _MESSAGE_TOKENS
+    for part in content:
+        if isinstance(part, str):
+            tokens += _text_tokens(part)
+        elif isinstance(part, Image):
+            tokens += _IMAGE_TOKENS
+        elif isinstance(part, FunctionCall):
+            tokens += _text_tokens(part.name) + _text_tokens(part.arguments)
+        else:
+            tokens += _text_tokens(str(getattr(part, "content", part)))
+    return tokens
+
+
+def estimate_tokens(messages: Sequence[LLMMessage]) -> int:
+    return sum(message_tokens(m) for m in messages)
+
+
+def _digest(messages: Sequence[LLMMessage]) -> str:
+    h = hashlib.sha256()
+    for message in messages:
+        h.update(message.model_dump_json().encode("utf-8"))
+    return h.hexdigest()
+
+
+def _kind(text: str) -> str:
+    lines = text.strip().splitlines()[:20]
+    if len(lines) > 3 and len({line.count(",") for line in lines}) == 1 and lines[0].count(",") > 0:
+        return "CSV data"
+    if text.lstrip().startswith("#") or "](" in text:
+        return "page markdown"
+    return "output"
+
+
+async def summarize(text: str, client, instruction: str, prompt: str = "You are a project manager.") -> str:
+    """Ask ``client`` to summarize ``text`` following ``instruction``."""
+    messages = [
+        SystemMessage(content=prompt),
+        UserMessage(content=f"{instruction}\n\n{text}", source="user"),
+    ]
+    result = await client.create(messages)
+    return result.content if isinstance(result.content, str) else str(result.content)
+
+
+class ContextPolicy:
+    """Token budget for the prompts of one agent.
+
+    ``max_tokens`` is the prompt size compaction brings requests under
+    (``None`` disables it). The last ``keep_recent`` messages are kept as
+    they are while older ones are compacted; older tool outputs and page
+    contents over ``tool_output_tokens`` become short references, and
+    ``summary_tokens`` bounds the summary of older turns.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, keep_recent: int = 6, tool_output_tokens: int = 400,
+                 summary_tokens: int = 500):
+        self.max_tokens = max_tokens
+        self.keep_recent = keep_recent
+        self.tool_output_tokens = tool_output_tokens
+        self.summary_tokens = summary_tokens
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_tokens is not None
+
+    @classmethod
+    def from_config(cls, config: Optional[Mapping[str, Any]] = None, agent_name: Optional[str] = None) -> "ContextPolicy":
+        """Build the policy of ``agent_name`` from a team definition's ``context`` block.
+
+        Settings under ``agents.<name>`` override the team-wide ones, and keys
+        missing from both fall back to the ``CONTEXT_*`` environment variables.
+        """
+        config = dict(config or {})
+        overrides = (config.pop("agents", None) or {}).get(agent_name) or {}
+        merged = {**config, **overrides}
+
+        def pick(key: str, env: str, default: int) -> int:
+            value = merged.get(key)
+            if value is None or value == "":
+                value = os.getenv(env, "").strip() or default
+            return int(value)
+
+        # off unless the team or CONTEXT_MAX_TOKENS sets a budget
+        max_tokens = pick("max_tokens", "CONTEXT_MAX_TOKENS", 0)
+        return cls(
+            max_tokens=max_tokens if max_tokens > 0 else None,
+            keep_recent=pick("keep_recent", "CONTEXT_KEEP_RECENT", 6),
+            tool_output_tokens=pick("tool_output_tokens", "CONTEXT_TOOL_OUTPUT_TOKENS", 400),
+            summary_tokens=pick("summary_tokens", "CONTEXT_SUMMARY_TOKENS", 500),
+        )
+
+
+class ContextCompactor:
+    """Fits a prompt into a ``ContextPolicy`` budget.
+
+    Prompts under budget are sent unchanged. Otherwise, in order, until the
+    prompt fits:
+
+    1. bulky contents (tool results, CSV dumps, page markdown, images) of
+       messages older than the recent window become references,
+    2. the oldest messages are replaced by a summary written by
+       ``summarizer`` (down to half the budget, so the summary is not
+       redone on every request),
+    3. bulky contents of the recent messages, except the last one, become
+       references too.
+
+    Agents resend their whole history with every request, so the summary is
+    kept with a digest of the messages it covers and reused, extended with
+    the next messages when needed, for as long as the history starts with
+    them. The history itself is never modified.
+    """
+
+    def __init__(self, policy: ContextPolicy, summarizer: Callable[[str, Optional[str]], Awaitable[str]],
+                 agent_name: str = ""):
+        self.policy = policy
+        self.agent_name = agent_name
+        self._summarizer = summarizer
+        # (messages covered, digest of those messages, summary)
+        self._summary: Optional[Tuple[int, str, str]] = None
+        self.stats = {"requests": 0, "compacted": 0, "tokens_in": 0, "tokens_out": 0, "summaries": 0, "truncated": 0}
+
+    async def compact(self, messages: Sequence[LLMMessage]) -> List[LLMMessage]:
+        messages = list(messages)
+        tokens = estimate_tokens(messages)
+        self.stats["requests"] += 1
+        self.stats["tokens_in"] += tokens
+        if not self.policy.enabled or tokens <= self.policy.max_tokens:
+            self.stats["tokens_out"] += tokens
+            return messages
+
+        n_head = 0
+        while n_head < len(messages) and isinstance(messages[n_head], SystemMessage):
+            n_head += 1
+        head, body = messages[:n_head], messages[n_head:]
+        recent = self._turn_start(body, max(0, len(body) - self.policy.keep_recent))
+
+        body = [self._shorten(m) for m in body[:recent]] + body[recent:]
+        if estimate_tokens(head) + estimate_tokens(body) > self.policy.max_tokens:
+            body = await self._summarize(head, body, recent)
+        if estimate_tokens(head) + estimate_tokens(body) > self.policy.max_tokens:
+            body = [
+                m if getattr(m, "source", None) == SUMMARY_SOURCE else self._shorten(m) for m in body[:-1]
+            ] + body[-1:]
+
+        compacted = head + body
+        self.stats["compacted"] += 1
+        self.stats["tokens_out"] += estimate_tokens(compacted)
+        CONTEXT_COMPACTIONS_TOTAL.inc(agent=self.agent_name)
+        CONTEXT_TOKENS_REMOVED_TOTAL.inc(tokens - estimate_tokens(compacted), agent=self.agent_name)
+        return compacted
+
+    @staticmethod
+    def _turn_start(body: List[LLMMessage], index: int) -> int:
+        # tool results must stay right after the assistant message that called the tools
+        while 0 < index < len(body) and isinstance(body[index], FunctionExecutionResultMessage):
+            index -= 1
+        return index
+
+    def _reference(self, text: str) -> str:
+        limit = self.policy.tool_output_tokens * _CHARS_PER_TOKEN
+        if len(text) <= limit:
+            return text
+        self.stats["truncated"] += 1
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+        return (f"{text[:limit // 2].rstrip()}\n[... {_kind(text)} truncated: {len(text)} characters, "
+                f"about {_text_tokens(text)} tokens; reference {digest}, full text in the session log]")
+
+    def _shorten(self, message: LLMMessage) -> LLMMessage:
+        if isinstance(message, FunctionExecutionResultMessage):
+            results = [r.model_copy(update={"content": self._reference(r.content)}) for r in message.content]
+            return message.model_copy(update={"content": results})
+        if isinstance(message, (UserMessage, AssistantMessage)):
+            if isinstance(message.content, str):
+                return message.model_copy(update={"content": self._reference(message.content)})
+            if isinstance(message, UserMessage):
+                parts = [self._reference(p) if isinstance(p, str) else "[image omitted]" for p in message.content]
+                return message.model_copy(update={"content": parts})
+        return message
+
+    def _render(self, messages: Sequence[LLMMessage]) -> str:
+        limit = self.policy.tool_output_tokens * _CHARS_PER_TOKEN
+        lines = []
+        for message in messages:
+            who = getattr(message, "source", None) or type(message).__name__
+            content = message.content
+            if isinstance(message, FunctionExecutionResultMessage):
+                text = "\n".join(f"result of {r.name or 'tool'}: {r.content[:limit]}" for r in content)
+            elif isinstance(content, str):
+                text = content[:limit]
+            else:
+                text = " ".join(
+                    f"called {p.name}({p.arguments[:200]})" if isinstance(p, FunctionCall)
+                    else p[:limit] if isinstance(p, str) else "[image]"
+                    for p in content
+                )
+            lines.append(f"{who}: {text}")
+        return "\n\n".join(lines)[: self.policy.max_tokens * _CHARS_PER_TOKEN]
+
+    async def _summarize(self, head: List[LLMMessage], body: List[LLMMessage], recent: int) -> List[LLMMessage]:
+        covered, summary = 0, None
+        if self._summary is not None:
+            count, digest, text = self._summary
+            if count <= recent and _digest(body[:count]) == digest:
+                covered, summary = count, text
+
+        available = self.policy.max_tokens - estimate_tokens(head) - self.policy.summary_tokens
+        end, remaining = covered, estimate_tokens(body[covered:])
+        if remaining > available:
+            # fold the oldest messages into the summary until the rest takes half the budget
+            while end < recent and remaining > available // 2:
+                remaining -= message_tokens(body[end])
+                end += 1
+            while end < recent and isinstance(body[end], FunctionExecutionResultMessage):
+                end += 1
+
+        if end > covered:
+            try:
+                summary = await self._summarizer(self._render(body[covered:end]), summary)
+                self.stats["summaries"] += 1
+            except Exception as e:
+                logging.getLogger("context_compaction").warning(f"Could not summarize {self.agent_name} history: {e}")
+                omitted = f"[{end - covered} earlier messages omitted]"
+                summary = f"{summary}\n{omitted}" if summary else omitted
+            self._summary = (end, _digest(body[:end]), summary)
+            covered = end
+        if not covered:
+            return body
+        note = UserMessage(
+            content=f"Summary of the earlier conversation (older messages were compacted):\n{summary}",
+            source=SUMMARY_SOURCE,
+        )
+        return [note] + body[covered:]
+
+
+class CompactingChatCompletionClient(DelegatingChatCompletionClient):
+    """Chat client that compacts every prompt to the agent's ``ContextPolicy`` before sending it.
+
+    Summaries are written by the wrapped client (on the ``summary`` route
+    when the team routes one), so they are scheduled and charged to the
+    session budget like the agent's own requests.
+    """
+
+    def __init__(self, inner, policy: ContextPolicy, agent_name: str = ""):
+        super().__init__(inner)
+        self.compactor = ContextCompactor(policy, self._summarize, agent_name=agent_name)
+
+    async def _summarize(self, text: str, previous: Optional[str]) -> str:
+        words = self.compactor.policy.summary_tokens * 3 // 4
+        instruction = (
+            "Summarize the conversation below for the agents who continue the task, as single-level bullet points: "
+            "what was asked, decisions, facts and figures found, tool results and open questions. Keep names, "
+            f"numbers, file paths and URLs exactly as written. Use at most {words} words."
+        )
+        if previous:
+            text = f"Summary so far:\n{previous}\n\nLater messages:\n{text}"
+        with routing_role("summary"):
+            return await summarize(text, self._inner, instruction)
+
+    async def create(self, messages, **kwargs) -> CreateResult:
+        return await self._inner.create(await self.compactor.compact(messages), **kwargs)
+
+    async def create_stream(self, messages, **kwargs) -> AsyncGenerator:
+        compacted = await self.compactor.compact(messages)
+        async for chunk in self._inner.create_stream(compacted, **kwargs):
+            yield chunk
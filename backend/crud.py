@@ -1,8 +1,11 @@
 # File: crud.py
-import os, json, uuid
+import os, json, uuid, hashlib, shutil
 from datetime import datetime
 from typing import List
 
+from metrics import PERSISTENCE_WRITE_SECONDS, timed
+from tracing import traced
+
 DATA_DIR = "./data/conversations"
 
 def ensure_data_dir():
@@ -15,7 +18,9 @@ def get_conversation_filepath(user_id: str, session_id: str) -> str:
     return os.path.join(DATA_DIR, f"{user_id}_{session_id}.json")
 
 # Save a message to a conversation JSON file.
-def save_message(id: str, user_id: str, session_id: str, message: dict, agents: dict, run_mode_locally: bool, timestamp: str):
+@timed(PERSISTENCE_WRITE_SECONDS, operation="save_message")
+@traced("persistence.write", operation="save_message")
+def save_message(id: str, user_id: str, session_id: str, message: dict, agents: dict, run_mode_locally: bool, timestamp: str, team_config: dict = None, priority: str = None):
     filepath = get_conversation_filepath(user_id, session_id)
     if os.path.exists(filepath):
         with open(filepath, "r") as f:
@@ -28,7 +33,9 @@ def save_message(id: str, user_id: str, session_id: str, message: dict, agents:
             "messages": [],
             "agents": agents,
             "run_mode_locally": run_mode_locally,
-            "timestamp": timestamp
+            "timestamp": timestamp,
+            "team_config": team_config or {},
+            "priority": priority or "interactive"
         }
     # Append message with timestamp
     # message["id"] = str(uuid.uuid4())
@@ -88,7 +95,136 @@ def get_user_conversations(user_id: str):
 
 def delete_conversation(user_id: str, session_id: str) -> bool:
     filepath = get_conversation_filepath(user_id, session_id)
+    delete_checkpoint(user_id, session_id)
     if os.path.exists(filepath):
         os.remove(filepath)
         return True
-    return False
\ No newline at end of file
+    return False
+
+# ---------------------------------------------------------------------------
+# Team state checkpoints
+# ---------------------------------------------------------------------------
+# A checkpoint is a small manifest plus content-addressed blobs. Every dict
+# inside a list of the team state (i.e. each message of a message thread or
+# model context) is stored once as its own blob, so a new checkpoint only
+# writes the messages added since the previous round.
+
+CHECKPOINT_DIR = os.path.join(DATA_DIR, "checkpoints")
+
+# Ids come from request parameters: refuse any that would leave CHECKPOINT_DIR
+# or name another session's directory (separators, "..").
+def _checkpoint_path(user_id: str, session_id: str) -> str:
+    name = f"{user_id}_{session_id}"
+    path = os.path.join(CHECKPOINT_DIR, name)
+    real = os.path.realpath(path)
+    if os.path.basename(real) != name or os.path.dirname(real) != os.path.realpath(CHECKPOINT_DIR):
+        raise ValueError(f"Invalid checkpoint id: {name!r}")
+    return path
+
+def get_checkpoint_dir(user_id: str, session_id: str) -> str:
+    path = _checkpoint_path(user_id, session_id)
+    os.makedirs(os.path.join(path, "blobs"), exist_ok=True)
+    return path
+
+def _write_atomic(path: str, data: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _externalize(obj, blobs_dir: str, written: list):
+    if isinstance(obj, dict):
+        return {k: _externalize(v, blobs_dir, written) for k, v in obj.items()}
+    if isinstance(obj, list):
+        refs = []
+        for item in obj:
+            if isinstance(item, dict):
+                data = json.dumps(item, sort_keys=True, default=str)
+                digest = hashlib.sha256(data.encode("utf-8")).hexdigest()
+                blob_path = os.path.join(blobs_dir, f"{digest}.json")
+                if not os.path.exists(blob_path):
+                    _write_atomic(blob_path, data)
+                    written.append(digest)
+                refs.append({"$blob": digest})
+            else:
+                refs.append(_externalize(item, blobs_dir, written))
+        return refs
+    return obj
+
+def _internalize(obj, blobs_dir: str):
+    if isinstance(obj, dict):
+        if set(obj) == {"$blob"}:
+            with open(os.path.join(blobs_dir, f"{obj['$blob']}.json"), "r") as f:
+                return json.load(f)
+        return {k: _internalize(v, blobs_dir) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_internalize(item, blobs_dir) for item in obj]
+    return obj
+
+# Save a team state checkpoint; returns the number of new blobs written.
+@timed(PERSISTENCE_WRITE_SECONDS, operation="save_checkpoint")
+@traced("persistence.write", operation="save_checkpoint")
+def save_checkpoint(user_id: str, session_id: str, round_no: int, state: dict, metadata: dict = None) -> int:
+    path = get_checkpoint_dir(user_id, session_id)
+    written = []
+    manifest = {
+        "round": round_no,
+        "saved_at": datetime.now().isoformat(),
+        "completed": False,
+        "metadata": metadata or {},
+        "state": _externalize(state, os.path.join(path, "blobs"), written),
+    }
+    _write_atomic(os.path.join(path, "manifest.json"), json.dumps(manifest, default=str))
+    return len(written)
+
+# Load the latest checkpoint (manifest fields plus the restored "state"), or None.
+def load_checkpoint(user_id: str, session_id: str):
+    manifest_path = os.path.join(_checkpoint_path(user_id, session_id), "manifest.json")
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+    manifest["state"] = _internalize(manifest["state"], os.path.join(os.path.dirname(manifest_path), "blobs"))
+    return manifest
+
+@timed(PERSISTENCE_WRITE_SECONDS, operation="mark_checkpoint_completed")
+@traced("persistence.write", operation="mark_checkpoint_completed")
+def mark_checkpoint_completed(user_id: str, session_id: str):
+    manifest_path = os.path.join(_checkpoint_path(user_id, session_id), "manifest.json")
+    if not os.path.exists(manifest_path):
+        return
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+    manifest["completed"] = True
+    _write_atomic(manifest_path, json.dumps(manifest))
+    _collect_blobs(os.path.dirname(manifest_path), manifest["state"])
+
+def _blob_refs(obj, refs: set) -> set:
+    if isinstance(obj, dict):
+        if set(obj) == {"$blob"}:
+            refs.add(obj["$blob"])
+        for v in obj.values():
+            _blob_refs(v, refs)
+    elif isinstance(obj, list):
+        for item in obj:
+            _blob_refs(item, refs)
+    return refs
+
+# Remove the blobs of earlier rounds that the manifest no longer references
+# (e.g. model contexts cleared by a re-plan).
+def _collect_blobs(path: str, state) -> int:
+    blobs_dir = os.path.join(path, "blobs")
+    referenced = _blob_refs(state, set())
+    removed = 0
+    for fname in os.listdir(blobs_dir):
+        if fname.endswith(".json") and fname[:-len(".json")] not in referenced:
+            os.remove(os.path.join(blobs_dir, fname))
+            removed += 1
+    return removed
+
+def delete_checkpoint(user_id: str, session_id: str) -> bool:
+    path = _checkpoint_path(user_id, session_id)
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+        return True
+    return False
@@ -7,6 +7,9 @@ from bson import ObjectId
 import time
 import logging
 from math import ceil
+
+from metrics import PERSISTENCE_WRITE_SECONDS, timed
+from tracing import traced
 # Remove ALL old agentchat imports!
 # from autogen_agentchat.base import TaskResult
 # from autogen_agentchat.messages import ...
@@ -62,6 +65,8 @@ class CosmosDB:
         self.containers[name] = container
         return container
 
+    @timed(PERSISTENCE_WRITE_SECONDS, operation="store_conversation")
+    @traced("persistence.write", operation="store_conversation")
     def store_conversation(self, conversation: dict, conversation_details: dict, conversation_dict: dict):
         """
         Store a conversation (all dict-based, no TaskResult).
@@ -135,6 +140,9 @@ class CosmosDB:
             "page": page,
             "total_pages": total_pages
         }
+
+    @timed(PERSISTENCE_WRITE_SECONDS, operation="create_team")
+    @traced("persistence.write", operation="create_team")
     def create_team(self, team: dict):
         container = self.get_container("agent_teams")
         if self.use_local:
@@ -169,6 +177,8 @@ class CosmosDB:
         results = list(container.query_items(query=query, parameters=params, enable_cross_partition_query=True))
         return results[0] if results else None
 
+    @timed(PERSISTENCE_WRITE_SECONDS, operation="update_team")
+    @traced("persistence.write", operation="update_team")
     def update_team(self, team_id: str, team: dict):
         container = self.get_container("agent_teams")
         existing_team = self.get_team(team_id)
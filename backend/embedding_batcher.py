@@ -0,0 +1,176 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence, Set, Tuple
+
+from metrics import EMBEDDING_BATCH_SIZE, EMBEDDING_REQUEST_SECONDS, EMBEDDING_WAIT_SECONDS
+
+
+class _Request:
+    """One ``embed()`` call: its texts, the vectors received so far and the future its caller awaits."""
+
+    def __init__(self, texts: Sequence[str], future: asyncio.Future):
+        self.texts = list(texts)
+        self.vectors: List[Optional[List[float]]] = [None] * len(self.texts)
+        self.missing = len(self.texts)
+        self.future = future
+        self.queued = time.perf_counter()
+        self.sent = False
+
+
+class _ModelQueue:
+    """Texts waiting for one model, and the requests to it in flight."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, slots: int):
+        self.loop = loop
+        # (request, index of its first text not sent yet)
+        self.parts: Deque[Tuple[_Request, int]] = deque()
+        self.size = 0
+        self.full = asyncio.Event()
+        self.slots = asyncio.Semaphore(slots)
+        self.worker: Optional[asyncio.Task] = None
+        self.sending: Set[asyncio.Task] = set()
+
+
+class EmbeddingBatcher:
+    """Batches the embedding requests of all sessions of the process.
+
+    ``embed()`` calls for the same model that arrive within ``max_wait``
+    seconds of each other are sent as one request of up to ``max_batch``
+    texts; larger calls (index builds) are split over several requests. At
+    most ``max_concurrency`` requests per model are in flight (LiteLLM serves
+    the local models one request at a time), and calls arriving meanwhile
+    join the next batch. Every caller gets the vectors of its own texts, or
+    the error of the request that carried them.
+    """
+
+    def __init__(self, client=None, max_batch: int = 64, max_wait: float = 0.005, max_concurrency: int = 1):
+        self._client = client
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait)
+        self.max_concurrency = max(1, max_concurrency)
+        self._queues: Dict[str, _ModelQueue] = {}
+
+    @property
+    def client(self):
+        # the OpenAI client of llm_config, created on first use
+        if self._client is None:
+            from llm_config import build_embedding_client
+
+            self._client = build_embedding_client()
+        return self._client
+
+    @classmethod
+    def from_env(cls, client=None) -> "EmbeddingBatcher":
+        return cls(
+            client,
+            max_batch=int(os.getenv("EMBEDDING_BATCH_SIZE", 64)),
+            max_wait=float(os.getenv("EMBEDDING_BATCH_WAIT_MS", 5)) / 1000,
+            max_concurrency=int(os.getenv("EMBEDDING_MAX_CONCURRENCY", 1)),
+        )
+
+    async def embed(self, texts: Sequence[str], model: str) -> List[List[float]]:
+        """Vectors of ``texts``, in order, embedded with ``model``."""
+        if not texts:
+            return []
+        loop = asyncio.get_running_loop()
+        queue = self._queues.get(model)
+        if queue is None or queue.loop is not loop:
+            queue = self._queues[model] = _ModelQueue(loop, self.max_concurrency)
+        request = _Request(texts, loop.create_future())
+        queue.parts.append((request, 0))
+        queue.size += len(request.texts)
+        if queue.size >= self.max_batch:
+            queue.full.set()
+        if queue.worker is None or queue.worker.done():
+            queue.worker = loop.create_task(self._run(model, queue))
+        return await request.future
+
+    @staticmethod
+    def _vectors(response, texts: Sequence[str]) -> List[List[float]]:
+        vectors = [d.embedding for d in response.data]
+        if len(vectors) != len(texts):
+            raise RuntimeError(f"Embedding request for {len(texts)} texts returned {len(vectors)} vectors")
+        return vectors
+
+    async def _run(self, model: str, queue: _ModelQueue) -> None:
+        while queue.parts:
+            if queue.size < self.max_batch and self.max_wait:
+                # give concurrent callers the time to join the batch
+                try:
+                    await asyncio.wait_for(queue.full.wait(), self.max_wait)
+                except asyncio.TimeoutError:
+                    pass
+            await queue.slots.acquire()
+            batch = self._take(queue)
+            if not batch:
+                queue.slots.release()
+                continue
+            task = asyncio.create_task(self._send(model, queue, batch))
+            queue.sending.add(task)
+            task.add_done_callback(queue.sending.discard)
+
+    def _take(self, queue: _ModelQueue) -> List[Tuple[_Request, int, int]]:
+        """Up to ``max_batch`` queued texts, as (request, first text, count) slices."""
+        batch = []
+        room = self.max_batch
+        while queue.parts and room:
+            request, start = queue.parts.popleft()
+            left = len(request.texts) - start
+            if request.future.done():
+                # the caller was cancelled or an earlier part failed
+                queue.size -= left
+                continue
+            count = min(room, left)
+            batch.append((request, start, count))
+            if count < left:
+                queue.parts.appendleft((request, start + count))
+            queue.size -= count
+            room -= count
+        if queue.size < self.max_batch:
+            queue.full.clear()
+        return batch
+
+    async def _send(self, model: str, queue: _ModelQueue, batch: List[Tuple[_Request, int, int]]) -> None:
+        texts = [text for request, start, count in batch for text in request.texts[start:start + count]]
+        started = time.perf_counter()
+        for request, _, _ in batch:
+            if not request.sent:
+                request.sent = True
+                EMBEDDING_WAIT_SECONDS.observe(started - request.queued, model=model)
+        try:
+            response = await asyncio.to_thread(self.client.embeddings.create, input=texts, model=model)
+            vectors = self._vectors(response, texts)
+        except Exception as e:
+            for request, _, _ in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+        finally:
+            EMBEDDING_REQUEST_SECONDS.observe(time.perf_counter() - started, model=model)
+            queue.slots.release()
+        EMBEDDING_BATCH_SIZE.observe(len(texts), model=model)
+        offset = 0
+        for request, start, count in batch:
+            request.vectors[start:start + count] = vectors[offset:offset + count]
+            offset += count
+            request.missing -= count
+            if not request.missing and not request.future.done():
+                request.future.set_result(request.vectors)
+
+
+_batcher: Optional[EmbeddingBatcher] = None
+
+
+def get_embedding_batcher() -> EmbeddingBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = EmbeddingBatcher.from_env()
+    return _batcher
+
+
+def set_embedding_batcher(batcher) -> None:
+    """Replace the process-wide batcher (session workers use one that sends texts to the API process)."""
+    global _batcher
+    _batcher = batcher
@@ -0,0 +1,275 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from autogen_core.models import CreateResult, RequestUsage
+
+from model_clients import DelegatingChatCompletionClient
+
+# off        - no caching
+# read_write - serve hits, store misses
+# record     - always call the model and (re)store the result
+# replay     - serve hits only; a miss is an error (no live model needed)
+CACHE_MODES = ("off", "read_write", "record", "replay")
+
+
+class CacheMissError(RuntimeError):
+    """Raised in replay mode when a prompt has no recorded completion."""
+
+
+def _json_default(obj):
+    if hasattr(obj, "to_base64"):
+        return obj.to_base64()  # autogen_core.Image
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    return str(obj)
+
+
+def _dump(obj):
+    if hasattr(obj, "model_dump"):
+        try:
+            return obj.model_dump(mode="json")
+        except Exception:
+            return obj.model_dump()
+    return obj
+
+
+def cache_key(model: str, messages, tools=(), json_output=None, extra_create_args=None, create_args=None) -> str:
+    """Canonical hash of everything that determines a completion."""
+    tool_schemas = []
+    for tool in tools:
+        tool_schemas.append(tool.schema if hasattr(tool, "schema") else tool)
+    extra_create_args = dict(extra_create_args or {})
+    create_args = dict(create_args or {})
+    payload = {
+        "model": model,
+        "messages": [_dump(m) for m in messages],
+        "tools": tool_schemas,
+        "json_output": json_output if json_output is None or isinstance(json_output, bool) else json_output.__name__,
+        "temperature": extra_create_args.pop("temperature", create_args.get("temperature")),
+        "extra_create_args": extra_create_args,
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=_json_default)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """One JSON file per entry with TTL expiry and LRU eviction by total size.
+
+    The directory is shared by the processes of the backend (session workers,
+    uvicorn workers), so the files are the source of truth: a read touches
+    the entry's mtime (its LRU position), and the size index used for eviction
+    is rebuilt from disk on the first write, every ``rescan_interval`` seconds,
+    after this process wrote a tenth of ``max_bytes`` and whenever its count
+    goes over ``max_bytes``, so the directory overshoots the limit by at most
+    what the other processes wrote since. Methods do blocking file I/O; async
+    callers run them in a thread.
+    """
+
+    def __init__(self, cache_dir: str, ttl: Optional[float] = None, max_bytes: Optional[int] = None,
+                 rescan_interval: float = 10.0):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.rescan_interval = rescan_interval
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # path -> (size, last access) as of the last scan, plus this process's writes since
+        self._index = {}
+        self._size = 0
+        self._written = 0  # bytes written since the last scan
+        self._scanned_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _scan(self) -> None:
+        index = {}
+        for root, _, files in os.walk(self.cache_dir):
+            for fname in files:
+                if fname.endswith(".json"):
+                    path = os.path.join(root, fname)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue  # evicted by another process meanwhile
+                    index[path] = (st.st_size, st.st_mtime)
+        with self._lock:
+            self._index = index
+            self._size = sum(size for size, _ in index.values())
+            self._written = 0
+            self._scanned_at = time.monotonic()
+
+    def get(self, key: str, ignore_ttl: bool = False) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError):
+            self._remove(path)
+            return None
+        if not ignore_ttl and self.ttl is not None and time.time() - entry.get("created_at", 0) > self.ttl:
+            self._remove(path)
+            return None
+        now = time.time()
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        with self._lock:
+            if path in self._index:
+                self._index[path] = (self._index[path][0], now)
+        return entry
+
+    def put(self, key: str, entry: dict) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(entry, default=_json_default)
+        # unique per writer: other threads and processes may store the same key
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        size = len(data.encode("utf-8"))
+        with self._lock:
+            if path in self._index:
+                self._size -= self._index[path][0]
+            self._index[path] = (size, time.time())
+            self._size += size
+            self._written += size
+            stale = self._scanned_at is None or time.monotonic() - self._scanned_at > self.rescan_interval
+            over = self.max_bytes is not None and (
+                self._size > self.max_bytes or self._written > self.max_bytes / 10)
+        if stale or over:
+            self._scan()
+        self._evict()
+
+    def _remove(self, path: str) -> None:
+        with self._lock:
+            size, _ = self._index.pop(path, (0, 0))
+            self._size -= size
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        if self.max_bytes is None:
+            return
+        with self._lock:
+            if self._size <= self.max_bytes:
+                return
+            oldest_first = sorted(self._index.items(), key=lambda item: item[1][1])
+        for path, _ in oldest_first:
+            if self._size <= self.max_bytes:
+                break
+            self._remove(path)
+
+    def stats(self) -> dict:
+        if self._scanned_at is None:
+            self._scan()
+        return {"entries": len(self._index), "bytes": self._size, "max_bytes": self.max_bytes, "ttl": self.ttl}
+
+
+class CachedChatCompletionClient(DelegatingChatCompletionClient):
+    """Exact-match completion cache in front of a chat client."""
+
+    hits = 0
+    misses = 0
+
+    def __init__(self, inner, model: str, store: DiskCache, mode: str = "read_write"):
+        super().__init__(inner)
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown LLM cache mode: {mode}")
+        self._model = model
+        self._store = store
+        self._mode = mode
+
+    def _key(self, messages, kwargs) -> str:
+        return cache_key(
+            self._model,
+            messages,
+            tools=kwargs.get("tools", []),
+            json_output=kwargs.get("json_output"),
+            extra_create_args=kwargs.get("extra_create_args", {}),
+            create_args=getattr(self._inner, "_create_args", {}),
+        )
+
+    async def _lookup(self, key: str) -> Optional[CreateResult]:
+        if self._mode == "record":
+            return None
+        entry = await asyncio.to_thread(self._store.get, key, self._mode == "replay")
+        if entry is None:
+            CachedChatCompletionClient.misses += 1
+            if self._mode == "replay":
+                raise CacheMissError(f"No recorded completion for {self._model} (key {key[:12]}) in replay mode.")
+            return None
+        CachedChatCompletionClient.hits += 1
+        result = CreateResult.model_validate(entry["result"])
+        # A hit costs no tokens.
+        result.usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+        result.cached = True
+        return result
+
+    async def _store_result(self, key: str, result: CreateResult) -> None:
+        entry = {"model": self._model, "created_at": time.time(), "result": result.model_dump(mode="json")}
+        try:
+            await asyncio.to_thread(self._store.put, key, entry)
+        except Exception as e:
+            logging.getLogger("llm_cache").warning(f"Failed to cache completion: {e}")
+
+    async def create(self, messages, **kwargs) -> CreateResult:
+        key = self._key(messages, kwargs)
+        cached = await self._lookup(key)
+        if cached is not None:
+            return cached
+        result = await self._inner.create(messages, **kwargs)
+        await self._store_result(key, result)
+        return result
+
+    async def create_stream(self, messages, **kwargs):
+        key = self._key(messages, kwargs)
+        cached = await self._lookup(key)
+        if cached is not None:
+            if isinstance(cached.content, str):
+                yield cached.content
+            yield cached
+            return
+        async for chunk in self._inner.create_stream(messages, **kwargs):
+            if isinstance(chunk, CreateResult):
+                await self._store_result(key, chunk)
+            yield chunk
+
+
+_store: Optional[DiskCache] = None
+
+
+def cache_mode() -> str:
+    return os.getenv("LLM_CACHE_MODE", "off").lower()
+
+
+def get_store() -> DiskCache:
+    global _store
+    if _store is None:
+        ttl = float(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))
+        max_mb = float(os.getenv("LLM_CACHE_MAX_MB", 512))
+        _store = DiskCache(
+            os.getenv("LLM_CACHE_DIR", "./.cache/llm"),
+            ttl=ttl if ttl > 0 else None,
+            max_bytes=int(max_mb * 1024 * 1024) if max_mb > 0 else None,
+        )
+    return _store
+
+
+def cache_stats() -> dict:
+    stats = {"mode": cache_mode(), "hits": CachedChatCompletionClient.hits, "misses": CachedChatCompletionClient.misses}
+    if _store is not None:
+        stats.update(_store.stats())
+    return stats
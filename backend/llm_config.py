@@ -1,4 +1,5 @@
 
+import functools
 import os
 
 # LiteLLM/Ollama default models
@@ -7,8 +8,9 @@ LITELLM_TOOL_MODEL = os.getenv("LITELLM_TOOL_MODEL", LITELLM_CHAT_MODEL)
 LITELLM_EMBED_MODEL = os.getenv("LITELLM_EMBED_MODEL", "nomic-embed-text")
 
 
+@functools.lru_cache(maxsize=None)
 def _load_agent_model_map() -> dict:
-    """Parse AGENT_MODEL_MAP env var into a dictionary.
+    """Parse AGENT_MODEL_MAP env var into a dictionary (once per process).
 
     Keys are normalised to lower case so that mapping is case-insensitive.
     """
@@ -32,17 +34,17 @@ def get_llm_provider():
         raise ValueError("Only the 'ollama' provider is supported for local LLMs")
     return provider
 
-def get_llm_config(agent_name: str | None = None, agent_type: str | None = None):
+def get_llm_config(agent_name: str | None = None, agent_type: str | None = None, model: str | None = None):
+    """LLM settings for an agent; an explicit ``model`` (e.g. from a routing policy) wins over AGENT_MODEL_MAP."""
     provider = get_llm_provider()
     timeout = int(os.getenv("OPENAI_TIMEOUT", 60))
 
-    model = None
     model_map = _load_agent_model_map()
     lookup_name = agent_name.lower() if agent_name else None
     lookup_type = agent_type.lower() if agent_type else None
-    if lookup_name and lookup_name in model_map:
+    if model is None and lookup_name and lookup_name in model_map:
         model = model_map[lookup_name]
-    elif lookup_type and lookup_type in model_map:
+    elif model is None and lookup_type and lookup_type in model_map:
         model = model_map[lookup_type]
 
     if provider == "ollama":
@@ -73,18 +75,57 @@ def get_llm_config(agent_name: str | None = None, agent_type: str | None = None)
         raise ValueError(f"Unsupported provider: {provider}")
 
 
-def build_chat_client(agent_name: str | None = None, agent_type: str | None = None):
-    """Create a chat completion client for the local LLM provider."""
+def build_chat_client(
+    agent_name: str | None = None,
+    agent_type: str | None = None,
+    session_id: str | None = None,
+    user_id: str | None = None,
+    priority: str = "interactive",
+    time_left=None,
+    model: str | None = None,
+):
+    """Create a chat completion client for the local LLM provider.
+
+    See ``wrap_chat_client`` for the scheduling and caching layers applied
+    on top of the raw client.
+    """
     from autogen_ext.models.openai import OpenAIChatCompletionClient
 
-    cfg = get_llm_config(agent_name=agent_name, agent_type=agent_type).copy()
+    cfg = get_llm_config(agent_name=agent_name, agent_type=agent_type, model=model).copy()
     timeout = cfg.pop("timeout", 60)
     cfg.pop("provider", None)
 
     # Filter out unsupported args for the client constructor
     cfg.pop("stream", None)
 
-    return OpenAIChatCompletionClient(timeout=timeout, **cfg)
+    client = OpenAIChatCompletionClient(timeout=timeout, **cfg)
+    return wrap_chat_client(client, cfg["model"], session_id=session_id, user_id=user_id, priority=priority, time_left=time_left)
+
+
+def wrap_chat_client(client, model: str, session_id: str | None = None, user_id: str | None = None, priority: str = "interactive", time_left=None):
+    """Apply the shared LLM layers to a raw chat client.
+
+    Unless ``LLM_SCHEDULER=false`` the client is routed through the
+    process-wide LLM scheduler; ``session_id``/``user_id`` identify the
+    fair-queuing flow, ``priority`` its class and ``time_left`` (a callable
+    returning the seconds left in the session budget) enables fail-fast
+    rejection when the queue is too deep. With ``LLM_CACHE_MODE`` set, an
+    exact-match completion cache sits in front so hits never queue.
+    """
+    from llm_scheduler import ScheduledChatCompletionClient, scheduler_enabled
+    from llm_cache import CachedChatCompletionClient, cache_mode, get_store
+    from model_clients import InstrumentedChatCompletionClient
+
+    # Innermost, so /metrics sees the model call itself (no queue wait, no cache hits).
+    client = InstrumentedChatCompletionClient(client, model)
+    if scheduler_enabled():
+        client = ScheduledChatCompletionClient(
+            client, model, session_id=session_id, user_id=user_id, priority=priority, time_left=time_left
+        )
+    mode = cache_mode()
+    if mode != "off":
+        client = CachedChatCompletionClient(client, model, get_store(), mode=mode)
+    return client
 
 
 def build_embedding_client():
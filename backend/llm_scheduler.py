@@ -0,0 +1,264 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from model_clients import DelegatingChatCompletionClient
+
+# Priority classes, served strictly in this order.
+PRIORITY_CLASSES = {
+    "interactive": 0,
+    "bench": 1,
+}
+DEFAULT_PRIORITY = "interactive"
+
+
+class SchedulerRejectedError(RuntimeError):
+    """Raised when a request cannot be served before its session deadline."""
+
+
+def _load_model_concurrency() -> dict:
+    """Parse LLM_MODEL_CONCURRENCY ("model:slots,...") into a dictionary.
+
+    Model names may themselves contain ``:`` (``ollama/deepseek-coder:6.7b``),
+    so the slot count is taken from the last separator.
+    """
+    mapping = {}
+    raw = os.getenv("LLM_MODEL_CONCURRENCY", "")
+    for item in raw.split(","):
+        if ":" in item:
+            model, slots = item.rsplit(":", 1)
+            try:
+                mapping[model.strip()] = max(1, int(slots))
+            except ValueError:
+                continue
+    return mapping
+
+
+class _ModelQueue:
+    """Concurrency slots and a weighted fair queue for one model.
+
+    Requests are ordered by priority class first, then by virtual finish
+    time. Each (user, session) pair is a flow; a user's weight is split
+    across its active sessions, so a user running many sessions gets the
+    same share as a user running one.
+    """
+
+    def __init__(self, model: str, slots: int):
+        self.model = model
+        self.slots = slots
+        self.in_flight = 0
+        self._heap = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._flow_finish: Dict[tuple, float] = {}
+        self._flow_active: Dict[tuple, int] = {}
+
+        self.submitted = 0
+        self.rejected = 0
+        self._service_ewma: Optional[float] = None
+        self._waits = deque(maxlen=512)
+        self._max_wait = 0.0
+
+    def _user_sessions(self, user_id: str) -> int:
+        return sum(1 for (user, _), n in self._flow_active.items() if user == user_id and n > 0)
+
+    def estimated_wait(self, rank: int) -> float:
+        """Rough wait estimate: requests ahead of this class times mean service time per slot."""
+        ahead = sum(1 for entry in self._heap if entry[0] <= rank and not entry[3].cancelled())
+        service = self._service_ewma or 0.0
+        return (ahead + 1) * service / self.slots
+
+    async def acquire(self, user_id: str, session_id: str, priority: str, time_left: Optional[float]) -> float:
+        """Wait for a slot and return the time spent queued."""
+        self.submitted += 1
+        flow = (user_id or "", session_id or "")
+        if self.in_flight < self.slots and not self._heap:
+            self.in_flight += 1
+            self._record_wait(0.0)
+            return 0.0
+
+        rank = PRIORITY_CLASSES.get(priority, PRIORITY_CLASSES[DEFAULT_PRIORITY])
+        if time_left is not None and self.estimated_wait(rank) > time_left:
+            self.rejected += 1
+            raise SchedulerRejectedError(
+                f"LLM queue for {self.model} is too deep: estimated wait "
+                f"{self.estimated_wait(rank):.1f}s exceeds the remaining session budget of {time_left:.1f}s."
+            )
+
+        self._flow_active[flow] = self._flow_active.get(flow, 0) + 1
+        weight = 1.0 / max(1, self._user_sessions(flow[0]))
+        start = max(self._virtual_time, self._flow_finish.get(flow, 0.0))
+        finish = start + 1.0 / weight
+        self._flow_finish[flow] = finish
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (rank, finish, next(self._seq), waiter))
+        self._dispatch()
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, timeout=time_left)
+        except asyncio.TimeoutError:
+            # the slot may have been granted in the same loop iteration as the timeout
+            if waiter.done() and not waiter.cancelled():
+                self.release(None)
+            self.rejected += 1
+            raise SchedulerRejectedError(
+                f"Timed out after {time.monotonic() - queued_at:.1f}s waiting for an LLM slot on {self.model}."
+            ) from None
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(None)
+            raise
+        finally:
+            self._flow_active[flow] -= 1
+            if self._flow_active[flow] <= 0:
+                del self._flow_active[flow]
+        waited = time.monotonic() - queued_at
+        self._record_wait(waited)
+        return waited
+
+    def release(self, service_time: Optional[float]) -> None:
+        self.in_flight -= 1
+        if service_time is not None:
+            if self._service_ewma is None:
+                self._service_ewma = service_time
+            else:
+                self._service_ewma = 0.8 * self._service_ewma + 0.2 * service_time
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self.in_flight < self.slots and self._heap:
+            _, finish, _, waiter = heapq.heappop(self._heap)
+            if waiter.done():
+                continue  # cancelled or timed out while queued
+            self.in_flight += 1
+            self._virtual_time = max(self._virtual_time, finish)
+            waiter.set_result(None)
+        if not self._heap:
+            # Idle: forget finished flows so the table does not grow forever.
+            self._flow_finish = {
+                flow: finish for flow, finish in self._flow_finish.items() if flow in self._flow_active
+            }
+
+    def _record_wait(self, waited: float) -> None:
+        self._waits.append(waited)
+        self._max_wait = max(self._max_wait, waited)
+
+    def snapshot(self) -> dict:
+        waits = sorted(self._waits)
+        return {
+            "slots": self.slots,
+            "in_flight": self.in_flight,
+            "queue_depth": sum(1 for entry in self._heap if not entry[3].done()),
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "wait_avg": round(sum(waits) / len(waits), 4) if waits else 0.0,
+            "wait_p95": round(waits[int(0.95 * (len(waits) - 1))], 4) if waits else 0.0,
+            "wait_max": round(self._max_wait, 4),
+            "service_time_avg": round(self._service_ewma or 0.0, 4),
+        }
+
+
+class LLMScheduler:
+    """Process-wide gate in front of the LLM backend.
+
+    Local backends (LiteLLM/Ollama) serve a single request per model at a
+    time; without a shared gate every agent of every session competes for it
+    and requests time out. The scheduler hands out per-model slots fairly
+    across users and sessions and lets interactive sessions go first.
+    """
+
+    def __init__(self, default_slots: int = 1, model_slots: dict | None = None):
+        self.default_slots = default_slots
+        self.model_slots = model_slots or {}
+        self._queues: Dict[str, _ModelQueue] = {}
+
+    def _queue(self, model: str) -> _ModelQueue:
+        if model not in self._queues:
+            slots = self.model_slots.get(model, self.default_slots)
+            self._queues[model] = _ModelQueue(model, slots)
+        return self._queues[model]
+
+    async def acquire(self, model: str, user_id: str, session_id: str, priority: str, time_left: Optional[float]) -> float:
+        return await self._queue(model).acquire(user_id, session_id, priority, time_left)
+
+    def release(self, model: str, service_time: Optional[float]) -> None:
+        self._queue(model).release(service_time)
+
+    def snapshot(self) -> dict:
+        return {model: queue.snapshot() for model, queue in self._queues.items()}
+
+
+_scheduler: Optional[LLMScheduler] = None
+
+
+def scheduler_enabled() -> bool:
+    return os.getenv("LLM_SCHEDULER", "true").lower() == "true"
+
+
+def get_scheduler() -> LLMScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler(
+            default_slots=max(1, int(os.getenv("LLM_MAX_CONCURRENT_REQUESTS", 1))),
+            model_slots=_load_model_concurrency(),
+        )
+    return _scheduler
+
+
+def set_scheduler(scheduler) -> None:
+    """Replace the process-wide scheduler (session workers use one that asks the API process for slots)."""
+    global _scheduler
+    _scheduler = scheduler
+
+
+class ScheduledChatCompletionClient(DelegatingChatCompletionClient):
+    """Chat client that waits for a scheduler slot before every completion."""
+
+    def __init__(
+        self,
+        inner,
+        model: str,
+        session_id: str = None,
+        user_id: str = None,
+        priority: str = DEFAULT_PRIORITY,
+        time_left: Callable[[], Optional[float]] = None,
+        scheduler: LLMScheduler = None,
+    ):
+        super().__init__(inner)
+        self._model = model
+        self._session_id = session_id
+        self._user_id = user_id
+        self._priority = priority
+        self._time_left = time_left
+        self._scheduler = scheduler or get_scheduler()
+
+    async def _acquire(self) -> None:
+        time_left = self._time_left() if self._time_left else None
+        waited = await self._scheduler.acquire(self._model, self._user_id, self._session_id, self._priority, time_left)
+        if waited > 1:
+            logging.getLogger("llm_scheduler").info(
+                f"Session {self._session_id} waited {waited:.1f}s for {self._model}"
+            )
+
+    async def create(self, messages, **kwargs):
+        await self._acquire()
+        started = time.monotonic()
+        try:
+            return await self._inner.create(messages, **kwargs)
+        finally:
+            self._scheduler.release(self._model, time.monotonic() - started)
+
+    async def create_stream(self, messages, **kwargs):
+        await self._acquire()
+        started = time.monotonic()
+        try:
+            async for chunk in self._inner.create_stream(messages, **kwargs):
+                yield chunk
+        finally:
+            self._scheduler.release(self._model, time.monotonic() - started)
@@ -4,7 +4,9 @@ from autogen_agentchat.agents import AssistantAgent
 from autogen_core.models import (
     ChatCompletionClient,
 )
-from autogen_ext.tools.mcp import SseMcpToolAdapter, StdioServerParams, StdioMcpToolAdapter, SseServerParams
+from autogen_ext.tools.mcp import StdioServerParams, SseServerParams
+from mcp_sessions import get_mcp_session_manager
+from tool_execution import ToolLimits, limit_tools
 
 # TODO add checks to ususer inputs to make sure it is a valid definition of custom agent
 class MagenticOneCustomMCPAgent(AssistantAgent):
@@ -21,14 +23,15 @@ class MagenticOneCustomMCPAgent(AssistantAgent):
         system_message: str,
         description: str,
         adapter,  # adapter is now provided by the async factory method
-        user_id: str = None
+        user_id: str = None,
+        tool_limits: ToolLimits = None
     ):
         super().__init__(
             name,
             model_client,
             description=description,
             system_message=system_message,
-            tools=adapter
+            tools=limit_tools(adapter, name, tool_limits)
         )
         self.user_id = user_id
     
@@ -51,7 +54,8 @@ class MagenticOneCustomMCPAgent(AssistantAgent):
         model_client: ChatCompletionClient = None,
         system_message: str = "",
         description: str = "",
-        user_id: str = None
+        user_id: str = None,
+        tool_limits: ToolLimits = None
     ):
         if model_client is None:
             model_client = build_chat_client(agent_name=name, agent_type="CustomMCP")
@@ -114,14 +118,10 @@ class MagenticOneCustomMCPAgent(AssistantAgent):
             )
 
         try:
-            if server_mode == "stdio":
-                adapter_data_provider = await StdioMcpToolAdapter.from_server_params(server_params, "data_provider")
-                adapter_data_list_tables = await StdioMcpToolAdapter.from_server_params(server_params, "show_tables")
-                adapter_mailer = await StdioMcpToolAdapter.from_server_params(server_params, "mailer")
-            else:
-                adapter_data_provider = await SseMcpToolAdapter.from_server_params(server_params, "data_provider")
-                adapter_data_list_tables = await SseMcpToolAdapter.from_server_params(server_params, "show_tables")
-                adapter_mailer = await SseMcpToolAdapter.from_server_params(server_params, "mailer")
+            # One shared, long-lived session per server; tools are discovered once per connection
+            adapter_data_provider, adapter_data_list_tables, adapter_mailer = await get_mcp_session_manager().adapters(
+                server_params, ["data_provider", "show_tables", "mailer"]
+            )
         except Exception as e:
             print(f"[Adapter Initialization Error] {e}")
             raise
@@ -131,4 +131,5 @@ class MagenticOneCustomMCPAgent(AssistantAgent):
                    system_message, 
                    description, 
                    [adapter_data_provider, adapter_data_list_tables, adapter_mailer],
-                   user_id=user_id)
+                   user_id=user_id,
+                   tool_limits=tool_limits)
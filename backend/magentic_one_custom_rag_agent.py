@@ -7,9 +7,14 @@ try:
 except ImportError as e:
     raise ImportError("faiss is not installed. Install it via 'pip install faiss-cpu' or 'faiss-gpu' based on your system.") from e
 import numpy as np
+import asyncio
 import os
 import json
-from llm_config import build_embedding_client, get_llm_provider, LITELLM_EMBED_MODEL
+from embedding_batcher import get_embedding_batcher
+from llm_config import get_llm_provider, LITELLM_EMBED_MODEL
+from metrics import tool_call
+from tool_execution import ToolLimits, limit_tools
+from tracing import span
 
 RAG_BACKEND = os.getenv("RAG_BACKEND", "faiss").lower()
 
@@ -38,7 +43,7 @@ class MagenticOneRAGAgent(AssistantAgent):
         faiss_documents: list[str] | None = None,
         faiss_index_path: str | None = None,
         description: str = MAGENTIC_ONE_RAG_DESCRIPTION,
-
+        tool_limits: ToolLimits | None = None,
     ):
         """Initialize the MagenticOneRAGAgent.
 
@@ -49,6 +54,7 @@ class MagenticOneRAGAgent(AssistantAgent):
         faiss_documents: Optional list of documents to build the FAISS index for vector search.
         faiss_index_path: Optional path to store/load the FAISS index file.
         description: The agent description.
+        tool_limits: Concurrency and timeout of the agent's tool calls (``TOOL_*`` variables by default).
 
         When faiss_documents are provided, a FAISS index will be automatically built and used for vector similarity search.
         """
@@ -57,14 +63,14 @@ class MagenticOneRAGAgent(AssistantAgent):
             model_client,
             description=description,
             system_message=MAGENTIC_ONE_RAG_SYSTEM_MESSAGE,
-            tools=[self.do_search],
+            tools=limit_tools([self.do_search], name, tool_limits),
             reflect_on_tool_use=True,
         )
 
         self.index_name = index_name
 
-        # Client used to generate embeddings, respecting LLM_PROVIDER
-        self._embedding_client = build_embedding_client()
+        # Embeddings go through the process-wide batcher, shared with the other sessions
+        self._embeddings = get_embedding_batcher()
         if get_llm_provider() == "ollama":
             self.embedding_model = LITELLM_EMBED_MODEL
         else:
@@ -74,29 +80,49 @@ class MagenticOneRAGAgent(AssistantAgent):
         self.faiss_index = None
         self.faiss_documents = []
         self.faiss_index_path = faiss_index_path or f"{self.index_name}.faiss"
+        # embedding needs the event loop, so documents given here are indexed on the first search
+        self._faiss_pending = None
+        self._index_build = None
 
         if os.path.exists(self.faiss_index_path):
             try:
                 self.load_faiss_index(self.faiss_index_path)
             except Exception as e:
                 print(f"Failed to load FAISS index: {e}")
-                if faiss_documents:
-                    self.build_faiss_index(faiss_documents)
+                self._faiss_pending = faiss_documents or None
         elif faiss_documents:
-            self.build_faiss_index(faiss_documents)
+            self._faiss_pending = faiss_documents
 
         self._search_client = None
 
-    def build_faiss_index(self, documents: list[str]):
-        self.faiss_documents = documents
-        response = self._embedding_client.embeddings.create(
-            input=documents, model=self.embedding_model
-        )
-        embeddings = np.array([d.embedding for d in response.data])
-        self.faiss_index = faiss.IndexFlatL2(embeddings.shape[1])
-        self.faiss_index.add(embeddings)
+    async def build_faiss_index(self, documents: list[str]):
+        """Embed ``documents`` through the shared embedding batcher and index them."""
+        if not documents:
+            return
+        vectors = await self._embeddings.embed(documents, self.embedding_model)
+        # building and writing the index blocks: keep it off the event loop
+        await asyncio.to_thread(self._index_vectors, documents, np.array(vectors))
+
+    def _index_vectors(self, documents: list[str], embeddings: np.ndarray):
+        index = faiss.IndexFlatL2(embeddings.shape[1])
+        index.add(embeddings)
+        self.faiss_index, self.faiss_documents = index, documents
         self.save_faiss_index(self.faiss_index_path)
 
+    async def _ensure_faiss_index(self):
+        if self._faiss_pending and self._index_build is None:
+            self._index_build = asyncio.ensure_future(self.build_faiss_index(self._faiss_pending))
+        if self._index_build is not None:
+            # shared by the searches that arrive while the index is built
+            build = self._index_build
+            try:
+                await asyncio.shield(build)
+            except Exception:
+                # keep the documents so the next search retries the build
+                if self._index_build is build:
+                    self._index_build = None
+                raise
+
     def save_faiss_index(self, path: str):
         """Save the FAISS index and associated documents to disk."""
         if self.faiss_index is None:
@@ -117,8 +143,8 @@ class MagenticOneRAGAgent(AssistantAgent):
         else:
             self.faiss_documents = []
 
-    def load_faiss_data(self, docs: list[str]):
-        self.build_faiss_index(docs)
+    async def load_faiss_data(self, docs: list[str]):
+        await self.build_faiss_index(docs)
 
     async def do_search(self, query: str) -> dict:
         """Search using FAISS and optionally Azure Cognitive Search.
@@ -136,12 +162,15 @@ class MagenticOneRAGAgent(AssistantAgent):
 
         # ---------- FAISS Search ----------
         try:
+            await self._ensure_faiss_index()
             if self.faiss_index is not None:
-                resp = self._embedding_client.embeddings.create(
-                    input=[query], model=self.embedding_model
-                )
-                query_embedding = np.array([resp.data[0].embedding])
-                D, I = self.faiss_index.search(query_embedding, k=1)
+                # concurrent searches of all sessions share embedding requests; the FAISS search
+                # blocks, so it runs off the event loop
+                with tool_call("embedding", "faiss"), span("tool.call", tool="embedding", kind="faiss"):
+                    vectors = await self._embeddings.embed([query], self.embedding_model)
+                query_embedding = np.array(vectors)
+                with tool_call("faiss_search", "faiss"), span("tool.call", tool="faiss_search", kind="faiss"):
+                    D, I = await asyncio.to_thread(self.faiss_index.search, query_embedding, 1)
                 idx = int(I[0][0])
                 score = float(D[0][0])
                 snippet = self.faiss_documents[idx]
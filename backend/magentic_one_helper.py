@@ -9,37 +9,70 @@ from inspect import signature
 
 from typing import Optional, AsyncGenerator, Dict, Any, List
 from autogen_agentchat.ui import Console
-from autogen_agentchat.agents import CodeExecutorAgent
+from autogen_agentchat.messages import TextMessage
 from autogen_agentchat.teams import MagenticOneGroupChat
-from autogen_ext.agents.file_surfer import FileSurfer
-from autogen_ext.agents.magentic_one import MagenticOneCoderAgent
-from autogen_ext.agents.web_surfer import MultimodalWebSurfer
-from autogen_ext.code_executors.local import LocalCommandLineCodeExecutor
-from autogen_ext.code_executors.azure import ACADynamicSessionsCodeExecutor
-from autogen_ext.code_executors.docker import DockerCommandLineCodeExecutor
 from autogen_ext.models.openai import AzureOpenAIChatCompletionClient
 from autogen_ext.models.openai import OpenAIChatCompletionClient
 from autogen_core import AgentId, AgentProxy, DefaultTopicId
 from autogen_core import SingleThreadedAgentRuntime
 from autogen_core import CancellationToken
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider
-import tempfile
 from dotenv import load_dotenv
 load_dotenv()
 
 # Import get_llm_config after dotenv load
-from llm_config import get_llm_config, build_chat_client
+from llm_config import get_llm_config, build_chat_client, wrap_chat_client
+
+# Agent classes and their heavy dependencies (Playwright, Docker, faiss, ...) are
+# imported by the agent type registry only when a team uses them.
+from agent_registry import get_agent_registry
+from session_budget import SessionBudget, BudgetedChatCompletionClient, SessionBudgetTermination, enforce_deadline
+from context_compaction import CompactingChatCompletionClient, ContextPolicy
+from model_routing import ORCHESTRATOR_ROLES, RouteChatCompletionClient, RoutedChatCompletionClient, get_routing_policy
+from orchestration_utils import TerminationPolicy
+from team_checkpoints import ResumableMagenticOneGroupChat, checkpointed, session_checkpoint
+from metrics import AGENT_TURN_SECONDS, SESSION_SETUP_SECONDS
+from tracing import span, span_stream
+import crud
+
+_azure_credential = None
+_token_provider = None
+
+
+def get_azure_credential():
+    """DefaultAzureCredential shared by the process, created on first use."""
+    global _azure_credential
+    if _azure_credential is None:
+        from azure.identity import DefaultAzureCredential
+        _azure_credential = DefaultAzureCredential()
+    return _azure_credential
+
+
+def get_token_provider():
+    global _token_provider
+    if _token_provider is None:
+        from azure.identity import get_bearer_token_provider
+        _token_provider = get_bearer_token_provider(
+            get_azure_credential(), "https://cognitiveservices.azure.com/.default"
+        )
+    return _token_provider
+
+def _time_agent_turns(agent):
+    """Record the duration of every turn of ``agent`` in the agent turn histogram and the session trace."""
+    inner = agent.on_messages_stream
 
-from magentic_one_custom_agent import MagenticOneCustomAgent
-from magentic_one_custom_rag_agent import MagenticOneRAGAgent
-from magentic_one_custom_mcp_agent import MagenticOneCustomMCPAgent
+    async def on_messages_stream(messages, cancellation_token):
+        started = time.perf_counter()
+        try:
+            turn = span_stream("agent.turn", inner(messages, cancellation_token), parent_round=True, agent=agent.name)
+            async for item in turn:
+                yield item
+        finally:
+            AGENT_TURN_SECONDS.observe(time.perf_counter() - started, agent=agent.name)
 
-azure_credential = DefaultAzureCredential()
-token_provider = get_bearer_token_provider(
-    azure_credential, "https://cognitiveservices.azure.com/.default"
-)
+    # Instance attribute, so the group chat container (through the proxy) calls the timed version
+    agent.on_messages_stream = on_messages_stream
+    return agent
 
-RAG_BACKEND = os.getenv("RAG_BACKEND", "azure").lower()
 
 def _wrap_with_proxy(agent):
     """
@@ -147,6 +180,9 @@ def _wrap_with_proxy(agent):
                         setattr(proxy, _method, getattr(agent, _method))
                     except Exception:
                         pass
+            # the agent sits in the proxy's runtime slot: its state methods must not go through it
+            for _method in ("save_state", "load_state"):
+                setattr(proxy, _method, getattr(agent, _method))
             return proxy
     except TypeError:
         pass
@@ -179,7 +215,7 @@ def generate_session_name():
     return f"{adjective}-{noun}-{number}"
 
 class MagenticOneHelper:
-    def __init__(self, logs_dir: str = None, save_screenshots: bool = False, run_locally: bool = False, user_id: str = None, llm_config: dict = None) -> None:
+    def __init__(self, logs_dir: str = None, save_screenshots: bool = False, run_locally: bool = False, user_id: str = None, llm_config: dict = None, team_config: dict = None, priority: str = "interactive") -> None:
         """
         A helper class to interact with the MagenticOne system.
         Initialize MagenticOne instance.
@@ -189,6 +225,8 @@ class MagenticOneHelper:
             save_screenshots: Whether to save screenshots of web pages
             user_id: The user ID associated with this helper instance
             llm_config: Dictionary with LLM configuration for client instantiation
+            team_config: Runtime settings taken from the team definition (e.g. ``budgets``, ``context``, ``routing``, ``termination``)
+            priority: LLM scheduler priority class of the session ("interactive" or "bench")
         """
         self.logs_dir = logs_dir or os.getcwd()
         self.runtime: Optional[SingleThreadedAgentRuntime] = None
@@ -202,12 +240,27 @@ class MagenticOneHelper:
         else:
             self.llm_config = llm_config
 
-        self.max_rounds = 50
+        self.team_config = team_config or {}
+        self.priority = priority
+
+        # Early-termination conditions and the orchestrator's round limits (team ``termination`` block)
+        self.termination = TerminationPolicy.from_config(self.team_config.get("termination"))
+        self.max_rounds = self.termination.max_turns
         self.max_time = 25 * 60
-        self.max_stalls_before_replan = 5
+        self.max_stalls_before_replan = self.termination.max_stalls
         self.return_final_answer = True
         self.start_page = "https://www.bing.com"
 
+        # Per-session wall-clock, token and tool call limits; shared by all model clients of the session
+        self.budget = SessionBudget.from_config(self.team_config.get("budgets"), default_max_time=self.max_time)
+        # Models per orchestrator step and agent (team ``routing`` block)
+        self.routing = get_routing_policy(self.team_config.get("routing"))
+        self._orchestrator_routes = {}
+        # Set when the Executor leases a container from the code executor pool
+        self._leased_executor = False
+        # Set when the WebSurfer browses in a context of the shared browser pool
+        self._uses_browser_pool = False
+
         if not os.path.exists(self.logs_dir):
             os.makedirs(self.logs_dir)
 
@@ -215,6 +268,15 @@ class MagenticOneHelper:
         """
         Initialize the MagenticOne system, setting up agents and runtime.
         """
+        with SESSION_SETUP_SECONDS.time(), span("session.setup", agents=len(agents)):
+            try:
+                await self._initialize(agents, session_id)
+            except Exception:
+                # resources leased by the agents built so far
+                await self.close()
+                raise
+
+    async def _initialize(self, agents, session_id = None) -> None:
         # Create the runtime
         self.runtime = SingleThreadedAgentRuntime()
 
@@ -226,37 +288,41 @@ class MagenticOneHelper:
         # print(f"Session MODEL gpt-4.1-2025-04-14")
         print(f"Session MODEL o4-mini-2025-04-16")
 
+        # Orchestrator steps without a route of their own use the session's default model
+        routes = {}
+        for role in ORCHESTRATOR_ROLES:
+            route = self.routing.route_for(role)
+            if route is not None:
+                if route.name not in routes:
+                    routes[route.name] = RouteChatCompletionClient(route, [self._model_client(m) for m in route.models])
+                self._orchestrator_routes[role] = routes[route.name]
+        client = self._model_client(self.llm_config["model"])
+        if self._orchestrator_routes:
+            client = RoutedChatCompletionClient(client, self._orchestrator_routes)
+        self.client = self._compacted(BudgetedChatCompletionClient(client, self.budget), "MagenticOneOrchestrator")
+
+        # Set up agents
+        self.agents = await self.setup_agents(agents, self.logs_dir)
+
+        print("Agents setup complete!")
+
+    def _model_client(self, model: str):
+        """An orchestrator client for ``model`` on the session's provider, through the shared LLM scheduler and cache."""
         provider = self.llm_config.get("provider")
         if provider == "azure":
-            # Build Azure client args
-            azure_args = {
-                "model": self.llm_config["model"],
-                "azure_deployment": self.llm_config["model"],
-                "api_version": self.llm_config["api_version"],
-                "azure_endpoint": self.llm_config["base_url"],
-                "azure_ad_token_provider": token_provider,
-                "api_key": self.llm_config["api_key"],
-                "timeout": self.llm_config.get("timeout", 60),
-            }
-            self.client = AzureOpenAIChatCompletionClient(**azure_args)
-            # Reasoning client can override model/deployment if needed; here we reuse same
-            self.client_reasoning = AzureOpenAIChatCompletionClient(**azure_args)
-        elif provider == "openai":
-            # Use OpenAIChatCompletionClient with relevant arguments and model_info
-            self.client = OpenAIChatCompletionClient(
-                model=self.llm_config["model"],
-                base_url=self.llm_config["base_url"],
+            client = AzureOpenAIChatCompletionClient(
+                model=model,
+                azure_deployment=model,
+                api_version=self.llm_config["api_version"],
+                azure_endpoint=self.llm_config["base_url"],
+                azure_ad_token_provider=get_token_provider(),
                 api_key=self.llm_config["api_key"],
-                function_calling=self.llm_config.get("function_calling", False),
-                json_output=self.llm_config.get("json_output", False),
-                model_info=self.llm_config.get(
-                    "model_info",
-                    {"vision": False, "function_calling": True, "json_output": True, "family": "ollama"}
-                ),
                 timeout=self.llm_config.get("timeout", 60),
             )
-            self.client_reasoning = OpenAIChatCompletionClient(
-                model=self.llm_config["model"],
+        elif provider == "openai":
+            # Use OpenAIChatCompletionClient with relevant arguments and model_info
+            client = OpenAIChatCompletionClient(
+                model=model,
                 base_url=self.llm_config["base_url"],
                 api_key=self.llm_config["api_key"],
                 function_calling=self.llm_config.get("function_calling", False),
@@ -269,137 +335,107 @@ class MagenticOneHelper:
             )
         else:
             raise RuntimeError(f"Unsupported LLM provider: {provider}")
+        return self._wrap_client(client, model)
+
+    def _wrap_client(self, client, model: str):
+        """Route an orchestrator client through the shared LLM scheduler and cache."""
+        return wrap_chat_client(
+            client,
+            model,
+            session_id=self.session_id,
+            user_id=self.user_id,
+            priority=self.priority,
+            time_left=self.budget.remaining_time,
+        )
 
-        # Set up agents
-        self.agents = await self.setup_agents(agents, self.logs_dir)
+    def _build_client(self, agent_name: str, agent_type: str):
+        """Build an agent's chat client: routed, scheduled, charged against the session budget and context-compacted."""
+        def build(model=None):
+            return build_chat_client(
+                agent_name=agent_name,
+                agent_type=agent_type,
+                session_id=self.session_id,
+                user_id=self.user_id,
+                priority=self.priority,
+                time_left=self.budget.remaining_time,
+                model=model,
+            )
 
-        print("Agents setup complete!")
+        route = self.routing.route_for(agent_name, agent_type)
+        client = RouteChatCompletionClient(route, [build(m) for m in route.models]) if route else build()
+        if "summary" in self._orchestrator_routes:
+            # context compaction summaries of the agent go to the summary route too
+            client = RoutedChatCompletionClient(client, {"summary": self._orchestrator_routes["summary"]})
+        return self._compacted(BudgetedChatCompletionClient(client, self.budget), agent_name)
+
+    def _compacted(self, client, agent_name: str):
+        """Fit the prompts of ``client`` into the agent's context budget (team ``context`` block / CONTEXT_*)."""
+        policy = ContextPolicy.from_config(self.team_config.get("context"), agent_name)
+        if not policy.enabled:
+            return client
+        return CompactingChatCompletionClient(client, policy, agent_name=agent_name)
 
     async def setup_agents(self, agents, logs_dir):
         agent_list = []
-        docs_dir = os.environ.get(
-            "RAG_DOCS_PATH",
-            os.path.join(os.path.dirname(__file__), "data", "ai-search-index"),
-        )
-        docs: List[str] = []
-        if os.path.isdir(docs_dir):
-            for root, _, files in os.walk(docs_dir):
-                for fname in files:
-                    file_path = os.path.join(root, fname)
-                    try:
-                        with open(file_path, "r", encoding="utf-8") as f:
-                            docs.append(f.read())
-                    except Exception:
-                        try:
-                            with open(file_path, "rb") as f:
-                                docs.append(f.read().decode("utf-8", errors="ignore"))
-                        except Exception:
-                            pass
+        registry = get_agent_registry()
         for agent in agents:
-            # This is default MagenticOne agent - Coder
-            if (agent["type"] == "MagenticOne" and agent["name"] == "Coder"):
-                coder_client = build_chat_client(agent_name="Coder", agent_type="MagenticOne")
-                coder = MagenticOneCoderAgent("Coder", model_client=coder_client)
-                agent_list.append(_wrap_with_proxy(coder))
-                print("Coder added!")
-
-            # This is default MagenticOne agent - Executor
-            elif (agent["type"] == "MagenticOne" and agent["name"] == "Executor"):
-                # handle local = local docker execution
-                if self.run_locally:
-                    # docker
-                    code_executor = DockerCommandLineCodeExecutor(work_dir=logs_dir)
-                    await code_executor.start()
-                
-                # or remote = Azure ACA Dynamic Sessions execution
-                else:
-                    pool_endpoint = os.getenv("POOL_MANAGEMENT_ENDPOINT")
-                    assert pool_endpoint, "POOL_MANAGEMENT_ENDPOINT environment variable is not set"
-                    with tempfile.TemporaryDirectory() as temp_dir:# Define the correct path to the data folder for file access
-                        code_executor=ACADynamicSessionsCodeExecutor(
-                            pool_management_endpoint=pool_endpoint,
-                            credential=azure_credential,
-                            work_dir=temp_dir
-                        )
-                        print(code_executor._session_id)
-                        #code_executor.upload_files(os.path.join(os.getcwd(), "data"))
-                        print("Files uploaded!")
-                executor_client = build_chat_client(agent_name="Executor", agent_type="MagenticOne")
-                executor_agent = CodeExecutorAgent("Executor", code_executor=code_executor, model_client=executor_client)
-                agent_list.append(_wrap_with_proxy(executor_agent))
-                print("Executor added!")
-
-            # This is default MagenticOne agent - WebSurfer
-            elif (agent["type"] == "MagenticOne" and agent["name"] == "WebSurfer"):
-                web_client = build_chat_client(agent_name="WebSurfer", agent_type="MagenticOne")
-                web_surfer = MultimodalWebSurfer("WebSurfer", model_client=web_client)
-                agent_list.append(_wrap_with_proxy(web_surfer))
-                print("WebSurfer added!")
-            
-            # This is default MagenticOne agent - FileSurfer
-            elif (agent["type"] == "MagenticOne" and agent["name"] == "FileSurfer"):
-                file_client = build_chat_client(agent_name="FileSurfer", agent_type="MagenticOne")
-                file_surfer = FileSurfer("FileSurfer", model_client=file_client)
-                file_surfer._browser.set_path(os.path.join(os.getcwd(), "data"))  # Set the path to the data folder in the current working directory
-                agent_list.append(_wrap_with_proxy(file_surfer))
-                print("FileSurfer added!")
-            
-            # This is custom agent - simple SYSTEM message and DESCRIPTION is used inherited from AssistantAgent
-            elif (agent["type"] == "Custom"):
-                custom_client = build_chat_client(agent_name=agent["name"], agent_type="Custom")
-                custom_agent = MagenticOneCustomAgent(
-                    agent["name"],
-                    model_client=custom_client,
-                    system_message=agent["system_message"],
-                    description=agent["description"]
-                    )
-                agent_list.append(_wrap_with_proxy(custom_agent))
-                print(f'{agent["name"]} (custom) added!')
-
-            elif (agent["type"] == "CustomMCP"):
-                custom_client = build_chat_client(agent_name=agent["name"], agent_type="CustomMCP")
-                custom_agent = await MagenticOneCustomMCPAgent.create(
-                    agent["name"],
-                    custom_client,
-                    agent["system_message"] + "\n\n in case of email use this address as TO: " + self.user_id,
-                    agent["description"],
-                    self.user_id
-                )
-                agent_list.append(_wrap_with_proxy(custom_agent))
-                print(f'{agent["name"]} (custom MCP) added!')
-
-            
-            # This is custom agent - RAG agent - you need to specify index_name and Azure Cognitive Search service endpoint and admin key in .env file
-            elif (agent["type"] == "RAG"):
-                rag_client = build_chat_client(agent_name=agent["name"], agent_type="RAG")
-                # RAG agent
-                rag_agent = MagenticOneRAGAgent(
-                    agent["name"],
-                    model_client=rag_client,
-                    index_name=agent["index_name"],
-                    description=agent["description"]
-                  
-                )
-                if RAG_BACKEND == "faiss":
-                    rag_agent.load_faiss_data(docs)
-                agent_list.append(_wrap_with_proxy(rag_agent))
-                print(f'{agent["name"]} (RAG) added!')
-            else:
-                raise ValueError('Unknown Agent!')
+            built = await registry.build(self, agent, logs_dir)
+            _time_agent_turns(built)
+            agent_list.append(_wrap_with_proxy(built))
+            print(f'{agent["name"]} ({agent["type"]}) added!')
         return agent_list
 
-    async def main(self, task):
-        team = MagenticOneGroupChat(
+    async def main(self, task, resume: bool = False):
+        """Start the team on ``task`` and return its message stream and cancellation token.
+
+        The team state is checkpointed by the orchestrator between rounds. With
+        ``resume=True`` the latest unfinished checkpoint of this session is
+        restored and the run continues from the last completed round instead
+        of starting over.
+        """
+        team = ResumableMagenticOneGroupChat(
             participants=self.agents,
             model_client=self.client,
-            # model_client=self.client_reasoning,
+            termination_condition=self.termination.build(SessionBudgetTermination(self.budget)),
             max_turns=self.max_rounds,
             max_stalls=self.max_stalls_before_replan,
             emit_team_events=False,
+            checkpoint=session_checkpoint(
+                self.user_id, self.session_id, metadata=lambda: {"budget": self.budget.to_json()}
+            ),
         )
+        start_round = 0
+        checkpoint = crud.load_checkpoint(self.user_id, self.session_id) if resume else None
+        if checkpoint is not None and not checkpoint.get("completed"):
+            await team.load_state(checkpoint["state"])
+            self.budget.restore(checkpoint.get("metadata", {}).get("budget", {}))
+            start_round = checkpoint["round"]
+            task = TextMessage(content=f"Resuming from checkpoint after round {start_round}.", source="user")
+            print(f"Session {self.session_id} resumed at round {start_round}")
         cancellation_token = CancellationToken()
+        self.budget.start()
         stream = team.run_stream(task=task, cancellation_token=cancellation_token)
-        return stream, cancellation_token
+        stream = enforce_deadline(stream, self.budget, cancellation_token)
+        stream = checkpointed(stream, self.user_id, self.session_id)
+        return self._release_on_exit(stream), cancellation_token
+
+    async def _release_on_exit(self, stream):
+        try:
+            async for message in stream:
+                yield message
+        finally:
+            await self.close()
+
+    async def close(self):
+        """Give back per-session resources (the leased executor container and browser context)."""
+        if self._leased_executor:
+            self._leased_executor = False
+            from code_executor_pool import get_executor_pool
+            await get_executor_pool().release(self.session_id)
+        if self._uses_browser_pool:
+            self._uses_browser_pool = False
+            from browser_pool import get_browser_pool
+            await get_browser_pool().release(self.session_id)
     
 async def main(agents, task, run_locally) -> None:
 
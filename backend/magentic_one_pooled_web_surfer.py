@@ -0,0 +1,34 @@
+from autogen_ext.agents.web_surfer import MultimodalWebSurfer
+
+from browser_pool import BrowserPool
+
+
+class PooledMultimodalWebSurfer(MultimodalWebSurfer):
+    """MultimodalWebSurfer that browses in a context leased from the shared BrowserPool.
+
+    The context is only leased on the agent's first turn, so teams that
+    include a WebSurfer but never use it do not hold a browser. ``close``
+    gives the context back instead of stopping the pool's Playwright driver.
+    """
+
+    def __init__(self, name: str, model_client, pool: BrowserPool, session_id: str, **kwargs):
+        super().__init__(name, model_client=model_client, **kwargs)
+        self._pool = pool
+        self._session_id = session_id
+
+    async def _lazy_init(self) -> None:
+        if self._context is None:
+            self._context = await self._pool.acquire(self._session_id)
+            # the base class starts its own Playwright driver when none is set
+            self._playwright = self._pool.playwright
+        await super()._lazy_init()
+
+    async def close(self) -> None:
+        if self._page is not None:
+            await self._page.close()
+            self._page = None
+        if self._context is not None:
+            self._context = None
+            self._playwright = None
+            self.did_lazy_init = False
+            await self._pool.release(self._session_id)
@@ -10,23 +10,27 @@ import os
 import uuid
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
-from fastapi.responses import StreamingResponse, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse, Response
 import json, asyncio
 from magentic_one_helper import MagenticOneHelper
 from llm_config import get_llm_config
+from llm_scheduler import PRIORITY_CLASSES
+from model_routing import get_routing_policy
+from session_budget import SessionBudget
+from context_compaction import ContextPolicy
+from orchestration_utils import TerminationPolicy
 from autogen_agentchat.messages import MultiModalMessage, TextMessage, ToolCallExecutionEvent, ToolCallRequestEvent, SelectSpeakerEvent, ToolCallSummaryMessage
 from autogen_agentchat.base import TaskResult
 from magentic_one_helper import generate_session_name
-import aisearch
+from session_workers import SessionWorkerPool, RemoteCancellationToken, configured_workers
+from code_executor_pool import executor_pool_enabled, get_executor_pool
+from browser_pool import browser_pool_enabled, get_browser_pool
+from metrics import REGISTRY, SSE_EVENTS_TOTAL, tool_call
+import tracing
+import profiler
+import bench_jobs
 import logging
-from tools import (
-    bing_search,
-    google_search,
-    fetch_webpage,
-    generate_image,
-    generate_pdf,
-    calculator,
-)
+import sys
 
 from datetime import datetime 
 from schemas import AutoGenMessage
@@ -80,6 +84,40 @@ MAGENTIC_ONE_DEFAULT_AGENTS = [
             },
             ]
 
+# Keys of a team definition that configure how its sessions run (copied into the conversation on /start)
+TEAM_RUNTIME_KEYS = ("budgets", "context", "routing", "termination")
+
+def get_team_config(team_id: str) -> dict:
+    """Return the runtime settings of a team definition, or an empty dict."""
+    if not team_id:
+        return {}
+    try:
+        team = app.state.db.get_team(team_id)
+    except Exception as e:
+        logging.getLogger("get_team_config").warning(f"Could not load team {team_id}: {e}")
+        return {}
+    if not team:
+        return {}
+    return {key: team[key] for key in TEAM_RUNTIME_KEYS if team.get(key) is not None}
+
+# Parsers of the runtime blocks, run on save so a bad value fails there instead of in every session of the team.
+TEAM_CONFIG_PARSERS = {
+    "budgets": SessionBudget.from_config,
+    "context": lambda config: [ContextPolicy.from_config(config, name) for name in [None, *(config.get("agents") or {})]],
+    "routing": get_routing_policy,
+    "termination": TerminationPolicy.from_config,
+}
+
+def validate_team_config(team: dict) -> None:
+    """Reject a team definition whose runtime blocks (``budgets``, ``context``, ``routing``, ``termination``) cannot be parsed."""
+    for key, parse in TEAM_CONFIG_PARSERS.items():
+        if team.get(key) is None:
+            continue
+        try:
+            parse(team[key])
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid {key}: {e}")
+
 # Lifespan handler for startup/shutdown events
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -92,8 +130,30 @@ async def lifespan(app: FastAPI):
     if DEBUG_AGENT_LOGS:
         logging.debug("DEBUG_AGENT_LOGS enabled")
     print("Database initialized.")
+    # Tag asyncio tasks with their session so /admin/profile can be scoped to one session
+    profiler.install_task_factory(asyncio.get_running_loop())
+    # Optional worker-pool mode: run sessions in separate processes
+    app.state.session_workers = None
+    n_workers = configured_workers()
+    if n_workers > 0:
+        app.state.session_workers = SessionWorkerPool(n_workers)
+        app.state.session_workers.start()
+        print(f"Started {n_workers} session workers.")
     yield
     # Shutdown code (optional)
+    if app.state.session_workers is not None:
+        await app.state.session_workers.close()
+    if executor_pool_enabled():
+        await get_executor_pool().close()
+    if browser_pool_enabled():
+        await get_browser_pool().close()
+    # mcp_sessions is only imported once a CustomMCP agent was built
+    if "mcp_sessions" in sys.modules:
+        await sys.modules["mcp_sessions"].get_mcp_session_manager().close()
+    # Stop running benchmark jobs (kills their worker processes)
+    await bench_jobs.shutdown()
+    # Write out the spans still buffered in the batch processor
+    tracing.shutdown()
     # Cleanup database connection
     app.state.db = None
 
@@ -125,10 +185,19 @@ async def validate_token(token: str = None):
     print("Token:", token)
     return {"sub": "user123", "name": "Test User"}  # Mocked user data
 
+async def require_admin(user: dict = Depends(validate_token)):
+    # Admin routes (profiler) are limited to the users listed in ADMIN_USERS
+    admins = {u.strip() for u in os.getenv("ADMIN_USERS", "").split(",") if u.strip()}
+    if user["sub"] not in admins:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user
+
 from openai import AsyncAzureOpenAI
 
 # Azure OpenAI Client
 async def get_openai_client():
+    from azure.identity import DefaultAzureCredential, get_bearer_token_provider
+
     azure_credential = DefaultAzureCredential()
     token_provider = get_bearer_token_provider(
         azure_credential, "https://cognitiveservices.azure.com/.default"
@@ -179,23 +248,9 @@ def get_agent_icon(agent_name) -> str:
     return agent_icon
 
 async def summarize_plan(plan, client):
-    prompt = "You are a project manager."
-    text = f"""Summarize the plan for each agent into single-level only bullet points.
+    from context_compaction import summarize
 
-    Plan:
-    {plan}
-    """
-    
-    from autogen_core.models import UserMessage, SystemMessage
-    messages = [
-        UserMessage(content=text, source="user"),
-        SystemMessage(content=prompt)
-    ]
-    result = await client.create(messages)
-    # print(result.content)
-    
-    plan_summary = result.content
-    return plan_summary
+    return await summarize(plan, client, "Summarize the plan for each agent into single-level only bullet points.\n\nPlan:")
 async def display_log_message(log_entry, logs_dir, session_id, user_id, conversation=None):
     _log_entry_json = log_entry
     _user_id = user_id
@@ -276,6 +331,13 @@ async def display_log_message(log_entry, logs_dir, session_id, user_id, conversa
         _response.source = "N/A"
         _response.content = "Agents mumbling."
 
+    _models_usage = getattr(_log_entry_json, "models_usage", None)
+    if _models_usage is not None:
+        _response.models_usage = json.dumps({
+            "prompt_tokens": _models_usage.prompt_tokens,
+            "completion_tokens": _models_usage.completion_tokens,
+        })
+
     _ = crud.save_message(
             id=None, # it is auto-generated
             user_id=_user_id,
@@ -345,6 +407,8 @@ async def chat_endpoint(
     # print("Provided user_id:", message.user_id)
     logger.info(f"User ID: {_user_id}")
     _agents = json.loads(message.agents) if message.agents else MAGENTIC_ONE_DEFAULT_AGENTS
+    if message.priority is not None and message.priority not in PRIORITY_CLASSES:
+        raise HTTPException(status_code=400, detail=f"Unknown priority '{message.priority}', use one of: {', '.join(PRIORITY_CLASSES)}")
     _session_id = generate_session_name()
     conversation = crud.save_message(
         id=uuid.uuid4(),
@@ -353,7 +417,9 @@ async def chat_endpoint(
         message={"content": message.content, "role": "user"},
         agents=_agents,
         run_mode_locally=True,
-        timestamp=get_current_time()
+        timestamp=get_current_time(),
+        team_config=get_team_config(message.team_id),
+        priority=message.priority
     )
 
     logger.info(f"Conversation saved with session_id: {_session_id} and user_id: {_user_id}")
@@ -374,6 +440,7 @@ async def chat_endpoint(
 async def chat_stream(
     session_id: str = Query(...),
     user_id: str = Query(...),
+    resume: bool = Query(False),
     # db: Session = Depends(get_db),
     user: dict = Depends(validate_token)
 ):
@@ -382,6 +449,7 @@ async def chat_stream(
     logger = logging.getLogger("chat_stream")
     logger.setLevel(logging.WARNING)
     logger.info(f"Chat stream started for session_id: {session_id} and user_id: {user_id}")
+    profiler.bind_session(session_id)
     # create folder for logs if not exists
     logs_dir="./logs"
     if not os.path.exists(logs_dir):    
@@ -398,29 +466,73 @@ async def chat_stream(
 
     _run_locally = conversation["run_mode_locally"]
     _agents = conversation["agents"]
+    _priority = conversation.get("priority", "interactive")
+
+
+    # Root span of the session trace; the worker (or the team run below) adds its spans underneath
+    session_trace = tracing.start_session_trace(session_id, user_id)
+
+    if app.state.session_workers is not None:
+        with tracing.activate(session_trace):
+            traceparent = tracing.traceparent()
+        # Worker-pool mode: the session runs in a worker process, we only relay its events
+        stream = app.state.session_workers.stream_session({
+            "session_id": session_id,
+            "user_id": user_id,
+            "task": task,
+            "agents": _agents,
+            "run_locally": _run_locally,
+            "team_config": conversation.get("team_config"),
+            "logs_dir": logs_dir,
+            "resume": resume,
+            "traceparent": traceparent,
+            "priority": _priority,
+        })
+        cancellation_token = RemoteCancellationToken(app.state.session_workers, session_id)
+        logger.info(f"Session {session_id} dispatched to a session worker")
+    else:
+        #  Initialize the MagenticOne system with user_id
+        magentic_one = MagenticOneHelper(
+            logs_dir=logs_dir,
+            save_screenshots=False,
+            run_locally=_run_locally,
+            user_id=user_id,
+            llm_config=get_llm_config(),
+            team_config=conversation.get("team_config"),
+            priority=_priority
+        )
+        logger.info(f"Initializing MagenticOne with agents: {len(_agents)} and session_id: {session_id} and user_id: {user_id}")
+        try:
+            with tracing.activate(session_trace):
+                await magentic_one.initialize(agents=_agents, session_id=session_id)
+                logger.info(f"Initialized MagenticOne with agents: {len(_agents)} and session_id: {session_id} and user_id: {user_id}")
 
-
-    #  Initialize the MagenticOne system with user_id
-    magentic_one = MagenticOneHelper(
-        logs_dir=logs_dir,
-        save_screenshots=False,
-        run_locally=_run_locally,
-        user_id=user_id,
-        llm_config=get_llm_config()
-    )
-    logger.info(f"Initializing MagenticOne with agents: {len(_agents)} and session_id: {session_id} and user_id: {user_id}")
-    await magentic_one.initialize(agents=_agents, session_id=session_id)
-    logger.info(f"Initialized MagenticOne with agents: {len(_agents)} and session_id: {session_id} and user_id: {user_id}")
-
-    stream, cancellation_token = await magentic_one.main(task = task)
-    logger.info(f"Stream and cancellation token created for task: {task}")
+                stream, cancellation_token = await magentic_one.main(task = task, resume = resume)
+        except Exception as e:
+            if session_trace is not None:
+                session_trace.end(e)
+            raise
+        logger.info(f"Stream and cancellation token created for task: {task}")
+    session_data[session_id] = {"cancellation_token": cancellation_token}
 
 
     async def event_generator(stream, conversation):
-
-        async for log_entry in stream:
-            json_response = await display_log_message(log_entry=log_entry, logs_dir=logs_dir, session_id=magentic_one.session_id, conversation=conversation, user_id=user_id)    
-            yield f"data: {json.dumps(json_response.to_json())}\n\n"
+        error = None
+        profiler.bind_session(session_id)
+        try:
+            # The team's runtime starts on the first message, inside the session's trace context
+            with tracing.activate(session_trace):
+                async for log_entry in stream:
+                    json_response = await display_log_message(log_entry=log_entry, logs_dir=logs_dir, session_id=session_id, conversation=conversation, user_id=user_id)
+                    SSE_EVENTS_TOTAL.inc(type=json_response.type or "unknown")
+                    yield f"data: {json.dumps(json_response.to_json())}\n\n"
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            session_data.pop(session_id, None)
+            if session_trace is not None:
+                session_trace.end(error)
 
 
     return StreamingResponse(event_generator(stream, conversation), media_type="text/event-stream")
@@ -474,6 +586,7 @@ async def delete_conversation(session_id: str = Query(...), user_id: str = Query
     logger.info(f"Deleting conversation with session_id: {session_id} for user_id: {user_id}")
     try:
         # result = crud.delete_conversation(user["sub"], session_id)
+        await asyncio.to_thread(crud.delete_checkpoint, user_id, session_id)
         result = app.state.db.delete_user_conversation(user_id=user_id, session_id=session_id)
         if result:
             logger.info(f"Conversation {session_id} deleted successfully.")
@@ -485,6 +598,106 @@ async def delete_conversation(session_id: str = Query(...), user_id: str = Query
         logger.error(f"Error deleting conversation {session_id}: {str(e)}")
         return {"status": "error", "message": f"Error deleting conversation: {str(e)}"}
     
+@app.get("/llm/scheduler")
+async def llm_scheduler_stats():
+    """Queue depth, in-flight requests and wait times per model."""
+    from llm_scheduler import get_scheduler
+    return get_scheduler().snapshot()
+
+@app.get("/llm/cache")
+async def llm_cache_stats():
+    """Completion cache mode, hit/miss counters and store size."""
+    from llm_cache import cache_stats
+    return await asyncio.to_thread(cache_stats)
+
+@app.get("/workers")
+async def session_workers_stats():
+    """Session worker processes and their load (empty when running in-process)."""
+    if app.state.session_workers is None:
+        return {"workers": [], "restarts": 0}
+    return app.state.session_workers.stats()
+
+@app.get("/executors")
+async def code_executor_stats():
+    """Warm Docker code executor containers of this process (idle, leased, reuse counters)."""
+    if not executor_pool_enabled():
+        return {"enabled": False}
+    return {"enabled": True, **get_executor_pool().stats()}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus metrics of this process: session setup, agent turns, LLM and tool calls, persistence, SSE."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/sessions/{session_id}/trace")
+async def get_session_trace(session_id: str, user: dict = Depends(validate_token)):
+    """Spans of a session (OTLP/JSON, ordered by start time) with time per span name."""
+    # only the owner of the session may read its trace
+    conversation = await asyncio.to_thread(crud.get_conversation, user["sub"], session_id)
+    if conversation is None:
+        raise HTTPException(status_code=404, detail=f"No trace for session {session_id}")
+    spans = await asyncio.to_thread(tracing.read_session_trace, session_id)
+    if not spans:
+        raise HTTPException(status_code=404, detail=f"No trace for session {session_id}")
+    return {"session_id": session_id, "summary": tracing.summarize_trace(spans), "spans": spans}
+
+@app.post("/admin/profile/start")
+async def start_profile(payload: dict = None, user: dict = Depends(require_admin)):
+    """Start the sampling profiler, for the whole process or (with session_id) one session's tasks.
+
+    Payload: ``{"session_id": ..., "seconds": 30, "interval_ms": 5}``, all optional. Duration and
+    overhead are capped by PROFILER_MAX_SECONDS and PROFILER_MAX_OVERHEAD. With session workers,
+    a session-scoped profile runs in the worker that holds the session.
+    """
+    payload = payload or {}
+    session_id = payload.get("session_id")
+    options = {k: payload[k] for k in ("seconds", "interval_ms") if payload.get(k) is not None}
+    try:
+        if session_id and app.state.session_workers is not None:
+            return await app.state.session_workers.profile(session_id, "start", **options)
+        return profiler.start_profile(session_id=session_id, **options)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.post("/admin/profile/stop")
+async def stop_profile(session_id: str = Query(None), format: str = Query("folded"), user: dict = Depends(require_admin)):
+    """Stop the profiler and return the profile as collapsed stacks (``folded``), ``speedscope`` JSON or ``stats``."""
+    try:
+        if session_id and app.state.session_workers is not None:
+            result = await app.state.session_workers.profile(session_id, "stop")
+        else:
+            result = profiler.stop_profile()
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="No profile has been recorded.")
+    if format == "speedscope":
+        return profiler.to_speedscope(result)
+    if format == "stats":
+        return result["stats"]
+    return PlainTextResponse(profiler.to_folded(result))
+
+@app.get("/admin/profile")
+async def profile_status(user: dict = Depends(require_admin)):
+    """State of the sampling profiler of this process (running, samples, measured overhead)."""
+    return profiler.profile_status()
+
+@app.get("/browsers")
+async def browser_pool_stats():
+    """Shared WebSurfer browsers of this process: open contexts, utilization, recycling."""
+    if not browser_pool_enabled():
+        return {"enabled": False}
+    return {"enabled": True, **get_browser_pool().stats()}
+
+@app.get("/mcp/sessions")
+async def mcp_session_stats():
+    """Shared MCP server connections of this process and per-tool call latency."""
+    from mcp_sessions import get_mcp_session_manager
+
+    return get_mcp_session_manager().stats()
+
 @app.get("/health")
 async def health_check():
     logger = logging.getLogger("health_check")
@@ -503,6 +716,8 @@ async def upload_files(indexName: str = Form(...), files: List[UploadFile] = Fil
         # print("Uploading file:", file.filename)
         logger.info(f"Uploading file: {file.filename}")
     try:
+        import aisearch  # faiss / Azure Search are only loaded when indexing
+
         await aisearch.process_upload_and_index(indexName, files)
         logger.info(f"Files processed and indexed successfully.")
     except Exception as err:
@@ -533,6 +748,7 @@ async def get_team_api(team_id: str):
 
 @app.post("/teams")
 async def create_team_api(team: dict):
+    validate_team_config(team)
     try:
         team["agents"] = MAGENTIC_ONE_DEFAULT_AGENTS
         response = app.state.db.create_team(team)
@@ -544,6 +760,7 @@ async def create_team_api(team: dict):
 async def update_team_api(team_id: str, team: dict):
     logger = logging.getLogger("update_team_api")
     logger.info(f"Updating team with ID: {team_id} and data: {team}")
+    validate_team_config(team)
     try:
         response = app.state.db.update_team(team_id, team)
         if "error" in response:
@@ -582,8 +799,11 @@ async def initialize_teams_api():
 
 @app.post("/tools/calculator")
 async def calculator_tool_endpoint(payload: dict):
+    from tools.calculator import calculator
+
     try:
-        result = calculator(payload.get("a"), payload.get("b"), payload.get("operator", "+"))
+        with tool_call("calculator", "function"):
+            result = calculator(payload.get("a"), payload.get("b"), payload.get("operator", "+"))
         return {"result": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -591,8 +811,11 @@ async def calculator_tool_endpoint(payload: dict):
 
 @app.post("/tools/google_search")
 async def google_search_tool_endpoint(payload: dict):
+    from tools.google_search import google_search
+
     try:
-        results = await google_search(**payload)
+        with tool_call("google_search", "web"):
+            results = await google_search(**payload)
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -600,8 +823,11 @@ async def google_search_tool_endpoint(payload: dict):
 
 @app.post("/tools/bing_search")
 async def bing_search_tool_endpoint(payload: dict):
+    from tools.bing_search import bing_search
+
     try:
-        results = await bing_search(**payload)
+        with tool_call("bing_search", "web"):
+            results = await bing_search(**payload)
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -609,8 +835,11 @@ async def bing_search_tool_endpoint(payload: dict):
 
 @app.post("/tools/fetch_webpage")
 async def fetch_webpage_tool_endpoint(payload: dict):
+    from tools.fetch_webpage import fetch_webpage
+
     try:
-        content = await fetch_webpage(**payload)
+        with tool_call("fetch_webpage", "web"):
+            content = await fetch_webpage(**payload)
         return {"content": content}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -618,8 +847,11 @@ async def fetch_webpage_tool_endpoint(payload: dict):
 
 @app.post("/tools/generate_image")
 async def generate_image_tool_endpoint(payload: dict):
+    from tools.generate_image import generate_image
+
     try:
-        paths = await generate_image(**payload)
+        with tool_call("generate_image", "function"):
+            paths = await generate_image(**payload)
         return {"paths": paths}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -627,8 +859,11 @@ async def generate_image_tool_endpoint(payload: dict):
 
 @app.post("/tools/generate_pdf")
 async def generate_pdf_tool_endpoint(payload: dict):
+    from tools.generate_pdf import generate_pdf
+
     try:
-        path = await generate_pdf(**payload)
+        with tool_call("generate_pdf", "function"):
+            path = await generate_pdf(**payload)
         return {"path": path}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -638,45 +873,53 @@ async def generate_pdf_tool_endpoint(payload: dict):
 # AutoGenBench Endpoints
 # ---------------------------------------------------------------------------
 
-@app.post("/bench/run")
+@app.post("/bench/run", status_code=202)
 async def run_bench(payload: dict):
-    """Run AutoGenBench scenarios and store results."""
+    """Submit AutoGenBench scenarios as a background job; poll /bench/jobs/{job_id} for progress."""
     try:
-        scenario = payload.get("scenario")
-        repeats = int(payload.get("repeats", 1))
-        config_path = payload.get("config")
-        results_dir = payload.get("results_dir", "bench_results")
         subsample = payload.get("subsample")
-
-        from autogenbench.run_cmd import run_scenarios
-        from autogen import config_list_from_json
-
-        config_list = config_list_from_json(env_or_file=config_path)
-        run_scenarios(
-            scenario=scenario,
-            n_repeats=repeats,
-            is_native=True,
-            config_list=config_list,
-            requirements=None,
-            results_dir=results_dir,
+        parallel = payload.get("parallel")
+        job = await bench_jobs.get_bench_runner().submit(
+            scenario=payload.get("scenario"),
+            config=payload.get("config"),
+            results_dir=payload.get("results_dir", "bench_results"),
+            repeats=int(payload.get("repeats", 1)),
+            parallel=int(parallel) if parallel is not None else None,
             subsample=float(subsample) if subsample is not None else None,
         )
-
-        return {"status": "completed", "results_dir": results_dir}
+        return job.to_dict(results=False)
+    except (FileNotFoundError, ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/bench/jobs")
+async def list_bench_jobs():
+    return [job.to_dict(results=False) for job in bench_jobs.get_bench_runner().jobs()]
+
+
+@app.get("/bench/jobs/{job_id}")
+async def get_bench_job(job_id: str):
+    """Status of a benchmark job with the outcome of each finished repetition."""
+    job = bench_jobs.get_bench_runner().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Benchmark job not found")
+    return job.to_dict()
+
+
+@app.post("/bench/jobs/{job_id}/cancel")
+async def cancel_bench_job(job_id: str):
+    job = bench_jobs.get_bench_runner().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Benchmark job not found")
+    return job.to_dict(results=False)
+
+
 @app.get("/bench/results")
 async def bench_results(results_dir: str = Query("bench_results")):
     """Return tabulated benchmark results."""
     try:
-        import io, contextlib
-        from autogenbench.tabulate_cmd import default_tabulate
-
-        buffer = io.StringIO()
-        with contextlib.redirect_stdout(buffer):
-            default_tabulate(["bench", results_dir, "--csv"])
-        return {"csv": buffer.getvalue()}
+        return await bench_jobs.get_bench_runner().tabulate(results_dir)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
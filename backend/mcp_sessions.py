@@ -0,0 +1,295 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional, Sequence
+
+import anyio
+from autogen_core import CancellationToken
+from autogen_ext.tools.mcp import SseMcpToolAdapter, SseServerParams, StdioMcpToolAdapter, StdioServerParams
+from autogen_ext.tools.mcp._session import create_mcp_server_session
+from mcp import ClientSession, types
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED
+
+from metrics import TOOL_CALL_SECONDS, TOOL_ERRORS_TOTAL
+from tracing import span, traceparent
+
+# Errors that mean the connection itself is gone (as opposed to a failing tool).
+_CONNECTION_ERRORS = (
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+    ConnectionError,
+    OSError,
+)
+
+
+class _ToolStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self._times = deque(maxlen=256)
+
+    def record(self, elapsed: float, error: bool) -> None:
+        self.calls += 1
+        self.errors += int(error)
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        self._times.append(elapsed)
+
+    def to_json(self) -> dict:
+        times = sorted(self._times)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "latency_avg": round(self.total_time / self.calls, 4) if self.calls else 0.0,
+            "latency_p95": round(times[int(0.95 * (len(times) - 1))], 4) if times else 0.0,
+            "latency_max": round(self.max_time, 4),
+        }
+
+
+class McpServerConnection:
+    """One long-lived MCP client session to a server, reconnected with backoff.
+
+    The MCP session is an async context manager bound to the task that
+    entered it, so a background task owns it for its whole life and callers
+    only borrow the ``ClientSession``. Tools are listed once per connect.
+    """
+
+    def __init__(self, name: str, server_params, connect_timeout: float = 30, max_backoff: float = 30):
+        self.name = name
+        self.server_params = server_params
+        self.connect_timeout = connect_timeout
+        self.max_backoff = max_backoff
+        self.tools = []
+        self.connects = 0
+        self.last_error: Optional[str] = None
+        self.tool_stats: Dict[str, _ToolStats] = {}
+
+        self._session: Optional[ClientSession] = None
+        self._ready = asyncio.Event()
+        self._wake = asyncio.Event()
+        self._closing = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._session is not None
+
+    def _start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        logger = logging.getLogger("mcp_sessions")
+        backoff = 0.5
+        while not self._closing:
+            try:
+                async with create_mcp_server_session(self.server_params) as session:
+                    await session.initialize()
+                    self.tools = (await session.list_tools()).tools
+                    self._session = session
+                    self.connects += 1
+                    self.last_error = None
+                    backoff = 0.5
+                    self._wake.clear()
+                    self._ready.set()
+                    logger.info(f"MCP server {self.name} connected, {len(self.tools)} tools")
+                    await self._wake.wait()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning(f"MCP server {self.name} connection failed: {e}")
+            finally:
+                self._session = None
+                self._ready.clear()
+            if self._closing:
+                return
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def session(self) -> ClientSession:
+        """Return the shared session, connecting (or waiting for a reconnect) if needed."""
+        self._start()
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=self.connect_timeout)
+        except asyncio.TimeoutError:
+            raise ConnectionError(
+                f"Could not connect to MCP server {self.name} within {self.connect_timeout}s: {self.last_error}"
+            ) from None
+        return self._session
+
+    def mark_broken(self, session: ClientSession) -> None:
+        """Drop ``session`` and reconnect, unless a newer session already replaced it."""
+        if session is self._session:
+            self._session = None
+            self._ready.clear()
+            self._wake.set()
+
+    def stats(self, tool_name: str) -> _ToolStats:
+        if tool_name not in self.tool_stats:
+            self.tool_stats[tool_name] = _ToolStats()
+        return self.tool_stats[tool_name]
+
+    async def close(self) -> None:
+        self._closing = True
+        self._wake.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout=5)
+            except (asyncio.TimeoutError, asyncio.CancelledError, Exception):
+                self._task.cancel()
+
+
+class _TracedSession:
+    """Shared session whose tool calls carry the caller's W3C ``traceparent`` in the request ``_meta``."""
+
+    def __init__(self, session: ClientSession, traceparent: str):
+        self._session = session
+        self._traceparent = traceparent
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    async def call_tool(self, name: str, arguments: Optional[dict] = None) -> types.CallToolResult:
+        params = types.CallToolRequestParams(
+            name=name, arguments=arguments, _meta=types.RequestParams.Meta(traceparent=self._traceparent)
+        )
+        return await self._session.send_request(
+            types.ClientRequest(types.CallToolRequest(method="tools/call", params=params)),
+            types.CallToolResult,
+        )
+
+
+class _SharedSessionMixin:
+    """Runs an MCP tool over the connection's shared session instead of a new one per call."""
+
+    _connection: McpServerConnection
+
+    async def run(self, args, cancellation_token: CancellationToken):
+        kwargs = args.model_dump(exclude_unset=True)
+        stats = self._connection.stats(self.name)
+        started = time.perf_counter()
+        error = True
+        try:
+            with span("tool.call", tool=self.name, kind="mcp", server=self._connection.name):
+                parent = traceparent()
+                for attempt in range(2):
+                    session = await self._connection.session()
+                    try:
+                        call_session = _TracedSession(session, parent) if parent else session
+                        result = await self._call(call_session, kwargs, cancellation_token)
+                        error = False
+                        return result
+                    except _CONNECTION_ERRORS:
+                        # The request never reached the server, so it is safe to send it again.
+                        self._connection.mark_broken(session)
+                        if attempt:
+                            raise
+                        stats.retries += 1
+                    except McpError as e:
+                        # Dropped while in flight: reconnect, but do not repeat a call that may have run.
+                        if e.error.code == CONNECTION_CLOSED:
+                            self._connection.mark_broken(session)
+                        raise
+        finally:
+            elapsed = time.perf_counter() - started
+            stats.record(elapsed, error)
+            TOOL_CALL_SECONDS.observe(elapsed, tool=self.name, kind="mcp")
+            if error:
+                TOOL_ERRORS_TOTAL.inc(tool=self.name, kind="mcp")
+
+    async def _call(self, session: ClientSession, arguments: dict, cancellation_token: CancellationToken) -> list:
+        if cancellation_token.is_cancelled():
+            raise asyncio.CancelledError("Operation cancelled")
+        future = asyncio.ensure_future(session.call_tool(self.name, arguments))
+        cancellation_token.link_future(future)
+        result = await future
+        if result.isError:
+            # the tool's own error message, as the model would see its result
+            raise RuntimeError(self.return_value_as_string(result.content))
+        return result.content
+
+
+class SharedSseMcpToolAdapter(_SharedSessionMixin, SseMcpToolAdapter):
+    def __init__(self, connection: McpServerConnection, tool):
+        super().__init__(server_params=connection.server_params, tool=tool)
+        self._connection = connection
+
+
+class SharedStdioMcpToolAdapter(_SharedSessionMixin, StdioMcpToolAdapter):
+    def __init__(self, connection: McpServerConnection, tool):
+        super().__init__(server_params=connection.server_params, tool=tool)
+        self._connection = connection
+
+
+class McpSessionManager:
+    """Process-wide registry of MCP server connections, one per server."""
+
+    def __init__(self, connect_timeout: float = 30):
+        self.connect_timeout = connect_timeout
+        self._connections: Dict[str, McpServerConnection] = {}
+
+    @staticmethod
+    def _server_key(server_params) -> str:
+        return server_params.model_dump_json()
+
+    def connection(self, server_params, name: str = None) -> McpServerConnection:
+        key = self._server_key(server_params)
+        if key not in self._connections:
+            if name is None:
+                name = getattr(server_params, "url", None) or " ".join(
+                    [getattr(server_params, "command", "")] + list(getattr(server_params, "args", []))
+                )
+            self._connections[key] = McpServerConnection(name, server_params, connect_timeout=self.connect_timeout)
+        return self._connections[key]
+
+    async def adapters(self, server_params, tool_names: Sequence[str] = None) -> List:
+        """Tool adapters for ``tool_names`` (all tools if ``None``) sharing the server's session."""
+        connection = self.connection(server_params)
+        await connection.session()
+        by_name = {tool.name: tool for tool in connection.tools}
+        if tool_names is None:
+            tool_names = list(by_name)
+        missing = [name for name in tool_names if name not in by_name]
+        if missing:
+            raise ValueError(f"Tool(s) {', '.join(missing)} not found, available tools: {', '.join(by_name)}")
+        if isinstance(server_params, StdioServerParams):
+            adapter_cls = SharedStdioMcpToolAdapter
+        elif isinstance(server_params, SseServerParams):
+            adapter_cls = SharedSseMcpToolAdapter
+        else:
+            raise ValueError(f"Unsupported MCP server parameters: {type(server_params).__name__}")
+        return [adapter_cls(connection, by_name[name]) for name in tool_names]
+
+    def stats(self) -> dict:
+        return {
+            connection.name: {
+                "connected": connection.connected,
+                "connects": connection.connects,
+                "last_error": connection.last_error,
+                "tools": [tool.name for tool in connection.tools],
+                "tool_calls": {name: s.to_json() for name, s in connection.tool_stats.items()},
+            }
+            for connection in self._connections.values()
+        }
+
+    async def close(self) -> None:
+        for connection in self._connections.values():
+            await connection.close()
+        self._connections.clear()
+
+
+_manager: Optional[McpSessionManager] = None
+
+
+def get_mcp_session_manager() -> McpSessionManager:
+    global _manager
+    if _manager is None:
+        _manager = McpSessionManager(connect_timeout=float(os.getenv("MCP_CONNECT_TIMEOUT", 30)))
+    return _manager
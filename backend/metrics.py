@@ -0,0 +1,254 @@
+import bisect
+import functools
+import inspect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+# Seconds; covers a fast cache hit up to a slow multi-minute agent turn.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def metrics_enabled() -> bool:
+    return os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._enabled = metrics_enabled()
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if not self._enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items
+        ]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket (non-cumulative, last one is +Inf), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        if not self._enabled:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, [list(e[0]), e[1], e[2]]) for key, e in self._values.items())
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """In-process metrics rendered in the Prometheus text exposition format.
+
+    Updates are a dict lookup and an add under a per-metric lock, so they are
+    cheap enough for the hot paths (every LLM call, tool call and SSE event).
+    Values are per process: with SESSION_WORKERS each worker keeps its own.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+SESSION_SETUP_SECONDS = REGISTRY.histogram(
+    "magentic_session_setup_seconds", "Time spent in MagenticOneHelper.initialize (clients and agents)."
+)
+AGENT_TURN_SECONDS = REGISTRY.histogram(
+    "magentic_agent_turn_seconds", "Duration of one agent turn (on_messages_stream).", ["agent"]
+)
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "magentic_llm_request_seconds", "Latency of chat completion calls to the model.", ["model"]
+)
+LLM_REQUESTS_TOTAL = REGISTRY.counter(
+    "magentic_llm_requests_total", "Chat completion calls by outcome.", ["model", "outcome"]
+)
+LLM_TOKENS_TOTAL = REGISTRY.counter(
+    "magentic_llm_tokens_total", "Tokens used by chat completion calls.", ["model", "kind"]
+)
+TOOL_CALL_SECONDS = REGISTRY.histogram(
+    "magentic_tool_call_seconds", "Latency of tool calls (search, fetch, FAISS, MCP ...).", ["tool", "kind"]
+)
+TOOL_ERRORS_TOTAL = REGISTRY.counter(
+    "magentic_tool_errors_total", "Tool calls that raised.", ["tool", "kind"]
+)
+AGENT_TOOL_CALL_SECONDS = REGISTRY.histogram(
+    "magentic_agent_tool_call_seconds", "Latency of each tool call made by an agent (after waiting for a slot).",
+    ["agent", "tool"]
+)
+AGENT_TOOL_CALLS_TOTAL = REGISTRY.counter(
+    "magentic_agent_tool_calls_total", "Tool calls made by agents by outcome (ok, error, timeout).",
+    ["agent", "tool", "outcome"]
+)
+EMBEDDING_REQUEST_SECONDS = REGISTRY.histogram(
+    "magentic_embedding_request_seconds", "Latency of batched embedding requests to the model.", ["model"]
+)
+EMBEDDING_BATCH_SIZE = REGISTRY.histogram(
+    "magentic_embedding_batch_size", "Texts per embedding request sent by the embedding batcher.", ["model"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+EMBEDDING_WAIT_SECONDS = REGISTRY.histogram(
+    "magentic_embedding_wait_seconds", "Time embed() calls waited for their batch to be sent.", ["model"]
+)
+PERSISTENCE_WRITE_SECONDS = REGISTRY.histogram(
+    "magentic_persistence_write_seconds", "Latency of conversation and checkpoint writes.", ["operation"]
+)
+LLM_ROUTE_REQUEST_SECONDS = REGISTRY.histogram(
+    "magentic_llm_route_request_seconds", "Latency of chat completion attempts by model route.", ["route", "model"]
+)
+LLM_ROUTE_REQUESTS_TOTAL = REGISTRY.counter(
+    "magentic_llm_route_requests_total", "Chat completion attempts by model route and outcome (ok, fallback, error).",
+    ["route", "model", "outcome"]
+)
+LLM_ROUTE_COST_TOTAL = REGISTRY.counter(
+    "magentic_llm_route_cost_total", "Cost of chat completions by model route (route cost_per_1k prices).",
+    ["route", "model"]
+)
+CONTEXT_COMPACTIONS_TOTAL = REGISTRY.counter(
+    "magentic_context_compactions_total", "Prompts compacted to fit the agent's context budget.", ["agent"]
+)
+CONTEXT_TOKENS_REMOVED_TOTAL = REGISTRY.counter(
+    "magentic_context_tokens_removed_total", "Estimated prompt tokens removed by context compaction.", ["agent"]
+)
+SESSION_TERMINATIONS_TOTAL = REGISTRY.counter(
+    "magentic_session_terminations_total", "Sessions stopped early by a termination condition.", ["condition"]
+)
+SSE_EVENTS_TOTAL = REGISTRY.counter(
+    "magentic_sse_events_total", "Server-sent events streamed to clients (rate() gives events per second).", ["type"]
+)
+
+
+def timed(histogram: Histogram, **labels):
+    """Decorator recording the duration of a sync or async function in ``histogram``."""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with histogram.time(**labels):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with histogram.time(**labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def tool_call(tool: str, kind: str):
+    """Record latency (and errors) of one tool call."""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        TOOL_ERRORS_TOTAL.inc(tool=tool, kind=kind)
+        raise
+    finally:
+        TOOL_CALL_SECONDS.observe(time.perf_counter() - started, tool=tool, kind=kind)
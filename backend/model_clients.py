@@ -0,0 +1,148 @@
+import time
+from typing import Any, AsyncGenerator, Mapping, Optional, Sequence, Union
+
+from autogen_core import CancellationToken
+from autogen_core.models import (
+    ChatCompletionClient,
+    CreateResult,
+    LLMMessage,
+    ModelCapabilities,
+    ModelInfo,
+    RequestUsage,
+)
+from autogen_core.tools import Tool, ToolSchema
+from pydantic import BaseModel
+
+
+class DelegatingChatCompletionClient(ChatCompletionClient):
+    """Base class for clients that wrap another ``ChatCompletionClient``.
+
+    Every call is forwarded to ``inner`` unchanged. Subclasses override
+    ``create``/``create_stream`` to add behaviour (accounting, scheduling,
+    caching ...) around the wrapped client, so wrappers can be stacked.
+    """
+
+    def __init__(self, inner: ChatCompletionClient):
+        self._inner = inner
+
+    @property
+    def inner(self) -> ChatCompletionClient:
+        return self._inner
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        return await self._inner.create(
+            messages,
+            tools=tools,
+            json_output=json_output,
+            extra_create_args=extra_create_args,
+            cancellation_token=cancellation_token,
+        )
+
+    def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        return self._inner.create_stream(
+            messages,
+            tools=tools,
+            json_output=json_output,
+            extra_create_args=extra_create_args,
+            cancellation_token=cancellation_token,
+        )
+
+    async def close(self) -> None:
+        await self._inner.close()
+
+    def actual_usage(self) -> RequestUsage:
+        return self._inner.actual_usage()
+
+    def total_usage(self) -> RequestUsage:
+        return self._inner.total_usage()
+
+    def count_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return self._inner.count_tokens(messages, tools=tools)
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return self._inner.remaining_tokens(messages, tools=tools)
+
+    @property
+    def capabilities(self) -> ModelCapabilities:  # type: ignore
+        return self._inner.capabilities  # type: ignore
+
+    @property
+    def model_info(self) -> ModelInfo:
+        return self._inner.model_info
+
+    def __getattr__(self, name: str) -> Any:
+        # Fall through to the wrapped client for provider specific attributes.
+        if name == "_inner":
+            raise AttributeError(name)
+        return getattr(self._inner, name)
+
+
+class InstrumentedChatCompletionClient(DelegatingChatCompletionClient):
+    """Records latency, outcome and token usage of every completion in ``metrics`` and the session trace."""
+
+    def __init__(self, inner: ChatCompletionClient, model: str):
+        super().__init__(inner)
+        self._model = model
+
+    def _record(self, started: float, outcome: str, usage: Optional[RequestUsage]) -> None:
+        from metrics import LLM_REQUEST_SECONDS, LLM_REQUESTS_TOTAL, LLM_TOKENS_TOTAL
+
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, model=self._model)
+        LLM_REQUESTS_TOTAL.inc(model=self._model, outcome=outcome)
+        if usage is not None:
+            LLM_TOKENS_TOTAL.inc(usage.prompt_tokens, model=self._model, kind="prompt")
+            LLM_TOKENS_TOTAL.inc(usage.completion_tokens, model=self._model, kind="completion")
+
+    async def create(self, messages, **kwargs) -> CreateResult:
+        from tracing import span
+
+        started = time.perf_counter()
+        with span("llm.request", model=self._model) as current_span:
+            try:
+                result = await self._inner.create(messages, **kwargs)
+            except Exception:
+                self._record(started, "error", None)
+                raise
+            except BaseException:
+                self._record(started, "cancelled", None)
+                raise
+            if current_span is not None and result.usage is not None:
+                current_span.set_attribute("llm.prompt_tokens", result.usage.prompt_tokens)
+                current_span.set_attribute("llm.completion_tokens", result.usage.completion_tokens)
+        self._record(started, "ok", result.usage)
+        return result
+
+    async def create_stream(self, messages, **kwargs) -> AsyncGenerator[Union[str, CreateResult], None]:
+        from tracing import span_stream
+
+        started = time.perf_counter()
+        usage = None
+        try:
+            stream = span_stream("llm.request", self._inner.create_stream(messages, **kwargs), model=self._model, stream=True)
+            async for chunk in stream:
+                if isinstance(chunk, CreateResult):
+                    usage = chunk.usage
+                yield chunk
+        except Exception:
+            self._record(started, "error", None)
+            raise
+        except BaseException:
+            self._record(started, "cancelled", usage)
+            raise
+        self._record(started, "ok", usage)
@@ -0,0 +1,247 @@
+import asyncio
+import contextvars
+import functools
+import json
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncGenerator, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from autogen_core.models import ChatCompletionClient, CreateResult, RequestUsage
+
+from metrics import LLM_ROUTE_COST_TOTAL, LLM_ROUTE_REQUEST_SECONDS, LLM_ROUTE_REQUESTS_TOTAL
+from model_clients import DelegatingChatCompletionClient
+
+# Steps of the MagenticOne orchestrator, set by ResumableMagenticOneOrchestrator around its model calls.
+# "ledger" is the progress ledger, which also selects the next speaker.
+ORCHESTRATOR_ROLES = ("plan", "ledger", "final_answer", "summary")
+
+_role: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("routing_role", default=None)
+
+
+@contextmanager
+def routing_role(role: str):
+    """Mark the model calls made inside the block as ``role`` for ``RoutedChatCompletionClient``."""
+    token = _role.set(role)
+    try:
+        yield
+    finally:
+        _role.reset(token)
+
+
+def current_role() -> Optional[str]:
+    return _role.get()
+
+
+class Route:
+    """A named list of models tried in order, with the cost of their tokens.
+
+    ``timeout`` bounds each attempt (for streams: until the first chunk);
+    ``cost_per_1k`` gives the price of 1000 prompt and completion tokens,
+    per model entry or for the whole route.
+    """
+
+    def __init__(self, name: str, models: Sequence[str], timeout: Optional[float] = None,
+                 costs: Optional[Mapping[str, Tuple[float, float]]] = None):
+        if not models:
+            raise ValueError(f"Route '{name}' has no models")
+        self.name = name
+        self.models = list(models)
+        self.timeout = timeout
+        self.costs = dict(costs or {})
+
+    def cost(self, model: str, usage: Optional[RequestUsage]) -> float:
+        if usage is None or model not in self.costs:
+            return 0.0
+        prompt, completion = self.costs[model]
+        return (usage.prompt_tokens * prompt + usage.completion_tokens * completion) / 1000
+
+    @classmethod
+    def from_config(cls, name: str, config: Union[str, Mapping[str, Any]]) -> "Route":
+        if isinstance(config, str):
+            return cls(name, [config])
+        default_cost = _parse_cost(config.get("cost_per_1k"))
+        models, costs = [], {}
+        for entry in config.get("models") or ([config["model"]] if config.get("model") else []):
+            if isinstance(entry, str):
+                model, cost = entry, default_cost
+            else:
+                model, cost = entry["model"], _parse_cost(entry.get("cost_per_1k")) or default_cost
+            models.append(model)
+            if cost is not None:
+                costs[model] = cost
+        timeout = config.get("timeout")
+        return cls(name, models, timeout=float(timeout) if timeout else None, costs=costs)
+
+
+def _parse_cost(cost) -> Optional[Tuple[float, float]]:
+    if cost is None:
+        return None
+    if isinstance(cost, (int, float)):
+        return float(cost), float(cost)
+    return float(cost.get("prompt", 0)), float(cost.get("completion", 0))
+
+
+class RoutingPolicy:
+    """Which route serves each role of a team.
+
+    Declared in the ``routing`` block of a team definition::
+
+        "routing": {
+            "routes": {
+                "fast": {"models": ["llama3.2:3b", "llama3.1"], "timeout": 30},
+                "strong": {"models": [{"model": "qwen2.5-coder:32b", "cost_per_1k": {"prompt": 0.2, "completion": 0.6}},
+                                      "llama3.1"], "timeout": 180}
+            },
+            "roles": {"ledger": "fast", "summary": "fast", "plan": "strong", "Coder": "strong"}
+        }
+
+    Roles are the orchestrator steps (``ORCHESTRATOR_ROLES``) and agent
+    names or types (case-insensitive, like ``AGENT_MODEL_MAP``). A role may
+    also name a model directly. Roles without a route keep the team's
+    default model.
+    """
+
+    def __init__(self, routes: Optional[Mapping[str, Route]] = None, roles: Optional[Mapping[str, str]] = None):
+        self.routes = dict(routes or {})
+        self.roles = {role.lower(): route for role, route in (roles or {}).items()}
+
+    @classmethod
+    def from_config(cls, config: Optional[Mapping[str, Any]] = None) -> "RoutingPolicy":
+        config = config or {}
+        routes = {name: Route.from_config(name, value) for name, value in (config.get("routes") or {}).items()}
+        roles = {}
+        for role, target in (config.get("roles") or {}).items():
+            if target not in routes:
+                # a bare model name is a single-model route
+                routes[target] = Route(target, [target])
+            roles[role] = target
+        return cls(routes, roles)
+
+    def route_for(self, *roles: Optional[str]) -> Optional[Route]:
+        """The route of the first of ``roles`` that has one."""
+        for role in roles:
+            if role and role.lower() in self.roles:
+                return self.routes[self.roles[role.lower()]]
+        return None
+
+
+@functools.lru_cache(maxsize=64)
+def _parse_policy(raw: str) -> RoutingPolicy:
+    return RoutingPolicy.from_config(json.loads(raw))
+
+
+def get_routing_policy(config: Optional[Mapping[str, Any]] = None) -> RoutingPolicy:
+    """``RoutingPolicy`` of a team's ``routing`` block, parsed once per distinct block."""
+    return _parse_policy(json.dumps(config or {}, sort_keys=True))
+
+
+def _is_fallback_error(e: BaseException) -> bool:
+    """Errors after which the next model of the route is tried: timeouts and overload."""
+    if isinstance(e, asyncio.TimeoutError):
+        return True
+    from llm_scheduler import SchedulerRejectedError
+
+    if isinstance(e, SchedulerRejectedError):
+        return True
+    try:
+        import openai
+    except ImportError:
+        return False
+    return isinstance(e, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError,
+                          openai.InternalServerError))
+
+
+class RouteChatCompletionClient(DelegatingChatCompletionClient):
+    """Serves a ``Route``: tries its models in order, moving on after a timeout or overload.
+
+    ``clients`` holds one client per model of the route (the first is also
+    the one the capabilities are taken from). Latency, outcome and cost of
+    every attempt are recorded per route and model.
+    """
+
+    def __init__(self, route: Route, clients: Sequence[ChatCompletionClient]):
+        super().__init__(clients[0])
+        self.route = route
+        self._clients = list(zip(route.models, clients))
+
+    def _record(self, model: str, started: float, outcome: str, usage: Optional[RequestUsage] = None) -> None:
+        LLM_ROUTE_REQUEST_SECONDS.observe(time.perf_counter() - started, route=self.route.name, model=model)
+        LLM_ROUTE_REQUESTS_TOTAL.inc(route=self.route.name, model=model, outcome=outcome)
+        cost = self.route.cost(model, usage)
+        if cost:
+            LLM_ROUTE_COST_TOTAL.inc(cost, route=self.route.name, model=model)
+
+    async def create(self, messages, **kwargs) -> CreateResult:
+        for i, (model, client) in enumerate(self._clients):
+            started = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(client.create(messages, **kwargs), self.route.timeout)
+            except Exception as e:
+                if i + 1 < len(self._clients) and _is_fallback_error(e):
+                    self._record(model, started, "fallback")
+                    continue
+                self._record(model, started, "error")
+                raise
+            self._record(model, started, "ok", result.usage)
+            return result
+
+    async def create_stream(self, messages, **kwargs) -> AsyncGenerator[Union[str, CreateResult], None]:
+        for i, (model, client) in enumerate(self._clients):
+            started = time.perf_counter()
+            stream = client.create_stream(messages, **kwargs)
+            try:
+                # only the wait for the first chunk can fall back: after it the output is already out
+                first = await asyncio.wait_for(stream.__anext__(), self.route.timeout)
+            except StopAsyncIteration:
+                self._record(model, started, "ok")
+                return
+            except Exception as e:
+                await stream.aclose()
+                if i + 1 < len(self._clients) and _is_fallback_error(e):
+                    self._record(model, started, "fallback")
+                    continue
+                self._record(model, started, "error")
+                raise
+            usage = None
+            try:
+                chunk = first
+                while True:
+                    if isinstance(chunk, CreateResult):
+                        usage = chunk.usage
+                    yield chunk
+                    chunk = await stream.__anext__()
+            except StopAsyncIteration:
+                pass
+            except BaseException:
+                self._record(model, started, "error")
+                raise
+            self._record(model, started, "ok", usage)
+            return
+
+    async def close(self) -> None:
+        for _, client in self._clients:
+            await client.close()
+
+
+class RoutedChatCompletionClient(DelegatingChatCompletionClient):
+    """Sends each request to the client of the ``routing_role`` it is made in, or to ``inner``."""
+
+    def __init__(self, inner: ChatCompletionClient, routes: Mapping[str, ChatCompletionClient]):
+        super().__init__(inner)
+        self._routes: Dict[str, ChatCompletionClient] = dict(routes)
+
+    def _client(self) -> ChatCompletionClient:
+        return self._routes.get(current_role(), self._inner)
+
+    async def create(self, messages, **kwargs) -> CreateResult:
+        return await self._client().create(messages, **kwargs)
+
+    def create_stream(self, messages, **kwargs) -> AsyncGenerator[Union[str, CreateResult], None]:
+        return self._client().create_stream(messages, **kwargs)
+
+    async def close(self) -> None:
+        closed: List[ChatCompletionClient] = []
+        for client in [self._inner, *self._routes.values()]:
+            if not any(client is c for c in closed):
+                closed.append(client)
+                await client.close()
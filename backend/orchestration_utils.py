@@ -1,23 +1,320 @@
-# stop_when_done.py
-from autogen_agentchat.teams import GroupChatManager
-from autogen_agentchat.messages import StopMessage, ToolAgentResponse
-
-class StopWhenDone(GroupChatManager):
-    """End the loop as soon as a tool returns, an explicit StopMessage arrives,
-    or the manager/assistant says a 'done' phrase."""
-    DONE_MARKERS = {
-        "task is finished",
-        "we have completed",
-        "all set",
-        "done",
-        "✅",
-    }
-
-    def is_final(self, message) -> bool:
-        if isinstance(message, (StopMessage, ToolAgentResponse)):
-            return True
-        if message.content:
-            lower = message.content.lower()
-            if any(tok in lower for tok in self.DONE_MARKERS):
-                return True
-        return False
\ No newline at end of file
+import hashlib
+import os
+import re
+from collections import deque
+from typing import Any, Deque, List, Mapping, Optional, Sequence, Set
+
+from autogen_agentchat.base import TerminatedException, TerminationCondition
+from autogen_agentchat.messages import (
+    BaseAgentEvent,
+    BaseChatMessage,
+    StopMessage,
+    ToolCallExecutionEvent,
+    ToolCallRequestEvent,
+    ToolCallSummaryMessage,
+)
+
+from metrics import SESSION_TERMINATIONS_TOTAL
+
+# Whole-task completion phrases for teams that opt in. Bare "done", "all set" or "✅" end far too many
+# ordinary agent replies, and the custom agents sign off every turn with "TERMINATE".
+DONE_MARKERS = ("task is finished", "we have completed")
+# Tools that end a workflow (the MCP mailer) return this
+TOOL_DONE_MARKERS = ("TERMINATE",)
+
+_WORD = re.compile(r"\w+")
+_SENTENCE = re.compile(r"[.!?\n]+")
+
+
+def _last_line(text: str) -> str:
+    lines = [line for line in text.strip().splitlines() if line.strip()]
+    return lines[-1] if lines else ""
+
+
+def _marker_pattern(markers: Sequence[str]) -> Optional[re.Pattern]:
+    """Word-bounded match of any marker; all-caps markers (``TERMINATE``) are case-sensitive, others not."""
+    parts = []
+    for marker in markers:
+        body = re.escape(marker)
+        if marker.isupper():
+            parts.append(rf"(?<!\w){body}(?!\w)")
+        else:
+            parts.append(rf"(?i:(?<!\w){body}(?!\w))")
+    return re.compile("|".join(parts)) if parts else None
+
+
+class _StackCondition(TerminationCondition):
+    """Base of the conditions below: ``terminated`` bookkeeping and the stop message naming the condition."""
+
+    name = ""
+
+    def __init__(self):
+        self._terminated = False
+
+    @property
+    def terminated(self) -> bool:
+        return self._terminated
+
+    def _stop(self, reason: str) -> StopMessage:
+        self._terminated = True
+        SESSION_TERMINATIONS_TOTAL.inc(condition=self.name)
+        return StopMessage(content=reason, source=type(self).__name__)
+
+    async def __call__(self, messages: Sequence[BaseAgentEvent | BaseChatMessage]) -> StopMessage | None:
+        if self._terminated:
+            raise TerminatedException("Termination condition has already been reached")
+        return self._check(messages)
+
+    def _check(self, messages: Sequence[BaseAgentEvent | BaseChatMessage]) -> StopMessage | None:
+        raise NotImplementedError
+
+    async def reset(self) -> None:
+        self._terminated = False
+
+
+class DoneMarkerTermination(_StackCondition):
+    """Stop when the last line of a participant's message contains a done marker.
+
+    ``sources`` limits the agents whose markers count (all participants by
+    default). Markers are only looked for in the last line, where agents
+    put their sign-off, so a plan that mentions one does not end the run.
+    """
+
+    name = "done_marker"
+
+    def __init__(self, markers: Sequence[str] = DONE_MARKERS, sources: Optional[Sequence[str]] = None):
+        super().__init__()
+        self.markers = list(markers)
+        self.sources = set(sources) if sources else None
+        self._pattern = _marker_pattern(self.markers)
+
+    def _check(self, messages):
+        for message in messages:
+            if not isinstance(message, BaseChatMessage) or isinstance(message, StopMessage):
+                continue
+            if self.sources is not None and message.source not in self.sources:
+                continue
+            found = self._pattern.search(_last_line(message.to_text())) if self._pattern else None
+            if found:
+                return self._stop(f"Done marker: {message.source} said '{found.group(0)}'.")
+        return None
+
+
+class ToolResultTermination(_StackCondition):
+    """Stop when a tool result ends with a done marker (``TERMINATE`` from the mailer)."""
+
+    name = "tool_result"
+
+    def __init__(self, markers: Sequence[str] = TOOL_DONE_MARKERS):
+        super().__init__()
+        self.markers = list(markers)
+        self._pattern = _marker_pattern(self.markers)
+
+    def _check(self, messages):
+        if self._pattern is None:
+            return None
+        for message in messages:
+            if isinstance(message, ToolCallExecutionEvent):
+                results = [(r.name or "tool", r.content) for r in message.content]
+            elif isinstance(message, ToolCallSummaryMessage):
+                results = [(message.source, message.content)]
+            else:
+                continue
+            for name, content in results:
+                found = self._pattern.search(_last_line(content))
+                if found:
+                    return self._stop(f"Tool result: {name} returned '{found.group(0)}'.")
+        return None
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class LoopTermination(_StackCondition):
+    """Stop when the conversation repeats itself.
+
+    Participant messages and tool calls (name and arguments) are reduced to
+    digests; the run stops when the last ``max_repeats`` blocks of up to
+    ``max_cycle`` consecutive items are identical, e.g. the same answer three
+    times in a row, or two agents handing the same messages back and forth.
+    """
+
+    name = "loop"
+
+    def __init__(self, max_repeats: int = 3, max_cycle: int = 3):
+        super().__init__()
+        self.max_repeats = max(2, max_repeats)
+        self.max_cycle = max(1, max_cycle)
+        self._history: Deque[str] = deque(maxlen=self.max_repeats * self.max_cycle)
+        self._labels: Deque[str] = deque(maxlen=self.max_repeats * self.max_cycle)
+
+    def _items(self, messages):
+        for message in messages:
+            if isinstance(message, ToolCallRequestEvent):
+                for call in message.content:
+                    yield f"{message.source} called {call.name}", f"call:{call.name}:{_normalize(call.arguments)}"
+            elif isinstance(message, BaseChatMessage) and not isinstance(message, (StopMessage, ToolCallSummaryMessage)):
+                yield message.source, f"{message.source}:{_normalize(message.to_text())}"
+
+    def _check(self, messages):
+        for label, item in self._items(messages):
+            self._history.append(hashlib.sha256(item.encode("utf-8")).hexdigest())
+            self._labels.append(label)
+            history = list(self._history)
+            for cycle in range(1, self.max_cycle + 1):
+                span = cycle * self.max_repeats
+                if len(history) < span:
+                    break
+                tail = history[-span:]
+                if all(tail[i] == tail[i % cycle] for i in range(span)):
+                    steps = ", ".join(list(self._labels)[-cycle:])
+                    return self._stop(f"Loop detected: {steps} repeated {self.max_repeats} times.")
+        return None
+
+    async def reset(self) -> None:
+        await super().reset()
+        self._history.clear()
+        self._labels.clear()
+
+
+class NoProgressTermination(_StackCondition):
+    """Stop when ``window`` participant messages in a row add (almost) nothing new.
+
+    Each message and tool result is split into word ``shingle``-grams (per sentence); its
+    novelty is the share of them not seen earlier in the run. The run stops
+    when none of the last ``window`` messages reached ``min_novelty``.
+    """
+
+    name = "no_progress"
+
+    def __init__(self, window: int = 8, min_novelty: float = 0.05, shingle: int = 3):
+        super().__init__()
+        self.window = max(1, window)
+        self.min_novelty = min_novelty
+        self.shingle = max(1, shingle)
+        self._seen: Set[int] = set()
+        self._novelty: Deque[float] = deque(maxlen=self.window)
+
+    def _shingles(self, text: str) -> Set[int]:
+        # per sentence, so restating earlier sentences in another order is not new
+        shingles = set()
+        for sentence in _SENTENCE.split(text.lower()):
+            words = _WORD.findall(sentence)
+            n = min(self.shingle, len(words))
+            shingles.update(hash(tuple(words[i:i + n])) for i in range(len(words) - n + 1) if n)
+        return shingles
+
+    def _texts(self, messages):
+        for message in messages:
+            if isinstance(message, ToolCallExecutionEvent):
+                for result in message.content:
+                    yield result.content
+            elif isinstance(message, BaseChatMessage) and not isinstance(message, StopMessage):
+                yield message.to_text()
+
+    def _check(self, messages):
+        for text in self._texts(messages):
+            shingles = self._shingles(text)
+            new = shingles - self._seen
+            self._seen |= new
+            self._novelty.append(len(new) / len(shingles) if shingles else 0.0)
+        if len(self._novelty) == self.window and max(self._novelty) < self.min_novelty:
+            return self._stop(f"No progress: the last {self.window} messages added less than "
+                              f"{self.min_novelty:.0%} new content.")
+        return None
+
+    async def reset(self) -> None:
+        await super().reset()
+        self._seen.clear()
+        self._novelty.clear()
+
+
+def _markers(value, env: str, default: Sequence[str]) -> List[str]:
+    if value is None:
+        raw = os.getenv(env)
+        if raw is None:
+            return list(default)
+        value = raw.split(",")
+    if isinstance(value, str):
+        value = [value]
+    return [marker.strip() for marker in value if marker and marker.strip()]
+
+
+class TerminationPolicy:
+    """Termination-condition stack of a team, on top of the session budget.
+
+    Built from the ``termination`` block of a team definition::
+
+        "termination": {
+            "done_markers": ["we have completed"], "done_sources": ["Reporter"],
+            "tool_markers": ["TERMINATE"],
+            "max_repeats": 3, "max_cycle": 3,
+            "no_progress_window": 8, "min_novelty": 0.05,
+            "max_turns": 50, "max_stalls": 5
+        }
+
+    Keys missing from the block fall back to the ``TERMINATION_*``
+    environment variables. Done markers are off unless configured (see
+    ``DONE_MARKERS``); tool results ending in ``TERMINATE``, loops and
+    stalls are detected by default. An empty marker list, ``max_repeats: 0`` or
+    ``no_progress_window: 0`` turns that condition off. ``max_turns`` and
+    ``max_stalls`` are the MagenticOne orchestrator's own limits.
+    """
+
+    def __init__(self, done_markers: Sequence[str] = (), done_sources: Optional[Sequence[str]] = None,
+                 tool_markers: Sequence[str] = TOOL_DONE_MARKERS, max_repeats: int = 3, max_cycle: int = 3,
+                 no_progress_window: int = 8, min_novelty: float = 0.05, max_turns: int = 50, max_stalls: int = 5):
+        self.done_markers = list(done_markers)
+        self.done_sources = list(done_sources) if done_sources else None
+        self.tool_markers = list(tool_markers)
+        self.max_repeats = max_repeats
+        self.max_cycle = max_cycle
+        self.no_progress_window = no_progress_window
+        self.min_novelty = min_novelty
+        self.max_turns = max_turns
+        self.max_stalls = max_stalls
+
+    @classmethod
+    def from_config(cls, config: Optional[Mapping[str, Any]] = None) -> "TerminationPolicy":
+        config = config or {}
+
+        def pick(key: str, env: str, default, cast=int):
+            value = config.get(key)
+            if value is None or value == "":
+                value = os.getenv(env, "").strip() or default
+            return cast(value)
+
+        return cls(
+            done_markers=_markers(config.get("done_markers"), "TERMINATION_DONE_MARKERS", ()),
+            done_sources=config.get("done_sources"),
+            tool_markers=_markers(config.get("tool_markers"), "TERMINATION_TOOL_MARKERS", TOOL_DONE_MARKERS),
+            max_repeats=pick("max_repeats", "TERMINATION_MAX_REPEATS", 3),
+            max_cycle=pick("max_cycle", "TERMINATION_MAX_CYCLE", 3),
+            no_progress_window=pick("no_progress_window", "TERMINATION_NO_PROGRESS_WINDOW", 8),
+            min_novelty=pick("min_novelty", "TERMINATION_MIN_NOVELTY", 0.05, float),
+            max_turns=pick("max_turns", "TERMINATION_MAX_TURNS", 50),
+            max_stalls=pick("max_stalls", "TERMINATION_MAX_STALLS", 5),
+        )
+
+    def conditions(self) -> List[TerminationCondition]:
+        conditions: List[TerminationCondition] = []
+        if self.done_markers:
+            conditions.append(DoneMarkerTermination(self.done_markers, self.done_sources))
+        if self.tool_markers:
+            conditions.append(ToolResultTermination(self.tool_markers))
+        if self.max_repeats > 0:
+            conditions.append(LoopTermination(self.max_repeats, self.max_cycle))
+        if self.no_progress_window > 0:
+            conditions.append(NoProgressTermination(self.no_progress_window, self.min_novelty))
+        return conditions
+
+    def build(self, *base: TerminationCondition) -> Optional[TerminationCondition]:
+        """``base`` conditions (the session budget) or'ed with the stack; the stop message names what fired."""
+        stack = [*base, *self.conditions()]
+        if not stack:
+            return None
+        condition = stack[0]
+        for other in stack[1:]:
+            condition = condition | other
+        return condition
@@ -0,0 +1,291 @@
+import asyncio
+import contextvars
+import os
+import signal
+import sys
+import threading
+import time
+import weakref
+from typing import Dict, Optional
+
+# Session whose tasks are running; set by bind_session and inherited by the tasks they create.
+_SESSION = contextvars.ContextVar("profiler_session", default=None)
+# Task -> session id, filled by the task factory (tasks do not expose their context before 3.12).
+_task_sessions: "weakref.WeakKeyDictionary[asyncio.Task, str]" = weakref.WeakKeyDictionary()
+
+_lock = threading.Lock()
+_active: Optional["SamplingProfiler"] = None
+_last: Optional[dict] = None
+
+
+def _session_task_factory(loop, coro, context=None):
+    if context is None:
+        task = asyncio.Task(coro, loop=loop)
+        session_id = _SESSION.get()
+    else:
+        task = asyncio.Task(coro, loop=loop, context=context)
+        session_id = context.get(_SESSION)
+    if session_id is not None:
+        _task_sessions[task] = session_id
+    return task
+
+
+def install_task_factory(loop: asyncio.AbstractEventLoop) -> None:
+    """Tag the tasks of ``loop`` with the session that created them, for session-scoped profiles."""
+    if loop.get_task_factory() is None:
+        loop.set_task_factory(_session_task_factory)
+
+
+def bind_session(session_id: str) -> None:
+    """Mark the current task, and the tasks it starts from now on, as belonging to ``session_id``."""
+    _SESSION.set(session_id)
+    task = asyncio.current_task()
+    if task is not None:
+        _task_sessions[task] = session_id
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Statistical profiler recording Python stacks every ``interval`` seconds.
+
+    On Unix, when started on the main thread (where uvicorn and the session
+    workers run their event loop), samples are taken by a ``SIGPROF`` handler
+    on a CPU-time interval timer: the handler runs on the event loop thread
+    between bytecodes, so CPU-bound code is sampled where it runs rather
+    than where it releases the GIL, and an idle process is not sampled.
+    Elsewhere a background thread samples with ``sys._current_frames``.
+
+    With ``session_id`` only samples taken while the event loop runs one of
+    the session's tasks are kept; otherwise the stacks of all threads are
+    recorded. Nothing is installed in the profiled code, so profiles can be
+    taken on a live process. The sampler measures its own cost and stretches
+    the interval to stay under ``max_overhead``, and it stops by itself after
+    ``max_seconds``.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.005,
+        max_seconds: float = 30,
+        max_overhead: float = 0.02,
+        session_id: Optional[str] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        loop_thread_id: Optional[int] = None,
+    ):
+        self.interval = max(0.001, interval)
+        self.max_seconds = max_seconds
+        self.max_overhead = max_overhead
+        self.session_id = session_id
+        self.loop = loop
+        self.loop_thread_id = loop_thread_id
+        self.use_signal = hasattr(signal, "setitimer") and loop_thread_id == threading.main_thread().ident
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+        self.ticks = 0
+        self.sampling_time = 0.0
+        self.started_at = 0.0
+        self.stopped_at = 0.0
+        self.stop_reason = ""
+        self._running = False
+        self._timer_interval = self.interval
+        self._previous_handler = None
+        self._deadline_handle = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self) -> None:
+        self.started_at = time.time()
+        self._running = True
+        if self.use_signal:
+            self._previous_handler = signal.signal(signal.SIGPROF, self._on_signal)
+            # restart interrupted system calls, other threads' C code may not expect EINTR
+            signal.siginterrupt(signal.SIGPROF, False)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        else:
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+        if self.loop is not None:
+            self._deadline_handle = self.loop.call_later(self.max_seconds, self.stop, "max_seconds")
+
+    def stop(self, reason: str = "stopped") -> None:
+        """Stop sampling; in signal mode this must run on the main thread."""
+        if not self._running:
+            return
+        self._running = False
+        self.stop_reason = reason
+        if self._deadline_handle is not None:
+            self._deadline_handle.cancel()
+        if self.use_signal:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+        else:
+            self._stop.set()
+            if self._thread is not threading.current_thread():
+                self._thread.join()
+        self.stopped_at = time.time()
+
+    def _on_signal(self, signum, frame) -> None:
+        started = time.perf_counter()
+        self._sample(frame, None)
+        cost = time.perf_counter() - started
+        self.sampling_time += cost
+        self.ticks += 1
+        # back off when a sample costs more than max_overhead of the interval
+        wanted = max(self.interval, cost / self.max_overhead)
+        if wanted > self._timer_interval * 1.25 or (wanted < self._timer_interval / 1.25 and self._timer_interval > self.interval):
+            self._timer_interval = wanted
+            signal.setitimer(signal.ITIMER_PROF, wanted, wanted)
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + self.max_seconds
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            started = time.perf_counter()
+            self._sample(sys._current_frames().get(self.loop_thread_id), own_id)
+            cost = time.perf_counter() - started
+            self.sampling_time += cost
+            self.ticks += 1
+            # sleep long enough that cost / (cost + sleep) stays under max_overhead
+            self._stop.wait(max(self.interval, cost / self.max_overhead - cost))
+        if self._running and self.loop is None:
+            self._running = False
+            self.stop_reason = "max_seconds"
+            self.stopped_at = time.time()
+
+    def _sample(self, loop_frame, own_id: Optional[int]) -> None:
+        if self.session_id is not None:
+            task = asyncio.current_task(self.loop)
+            if task is not None and _task_sessions.get(task) == self.session_id and loop_frame is not None:
+                self._record(loop_frame, None)
+            return
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            if thread_id == self.loop_thread_id and loop_frame is not None:
+                # in signal mode this is the interrupted frame, not the handler's
+                frame = loop_frame
+            self._record(frame, names.get(thread_id, str(thread_id)))
+
+    def _record(self, frame, root: Optional[str]) -> None:
+        stack = []
+        while frame is not None:
+            stack.append(_frame_name(frame))
+            frame = frame.f_back
+        if root is not None:
+            stack.append(root)
+        key = ";".join(reversed(stack))
+        self.stacks[key] = self.stacks.get(key, 0) + 1
+        self.samples += 1
+
+    def stats(self) -> dict:
+        end = self.stopped_at or time.time()
+        duration = max(end - self.started_at, 1e-9)
+        return {
+            "running": self.running,
+            "session_id": self.session_id,
+            "mode": "signal" if self.use_signal else "thread",
+            "started_at": self.started_at,
+            "duration": round(duration, 3),
+            "interval": self.interval,
+            "ticks": self.ticks,
+            "samples": self.samples,
+            "overhead": round(self.sampling_time / duration, 4),
+            "stop_reason": self.stop_reason,
+        }
+
+    def result(self) -> dict:
+        return {"stats": self.stats(), "stacks": dict(self.stacks)}
+
+
+def profiler_limits() -> dict:
+    return {
+        "interval": float(os.getenv("PROFILER_INTERVAL_MS", 5)) / 1000,
+        "max_seconds": float(os.getenv("PROFILER_MAX_SECONDS", 60)),
+        "max_overhead": float(os.getenv("PROFILER_MAX_OVERHEAD", 0.02)),
+    }
+
+
+def start_profile(session_id: Optional[str] = None, seconds: Optional[float] = None,
+                  interval_ms: Optional[float] = None) -> dict:
+    """Start the process profiler; must be called on the event loop thread. One profile at a time."""
+    global _active, _last
+    limits = profiler_limits()
+    with _lock:
+        if _active is not None:
+            if _active.running:
+                raise RuntimeError("A profile is already running.")
+            # finished by its time limit but not collected yet
+            _last = _active.result()
+        _active = SamplingProfiler(
+            interval=interval_ms / 1000 if interval_ms else limits["interval"],
+            max_seconds=min(seconds or limits["max_seconds"], limits["max_seconds"]),
+            max_overhead=limits["max_overhead"],
+            session_id=session_id,
+            loop=asyncio.get_running_loop(),
+            loop_thread_id=threading.get_ident(),
+        )
+        _active.start()
+        return _active.stats()
+
+
+def stop_profile() -> Optional[dict]:
+    """Stop the running profile and return it; returns the last finished profile when none is running."""
+    global _active, _last
+    with _lock:
+        if _active is not None:
+            _active.stop()
+            _last = _active.result()
+            _active = None
+        return _last
+
+
+def profile_status() -> dict:
+    with _lock:
+        if _active is not None:
+            return _active.stats()
+        return _last["stats"] if _last else {"running": False}
+
+
+def to_folded(result: dict) -> str:
+    """Collapsed stacks (``frame;frame;frame count``) for flamegraph.pl, inferno or speedscope."""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(result["stacks"].items()))
+
+
+def to_speedscope(result: dict, name: str = "backend") -> dict:
+    """The profile in speedscope's sampled file format (https://www.speedscope.app)."""
+    frames: list = []
+    index: Dict[str, int] = {}
+    samples, weights = [], []
+    for stack, count in result["stacks"].items():
+        sample = []
+        for frame in stack.split(";"):
+            if frame not in index:
+                index[frame] = len(frames)
+                frames.append({"name": frame})
+            sample.append(index[frame])
+        samples.append(sample)
+        weights.append(count)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "none",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        }],
+        "name": name,
+        "exporter": "magentic-backend",
+    }
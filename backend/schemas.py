@@ -14,6 +14,9 @@ class ChatMessageCreate(ChatMessageBase):
     content: str
     agents: Optional[str] = None
     user_id: Optional[str] = None
+    team_id: Optional[str] = None
+    # LLM scheduler priority class of the session ("interactive" or "bench")
+    priority: Optional[str] = None
 
 class ChatMessageResponse(ChatMessageBase):
     id: UUID
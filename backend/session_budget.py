@@ -0,0 +1,215 @@
+import asyncio
+import os
+import time
+import logging
+from typing import Any, AsyncGenerator, Mapping, Optional, Sequence
+
+from autogen_agentchat.base import TaskResult, TerminatedException, TerminationCondition
+from autogen_agentchat.messages import BaseAgentEvent, BaseChatMessage, StopMessage, ToolCallRequestEvent
+from autogen_core import CancellationToken
+from autogen_core.models import CreateResult, RequestUsage
+
+from model_clients import DelegatingChatCompletionClient
+
+BUDGET_SOURCE = "SessionBudget"
+
+
+def _env_limit(name: str) -> Optional[int]:
+    """Read an optional positive integer limit from the environment (0/empty = unlimited)."""
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return None
+    value = int(raw)
+    return value if value > 0 else None
+
+
+class SessionBudget:
+    """Per-session limits on wall-clock time, LLM tokens and tool calls.
+
+    Limits left as ``None`` are not enforced. Usage is accumulated for the
+    whole session (every model client of the session and the orchestrator
+    share one instance), so it is never reset between orchestrator rounds.
+    """
+
+    def __init__(
+        self,
+        max_time: Optional[float] = None,
+        max_prompt_tokens: Optional[int] = None,
+        max_completion_tokens: Optional[int] = None,
+        max_tool_calls: Optional[int] = None,
+    ):
+        self.max_time = max_time
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_completion_tokens = max_completion_tokens
+        self.max_tool_calls = max_tool_calls
+
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.tool_calls = 0
+        self.started_at: Optional[float] = None
+
+    @classmethod
+    def from_config(cls, config: Optional[Mapping[str, Any]] = None, default_max_time: Optional[float] = None) -> "SessionBudget":
+        """Build a budget from a team definition's ``budgets`` block.
+
+        Keys missing from the team definition fall back to the
+        ``SESSION_MAX_*`` environment variables.
+        """
+        config = config or {}
+        env_max_time = _env_limit("SESSION_MAX_TIME")
+
+        def pick(key: str, env_value, cast=int):
+            value = config.get(key)
+            if value is None or value == "":
+                return env_value
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"budgets.{key} must be a number, got {value!r}") from None
+            return cast(value) if value > 0 else None
+
+        return cls(
+            max_time=pick("max_time", env_max_time if env_max_time is not None else default_max_time, float),
+            max_prompt_tokens=pick("max_prompt_tokens", _env_limit("SESSION_MAX_PROMPT_TOKENS")),
+            max_completion_tokens=pick("max_completion_tokens", _env_limit("SESSION_MAX_COMPLETION_TOKENS")),
+            max_tool_calls=pick("max_tool_calls", _env_limit("SESSION_MAX_TOOL_CALLS")),
+        )
+
+    def start(self) -> None:
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return time.monotonic() - self.started_at
+
+    def remaining_time(self) -> Optional[float]:
+        """Seconds left before the wall-clock deadline, or ``None`` if unlimited."""
+        if self.max_time is None:
+            return None
+        return max(0.0, self.max_time - self.elapsed())
+
+    def record_usage(self, usage: Optional[RequestUsage]) -> None:
+        if usage is None:
+            return
+        self.prompt_tokens += usage.prompt_tokens
+        self.completion_tokens += usage.completion_tokens
+
+    def record_tool_calls(self, count: int) -> None:
+        self.tool_calls += count
+
+    def exceeded(self) -> Optional[str]:
+        """Return a human readable stop reason if any limit has been reached."""
+        if self.max_time is not None and self.elapsed() >= self.max_time:
+            return f"Time budget exceeded: session ran for {self.elapsed():.0f}s (limit {self.max_time:.0f}s)."
+        if self.max_prompt_tokens is not None and self.prompt_tokens >= self.max_prompt_tokens:
+            return f"Prompt token budget exceeded: {self.prompt_tokens} tokens used (limit {self.max_prompt_tokens})."
+        if self.max_completion_tokens is not None and self.completion_tokens >= self.max_completion_tokens:
+            return f"Completion token budget exceeded: {self.completion_tokens} tokens used (limit {self.max_completion_tokens})."
+        if self.max_tool_calls is not None and self.tool_calls >= self.max_tool_calls:
+            return f"Tool call budget exceeded: {self.tool_calls} calls made (limit {self.max_tool_calls})."
+        return None
+
+    def restore(self, usage: Mapping[str, Any]) -> None:
+        """Carry over usage recorded before a resume (see ``to_json``)."""
+        self.prompt_tokens = usage.get("prompt_tokens", 0)
+        self.completion_tokens = usage.get("completion_tokens", 0)
+        self.tool_calls = usage.get("tool_calls", 0)
+        self.started_at = time.monotonic() - usage.get("elapsed", 0.0)
+
+    def to_json(self) -> dict:
+        return {
+            "elapsed": round(self.elapsed(), 3),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "tool_calls": self.tool_calls,
+            "max_time": self.max_time,
+            "max_prompt_tokens": self.max_prompt_tokens,
+            "max_completion_tokens": self.max_completion_tokens,
+            "max_tool_calls": self.max_tool_calls,
+        }
+
+
+class BudgetedChatCompletionClient(DelegatingChatCompletionClient):
+    """Chat client that charges the usage of every completion to a ``SessionBudget``."""
+
+    def __init__(self, inner, budget: SessionBudget):
+        super().__init__(inner)
+        self._budget = budget
+
+    async def create(self, messages, **kwargs) -> CreateResult:
+        result = await self._inner.create(messages, **kwargs)
+        self._budget.record_usage(result.usage)
+        return result
+
+    async def create_stream(self, messages, **kwargs) -> AsyncGenerator:
+        async for chunk in self._inner.create_stream(messages, **kwargs):
+            if isinstance(chunk, CreateResult):
+                self._budget.record_usage(chunk.usage)
+            yield chunk
+
+
+class SessionBudgetTermination(TerminationCondition):
+    """Stop the group chat once the session budget is spent.
+
+    Token usage is charged by ``BudgetedChatCompletionClient``; tool calls are
+    counted here from the ``ToolCallRequestEvent`` messages of each agent turn.
+    """
+
+    def __init__(self, budget: SessionBudget):
+        self._budget = budget
+        self._terminated = False
+
+    @property
+    def terminated(self) -> bool:
+        return self._terminated
+
+    async def __call__(self, messages: Sequence[BaseAgentEvent | BaseChatMessage]) -> StopMessage | None:
+        if self._terminated:
+            raise TerminatedException("Termination condition has already been reached")
+        for message in messages:
+            if isinstance(message, ToolCallRequestEvent):
+                self._budget.record_tool_calls(len(message.content))
+        reason = self._budget.exceeded()
+        if reason is not None:
+            self._terminated = True
+            return StopMessage(content=reason, source=BUDGET_SOURCE)
+        return None
+
+    async def reset(self) -> None:
+        # The budget spans the whole session, only the trigger is reset.
+        self._terminated = False
+
+
+async def enforce_deadline(
+    stream: AsyncGenerator,
+    budget: SessionBudget,
+    cancellation_token: CancellationToken,
+) -> AsyncGenerator:
+    """Relay ``stream`` until it finishes or the session's wall-clock deadline passes.
+
+    The termination condition only runs between agent turns, so a stuck LLM
+    call or tool would otherwise hold the session open indefinitely. When the
+    deadline passes the run is cancelled and a final ``TaskResult`` carrying
+    the stop reason is emitted instead.
+    """
+    logger = logging.getLogger("enforce_deadline")
+    budget.start()
+    while True:
+        try:
+            item = await asyncio.wait_for(stream.__anext__(), timeout=budget.remaining_time())
+        except StopAsyncIteration:
+            return
+        except asyncio.TimeoutError:
+            reason = budget.exceeded() or "Time budget exceeded."
+            logger.warning(reason)
+            cancellation_token.cancel()
+            try:
+                await stream.aclose()
+            except Exception:
+                pass
+            stop_message = StopMessage(content=reason, source=BUDGET_SOURCE)
+            yield TaskResult(messages=[stop_message], stop_reason=reason)
+            return
+        yield item
@@ -0,0 +1,522 @@
+import asyncio
+import importlib
+import logging
+import multiprocessing
+import os
+import threading
+import uuid
+from collections import defaultdict
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
+
+from autogen_agentchat.base import TaskResult
+from autogen_agentchat.messages import StopMessage, TextMessage
+
+import profiler
+from tracing import activate, start_session_trace
+
+WORKER_SOURCE = "SessionWorker"
+
+
+async def run_magentic_session(session: dict) -> AsyncGenerator:
+    """Default worker runner: run one MagenticOne session and yield its messages."""
+    from magentic_one_helper import MagenticOneHelper
+    from llm_config import get_llm_config
+
+    magentic_one = MagenticOneHelper(
+        logs_dir=session.get("logs_dir", "./logs"),
+        save_screenshots=False,
+        run_locally=session.get("run_locally"),
+        user_id=session.get("user_id"),
+        llm_config=get_llm_config(),
+        team_config=session.get("team_config"),
+        priority=session.get("priority", "interactive"),
+    )
+    # Continue the API process's session trace under the traceparent it sent
+    session_trace = None
+    if session.get("traceparent"):
+        session_trace = start_session_trace(
+            session["session_id"], session.get("user_id"), name="session.worker", traceparent=session["traceparent"]
+        )
+    error = None
+    try:
+        with activate(session_trace):
+            await magentic_one.initialize(agents=session["agents"], session_id=session["session_id"])
+            stream, cancellation_token = await magentic_one.main(task=session["task"], resume=session.get("resume", False))
+            session["cancellation_token"] = cancellation_token
+            async for message in stream:
+                yield message
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        if session_trace is not None:
+            session_trace.end(error)
+
+
+def _load_runner(path: str):
+    module_name, func_name = path.split(":", 1)
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+# ---------------------------------------------------------------------------
+# Worker process
+# ---------------------------------------------------------------------------
+
+class _ApiChannel:
+    """Requests from a worker to the API process; replies come back over the command pipe."""
+
+    def __init__(self, send):
+        self._send = send
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    async def call(self, method: str, **params):
+        request_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self._send("call", request_id, {"method": method, "params": params})
+        try:
+            reply = await future
+        except asyncio.CancelledError:
+            self._send("cancel", request_id)
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+        if reply["ok"]:
+            return reply["result"]
+        if reply.get("rejected"):
+            from llm_scheduler import SchedulerRejectedError
+
+            raise SchedulerRejectedError(reply["error"])
+        raise RuntimeError(reply["error"])
+
+    def notify(self, method: str, **params) -> None:
+        self._send("notify", "", {"method": method, "params": params})
+
+    def resolve(self, request_id: str, reply: dict) -> None:
+        future = self._pending.get(request_id)
+        if future is not None and not future.done():
+            future.set_result(reply)
+
+
+class _BrokeredScheduler:
+    """LLM scheduler of a worker: slots are granted by the scheduler of the API process.
+
+    LiteLLM/Ollama serve one request per model at a time, so admission and
+    fairness must hold across all workers, not per worker.
+    """
+
+    def __init__(self, channel: _ApiChannel):
+        self._channel = channel
+        self._grants: Dict[str, List[str]] = defaultdict(list)
+
+    async def acquire(self, model: str, user_id: str, session_id: str, priority: str, time_left: Optional[float]) -> float:
+        reply = await self._channel.call(
+            "llm_acquire", model=model, user_id=user_id, session_id=session_id, priority=priority, time_left=time_left
+        )
+        self._grants[model].append(reply["grant"])
+        return reply["waited"]
+
+    def release(self, model: str, service_time: Optional[float]) -> None:
+        # slots of a model are interchangeable: any grant held for it can go back
+        if self._grants[model]:
+            self._channel.notify("llm_release", grant=self._grants[model].pop(), service_time=service_time)
+
+
+class _BrokeredEmbeddings:
+    """Embedding batcher of a worker: texts are batched in the API process with those of all workers."""
+
+    def __init__(self, channel: _ApiChannel):
+        self._channel = channel
+
+    async def embed(self, texts, model: str) -> list:
+        if not texts:
+            return []
+        return await self._channel.call("embed", texts=list(texts), model=model)
+
+
+def _as_text(message) -> TextMessage:
+    """Picklable stand-in for a message that is not: its text, from the same source."""
+    text = message.to_text() if hasattr(message, "to_text") else str(message)
+    return TextMessage(content=text, source=getattr(message, "source", None) or WORKER_SOURCE)
+
+
+def _worker_main(runner_path: str, cmd_conn, event_conn) -> None:
+    logging.basicConfig(level=logging.WARNING, format=f"%(levelname)s: [worker {os.getpid()}] %(message)s")
+    asyncio.run(_worker_loop(_load_runner(runner_path), cmd_conn, event_conn))
+
+
+async def _worker_loop(runner, cmd_conn, event_conn) -> None:
+    loop = asyncio.get_running_loop()
+    commands: asyncio.Queue = asyncio.Queue()
+    sessions: Dict[str, dict] = {}
+
+    def pump():
+        # Blocking reads stay off the event loop; EOF means the API process is gone.
+        while True:
+            try:
+                command = cmd_conn.recv()
+            except (EOFError, OSError):
+                command = {"op": "shutdown"}
+            loop.call_soon_threadsafe(commands.put_nowait, command)
+            if command["op"] == "shutdown":
+                return
+
+    def send(kind: str, session_id: str, payload=None):
+        try:
+            event_conn.send((kind, session_id, payload))
+        except Exception as e:
+            # Unpicklable message: relay its text form instead of dropping the session.
+            if kind != "event":
+                raise
+            if isinstance(payload, TaskResult):
+                payload = TaskResult(messages=[_as_text(m) for m in payload.messages], stop_reason=payload.stop_reason)
+            else:
+                payload = _as_text(payload)
+            event_conn.send(("event", session_id, payload))
+            logging.getLogger("session_worker").warning(f"Could not relay message: {e}")
+
+    async def run(session: dict):
+        session_id = session["session_id"]
+        profiler.bind_session(session_id)
+        try:
+            async for message in runner(session):
+                send("event", session_id, message)
+            send("done", session_id)
+        except asyncio.CancelledError:
+            send("error", session_id, "Session cancelled.")
+        except Exception as e:
+            logging.getLogger("session_worker").exception(f"Session {session_id} failed")
+            send("error", session_id, f"Session failed: {e}")
+        finally:
+            sessions.pop(session_id, None)
+
+    def profile(command: dict):
+        try:
+            if command["action"] == "start":
+                options = command.get("options", {})
+                payload = {"ok": True, "result": profiler.start_profile(session_id=command["session_id"], **options)}
+            else:
+                payload = {"ok": True, "result": profiler.stop_profile()}
+        except Exception as e:
+            payload = {"ok": False, "error": str(e)}
+        send("profile", command["request_id"], payload)
+
+    import embedding_batcher
+    import llm_scheduler
+
+    channel = _ApiChannel(send)
+    llm_scheduler.set_scheduler(_BrokeredScheduler(channel))
+    embedding_batcher.set_embedding_batcher(_BrokeredEmbeddings(channel))
+
+    profiler.install_task_factory(loop)
+    threading.Thread(target=pump, daemon=True).start()
+    while True:
+        command = await commands.get()
+        op = command["op"]
+        if op == "start":
+            session = command["session"]
+            sessions[session["session_id"]] = session
+            session["task_handle"] = asyncio.create_task(run(session))
+        elif op == "stop":
+            session = sessions.get(command["session_id"])
+            if session is not None:
+                token = session.get("cancellation_token")
+                if token is not None:
+                    token.cancel()
+                else:
+                    session["task_handle"].cancel()
+        elif op == "profile":
+            profile(command)
+        elif op == "reply":
+            channel.resolve(command["request_id"], command)
+        elif op == "shutdown":
+            for session in list(sessions.values()):
+                session["task_handle"].cancel()
+            return
+
+
+# ---------------------------------------------------------------------------
+# API process side
+# ---------------------------------------------------------------------------
+
+class _WorkerHandle:
+    def __init__(self, index: int, process, cmd_conn, event_conn):
+        self.index = index
+        self.process = process
+        self.cmd_conn = cmd_conn
+        self.event_conn = event_conn
+        self.sessions = set()
+        self.sessions_started = 0
+        # requests of the worker being served (request id -> task) and the LLM slots it holds
+        # (request id -> model and session)
+        self.calls: Dict[str, asyncio.Task] = {}
+        self.llm_grants: Dict[str, Tuple[str, str]] = {}
+
+
+class RemoteCancellationToken:
+    """Stand-in for ``CancellationToken`` of a session running in a worker."""
+
+    def __init__(self, pool: "SessionWorkerPool", session_id: str):
+        self._pool = pool
+        self._session_id = session_id
+
+    def cancel(self) -> None:
+        self._pool.stop_session(self._session_id)
+
+
+class SessionWorkerPool:
+    """Runs sessions in N worker processes and relays their event streams.
+
+    Each worker has its own event loop and interpreter, so CPU-heavy agent
+    work (HTML parsing, FAISS, images, JSON) of different sessions runs on
+    different cores instead of behind one GIL. Sessions are placed on the
+    least-loaded worker; a worker that dies is restarted and its sessions
+    end with an error stop reason.
+
+    The LLM scheduler and the embedding batcher stay in the API process:
+    workers ask it for LLM slots and embeddings over their pipes, so the
+    per-model limits and fair queuing cover all workers. Other per-process
+    pools (browsers, code executors, MCP sessions) are per worker.
+    """
+
+    def __init__(self, workers: int, runner: str = "session_workers:run_magentic_session"):
+        self.workers = workers
+        self.runner = runner
+        self.restarts = 0
+        self._handles: list[Optional[_WorkerHandle]] = [None] * workers
+        self._streams: Dict[str, asyncio.Queue] = {}
+        self._placement: Dict[str, _WorkerHandle] = {}
+        self._profile_requests: Dict[str, asyncio.Future] = {}
+        # worker of each session profile, kept after the session ends so the profile can still be stopped
+        self._profiles: Dict[str, _WorkerHandle] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closing = False
+        self._ctx = multiprocessing.get_context("spawn")
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        for index in range(self.workers):
+            self._spawn(index)
+
+    def _spawn(self, index: int) -> None:
+        cmd_recv, cmd_send = self._ctx.Pipe(duplex=False)
+        event_recv, event_send = self._ctx.Pipe(duplex=False)
+        process = self._ctx.Process(
+            target=_worker_main, args=(self.runner, cmd_recv, event_send), name=f"session-worker-{index}", daemon=True
+        )
+        process.start()
+        # The child owns these ends now.
+        cmd_recv.close()
+        event_send.close()
+        handle = _WorkerHandle(index, process, cmd_send, event_recv)
+        self._handles[index] = handle
+        threading.Thread(target=self._read_events, args=(handle,), daemon=True).start()
+
+    def _read_events(self, handle: _WorkerHandle) -> None:
+        while True:
+            try:
+                kind, session_id, payload = handle.event_conn.recv()
+            except (EOFError, OSError):
+                # reap the process here, off the event loop, so its exit code is known
+                handle.process.join(timeout=1)
+                self._call_soon(self._on_worker_exit, handle)
+                return
+            self._call_soon(self._deliver, handle, kind, session_id, payload)
+
+    def _call_soon(self, callback, *args) -> None:
+        try:
+            self._loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass  # event loop already closed during shutdown
+
+    def _deliver(self, handle: _WorkerHandle, kind: str, session_id: str, payload) -> None:
+        if kind == "profile":
+            # replies to profile commands carry the request id instead of a session id
+            future = self._profile_requests.pop(session_id, None)
+            if future is not None and not future.done():
+                future.set_result(payload)
+            return
+        if kind in ("call", "cancel", "notify"):
+            # requests of the worker, which carry a request id as well
+            self._handle_request(handle, kind, session_id, payload)
+            return
+        queue = self._streams.get(session_id)
+        if kind in ("done", "error"):
+            handle.sessions.discard(session_id)
+            self._placement.pop(session_id, None)
+            # slots the session still held (e.g. a request cut short by cancellation) go back to the others
+            for grant, (_, owner) in list(handle.llm_grants.items()):
+                if owner == session_id:
+                    self._release_grant(handle, grant, None)
+        if queue is not None:
+            queue.put_nowait((kind, payload))
+
+    def _handle_request(self, handle: _WorkerHandle, kind: str, request_id: str, payload) -> None:
+        if kind == "call":
+            task = self._loop.create_task(self._serve(handle, request_id, payload))
+            handle.calls[request_id] = task
+            task.add_done_callback(lambda _: handle.calls.pop(request_id, None))
+        elif kind == "cancel":
+            task = handle.calls.get(request_id)
+            if task is not None:
+                task.cancel()
+            # the slot may have been granted before the worker gave up waiting
+            self._release_grant(handle, request_id, None)
+        elif payload["method"] == "llm_release":
+            self._release_grant(handle, payload["params"]["grant"], payload["params"]["service_time"])
+
+    async def _serve(self, handle: _WorkerHandle, request_id: str, call: dict) -> None:
+        from llm_scheduler import SchedulerRejectedError, get_scheduler
+
+        params = call["params"]
+        try:
+            if call["method"] == "llm_acquire":
+                waited = await get_scheduler().acquire(**params)
+                handle.llm_grants[request_id] = (params["model"], params["session_id"])
+                result = {"grant": request_id, "waited": waited}
+            elif call["method"] == "embed":
+                from embedding_batcher import get_embedding_batcher
+
+                result = await get_embedding_batcher().embed(params["texts"], params["model"])
+            else:
+                raise ValueError(f"Unknown worker request {call['method']}")
+            reply = {"ok": True, "result": result}
+        except Exception as e:
+            reply = {"ok": False, "error": str(e), "rejected": isinstance(e, SchedulerRejectedError)}
+        try:
+            handle.cmd_conn.send({"op": "reply", "request_id": request_id, **reply})
+        except (OSError, BrokenPipeError):
+            pass  # worker gone: _on_worker_exit returns its slots
+
+    def _release_grant(self, handle: _WorkerHandle, grant: str, service_time: Optional[float]) -> None:
+        entry = handle.llm_grants.pop(grant, None)
+        if entry is not None:
+            from llm_scheduler import get_scheduler
+
+            get_scheduler().release(entry[0], service_time)
+
+    def _on_worker_exit(self, handle: _WorkerHandle) -> None:
+        if self._handles[handle.index] is not handle:
+            return
+        for task in list(handle.calls.values()):
+            task.cancel()
+        for grant in list(handle.llm_grants):
+            self._release_grant(handle, grant, None)
+        for session_id, owner in list(self._profiles.items()):
+            if owner is handle:
+                del self._profiles[session_id]
+        for session_id in list(handle.sessions):
+            self._deliver(handle, "error", session_id, f"Session worker crashed (exit code {handle.process.exitcode}).")
+        if not self._closing:
+            logging.getLogger("session_workers").warning(
+                f"Session worker {handle.index} exited with code {handle.process.exitcode}, restarting."
+            )
+            self.restarts += 1
+            self._spawn(handle.index)
+
+    def _least_loaded(self) -> _WorkerHandle:
+        live = [h for h in self._handles if h is not None and h.process.is_alive()]
+        if not live:
+            raise RuntimeError("No session workers are running.")
+        return min(live, key=lambda h: (len(h.sessions), h.sessions_started))
+
+    async def stream_session(self, session: dict) -> AsyncGenerator:
+        """Start ``session`` on a worker and yield the messages it produces."""
+        session_id = session["session_id"]
+        handle = self._least_loaded()
+        queue: asyncio.Queue = asyncio.Queue()
+        self._streams[session_id] = queue
+        handle.sessions.add(session_id)
+        handle.sessions_started += 1
+        self._placement[session_id] = handle
+        handle.cmd_conn.send({"op": "start", "session": session})
+        try:
+            while True:
+                kind, payload = await queue.get()
+                if kind == "event":
+                    yield payload
+                elif kind == "done":
+                    return
+                else:
+                    stop_message = StopMessage(content=payload, source=WORKER_SOURCE)
+                    yield TaskResult(messages=[stop_message], stop_reason=payload)
+                    return
+        finally:
+            self._streams.pop(session_id, None)
+            if session_id in self._placement:
+                # Client went away before the session finished.
+                self.stop_session(session_id)
+
+    def stop_session(self, session_id: str) -> None:
+        handle = self._placement.get(session_id)
+        if handle is not None:
+            try:
+                handle.cmd_conn.send({"op": "stop", "session_id": session_id})
+            except (OSError, BrokenPipeError):
+                pass
+
+    async def profile(self, session_id: str, action: str, **options) -> Optional[dict]:
+        """Start (``action="start"``) or stop a profile of ``session_id`` in the worker running it."""
+        if action == "start":
+            handle = self._placement.get(session_id)
+            if handle is None:
+                raise KeyError(f"Session {session_id} is not running on a worker.")
+        else:
+            handle = self._profiles.pop(session_id, None) or self._placement.get(session_id)
+            if handle is None or self._handles[handle.index] is not handle:
+                raise KeyError(f"No profile of session {session_id} is running on a worker.")
+        request_id = uuid.uuid4().hex
+        future = self._loop.create_future()
+        self._profile_requests[request_id] = future
+        handle.cmd_conn.send(
+            {"op": "profile", "request_id": request_id, "session_id": session_id, "action": action, "options": options}
+        )
+        try:
+            reply = await asyncio.wait_for(future, 10)
+        finally:
+            self._profile_requests.pop(request_id, None)
+        if not reply["ok"]:
+            raise RuntimeError(reply["error"])
+        if action == "start":
+            self._profiles[session_id] = handle
+        return reply["result"]
+
+    def stats(self) -> dict:
+        return {
+            "workers": [
+                {
+                    "index": h.index,
+                    "pid": h.process.pid,
+                    "alive": h.process.is_alive(),
+                    "active_sessions": len(h.sessions),
+                    "sessions_started": h.sessions_started,
+                }
+                for h in self._handles
+                if h is not None
+            ],
+            "restarts": self.restarts,
+        }
+
+    async def close(self) -> None:
+        self._closing = True
+        for handle in self._handles:
+            if handle is None:
+                continue
+            try:
+                handle.cmd_conn.send({"op": "shutdown"})
+            except (OSError, BrokenPipeError):
+                pass
+        for handle in self._handles:
+            if handle is None:
+                continue
+            await asyncio.to_thread(handle.process.join, 5)
+            if handle.process.is_alive():
+                handle.process.terminate()
+
+
+def configured_workers() -> int:
+    """Number of session worker processes (SESSION_WORKERS); 0 runs sessions in-process."""
+    raw = os.getenv("SESSION_WORKERS", "0").strip().lower()
+    if raw == "auto":
+        return os.cpu_count() or 1
+    return max(0, int(raw or 0))
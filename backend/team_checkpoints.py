@@ -0,0 +1,194 @@
+import asyncio
+import inspect
+import logging
+from typing import Any, AsyncGenerator, Awaitable, Callable, List, Mapping
+
+import autogen_agentchat
+from autogen_agentchat.base import TaskResult
+from autogen_agentchat.messages import StopMessage
+from autogen_agentchat.teams import MagenticOneGroupChat
+from autogen_agentchat.teams._group_chat._events import GroupChatStart
+from autogen_agentchat.teams._group_chat._magentic_one._magentic_one_orchestrator import MagenticOneOrchestrator
+from autogen_core import DefaultTopicId, MessageContext, rpc
+
+import crud
+from model_routing import routing_role
+from tracing import current_session
+
+ORCHESTRATOR_NAME = "MagenticOneOrchestrator"
+
+# The resumable team replaces the manager of MagenticOneGroupChat through private
+# hooks (_base_group_chat_manager_class, _create_group_chat_manager_factory) that
+# are only known to work with this autogen-agentchat release (pinned in pyproject.toml).
+TESTED_AUTOGEN_VERSION = "0.5.7"
+_MANAGER_FACTORY_PARAMS = [
+    "self", "name", "group_topic_type", "output_topic_type", "participant_topic_types", "participant_names",
+    "participant_descriptions", "output_message_queue", "termination_condition", "max_turns", "message_factory",
+]
+_ORCHESTRATOR_PARAMS = [
+    "self", "name", "group_topic_type", "output_topic_type", "participant_topic_types", "participant_names",
+    "participant_descriptions", "max_turns", "message_factory", "model_client", "max_stalls", "final_answer_prompt",
+    "output_message_queue", "termination_condition", "emit_team_events",
+]
+
+
+def _check_autogen_internals() -> None:
+    factory = getattr(MagenticOneGroupChat, "_create_group_chat_manager_factory", None)
+    factory_params = list(inspect.signature(factory).parameters) if factory is not None else None
+    orchestrator_params = list(inspect.signature(MagenticOneOrchestrator.__init__).parameters)
+    if factory_params != _MANAGER_FACTORY_PARAMS or orchestrator_params != _ORCHESTRATOR_PARAMS:
+        raise ImportError(
+            f"team_checkpoints needs the group chat internals of autogen-agentchat=={TESTED_AUTOGEN_VERSION}, "
+            f"found autogen-agentchat=={autogen_agentchat.__version__}"
+        )
+    if autogen_agentchat.__version__ != TESTED_AUTOGEN_VERSION:
+        logging.getLogger("team_checkpoints").warning(
+            f"team_checkpoints is tested with autogen-agentchat=={TESTED_AUTOGEN_VERSION}, "
+            f"running {autogen_agentchat.__version__}"
+        )
+
+
+_check_autogen_internals()
+
+
+class ResumableMagenticOneOrchestrator(MagenticOneOrchestrator):
+    """MagenticOne orchestrator that can continue a run from a loaded state.
+
+    The stock orchestrator always re-plans on start and clears its message
+    thread when entering the outer loop, so a restored state would be thrown
+    away. After ``load_state`` this orchestrator skips planning and goes
+    straight to the next orchestration step.
+
+    Its model calls are marked with the orchestration step they serve
+    (``plan``, ``ledger``, ``final_answer``) for per-step model routing.
+
+    ``on_round`` is awaited with the number of completed rounds before each
+    new step: the last participant has replied and the orchestrator has
+    added the reply to its thread, so the team is between rounds.
+    """
+
+    def __init__(self, *args, on_round: Callable[[int], Awaitable[None]] | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._resume_pending = False
+        self._on_round = on_round
+        self._saved_round = 0
+
+    async def load_state(self, state: Mapping[str, Any]) -> None:
+        await super().load_state(state)
+        self._resume_pending = bool(self._task)
+        self._saved_round = self._n_rounds
+
+    @rpc
+    async def handle_start(self, message: GroupChatStart, ctx: MessageContext) -> None:  # type: ignore
+        if not self._resume_pending:
+            with routing_role("plan"):
+                await super().handle_start(message, ctx)
+            return
+        self._resume_pending = False
+
+        if self._termination_condition is not None and self._termination_condition.terminated:
+            early_stop_message = StopMessage(content="The group chat has already terminated.", source=self._name)
+            await self._signal_termination(early_stop_message)
+            return
+
+        # Surface the resume notice in the output stream, but keep it out of the restored thread.
+        if message.messages:
+            await self.publish_message(message, topic_id=DefaultTopicId(type=self._output_topic_type))
+            for msg in message.messages:
+                await self._output_message_queue.put(msg)
+        await self._orchestrate_step(ctx.cancellation_token)
+
+    async def _orchestrate_step(self, cancellation_token) -> None:
+        # A re-plan steps again without a new reply: only save each round once.
+        if self._on_round is not None and self._n_rounds > self._saved_round:
+            self._saved_round = self._n_rounds
+            await self._on_round(self._n_rounds)
+        # Every step opens the trace span of a new round; it ends when the next one starts.
+        session = current_session()
+        if session is not None:
+            session.start_round(self._n_rounds + 1)
+        with routing_role("ledger"):
+            await super()._orchestrate_step(cancellation_token)
+
+    async def _update_task_ledger(self, cancellation_token) -> None:
+        with routing_role("plan"):
+            await super()._update_task_ledger(cancellation_token)
+
+    async def _prepare_final_answer(self, reason: str, cancellation_token) -> None:
+        with routing_role("final_answer"):
+            await super()._prepare_final_answer(reason, cancellation_token)
+
+
+class ResumableMagenticOneGroupChat(MagenticOneGroupChat):
+    """``MagenticOneGroupChat`` using ``ResumableMagenticOneOrchestrator``.
+
+    With ``checkpoint``, the team state is passed to it (with the number of
+    completed rounds) at every round boundary of the orchestrator.
+    """
+
+    def __init__(self, *args, checkpoint: Callable[[int, Mapping[str, Any]], Awaitable[None]] | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The runtime checks that the manager factory produces this exact class.
+        self._base_group_chat_manager_class = ResumableMagenticOneOrchestrator
+        self._checkpoint = checkpoint
+
+    async def _save_round(self, round_no: int) -> None:
+        try:
+            await self._checkpoint(round_no, await self.save_state())
+        except Exception as e:
+            logging.getLogger("team_checkpoints").warning(f"Checkpoint at round {round_no} failed: {e}")
+
+    def _create_group_chat_manager_factory(
+        self,
+        name: str,
+        group_topic_type: str,
+        output_topic_type: str,
+        participant_topic_types: List[str],
+        participant_names: List[str],
+        participant_descriptions: List[str],
+        output_message_queue: asyncio.Queue,
+        termination_condition,
+        max_turns: int | None,
+        message_factory,
+    ) -> Callable[[], ResumableMagenticOneOrchestrator]:
+        return lambda: ResumableMagenticOneOrchestrator(
+            name,
+            group_topic_type,
+            output_topic_type,
+            participant_topic_types,
+            participant_names,
+            participant_descriptions,
+            max_turns,
+            message_factory,
+            self._model_client,
+            self._max_stalls,
+            self._final_answer_prompt,
+            output_message_queue,
+            termination_condition,
+            self._emit_team_events,
+            on_round=self._save_round if self._checkpoint is not None else None,
+        )
+
+
+def session_checkpoint(
+    user_id: str, session_id: str, metadata: Callable[[], dict] = None
+) -> Callable[[int, Mapping[str, Any]], Awaitable[None]]:
+    """``checkpoint`` callback of ``ResumableMagenticOneGroupChat`` saving to the session's checkpoint."""
+    logger = logging.getLogger("team_checkpoints")
+
+    async def save(round_no: int, state: Mapping[str, Any]) -> None:
+        new_blobs = await asyncio.to_thread(
+            crud.save_checkpoint, user_id, session_id, round_no, state, metadata() if metadata else None
+        )
+        logger.debug(f"Checkpoint {session_id} round {round_no}: {new_blobs} new blobs")
+
+    return save
+
+
+async def checkpointed(stream: AsyncGenerator, user_id: str, session_id: str) -> AsyncGenerator:
+    """Relay ``stream`` and mark the session's checkpoint completed once the run ends."""
+    async for message in stream:
+        # Mark before relaying, so a consumer that goes away still leaves it on disk.
+        if isinstance(message, TaskResult):
+            await asyncio.to_thread(crud.mark_checkpoint_completed, user_id, session_id)
+        yield message
@@ -0,0 +1,12 @@
+"""Import-time budget of the backend (see benchmarks/import_time.py).
+
+    cd backend
+    python -m pytest tests
+"""
+from benchmarks.import_time import DEFAULT_BUDGET_MS, check
+
+
+def test_main_imports_within_budget():
+    total_ms, eager, _ = check("main")
+    assert not eager, f"imported at start-up but should be lazy: {', '.join(eager)}"
+    assert total_ms <= DEFAULT_BUDGET_MS, f"import main took {total_ms:.0f} ms (budget {DEFAULT_BUDGET_MS:.0f} ms)"
@@ -0,0 +1,33 @@
+"""Slot accounting of the LLM scheduler (see llm_scheduler.py).
+
+    cd backend
+    python -m pytest tests
+"""
+import asyncio
+
+import pytest
+
+import llm_scheduler
+from llm_scheduler import SchedulerRejectedError, _ModelQueue
+
+
+def test_timeout_after_grant_releases_the_slot(monkeypatch):
+    queue = _ModelQueue("model", slots=1)
+
+    async def granted_then_timed_out(waiter, timeout):
+        # what wait_for does on Python 3.12+ when the slot is released and the
+        # timeout fires in the same loop iteration
+        queue.release(None)
+        assert waiter.done() and not waiter.cancelled()
+        raise asyncio.TimeoutError
+
+    async def run():
+        await queue.acquire("user", "holder", "interactive", None)
+        monkeypatch.setattr(llm_scheduler.asyncio, "wait_for", granted_then_timed_out)
+        with pytest.raises(SchedulerRejectedError):
+            await queue.acquire("user", "waiter", "interactive", 0.01)
+        monkeypatch.undo()
+        assert queue.in_flight == 0
+        assert await queue.acquire("user", "next", "interactive", 0.01) == 0.0
+
+    asyncio.run(run())
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import time
+from typing import Any, Callable, List, Mapping, Optional, Sequence, Union
+
+from autogen_core import CancellationToken
+from autogen_core.tools import BaseTool, FunctionTool, ToolSchema
+
+from metrics import AGENT_TOOL_CALL_SECONDS, AGENT_TOOL_CALLS_TOTAL
+from tracing import span
+
+
+class ToolLimits:
+    """Per-agent limits on tool calls.
+
+    AssistantAgent runs the tool calls of one model response concurrently;
+    ``max_concurrency`` bounds how many of an agent's calls run at once (the
+    others wait their turn) and ``timeout`` bounds each call (``None`` for
+    no limit). A call that times out is reported to the model as a failed
+    tool call.
+    """
+
+    def __init__(self, max_concurrency: int = 4, timeout: Optional[float] = 60):
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # created on first use, inside the session's event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    @classmethod
+    def from_config(cls, agent: Optional[Mapping[str, Any]] = None) -> "ToolLimits":
+        """Limits from an agent definition's ``tool_concurrency``/``tool_timeout`` (``TOOL_*`` variables otherwise)."""
+        agent = agent or {}
+        concurrency = agent.get("tool_concurrency") or os.getenv("TOOL_MAX_CONCURRENCY", "").strip() or 4
+        timeout = agent.get("tool_timeout")
+        if timeout is None or timeout == "":
+            timeout = os.getenv("TOOL_CALL_TIMEOUT", "").strip() or 60
+        timeout = float(timeout)
+        return cls(max_concurrency=int(concurrency), timeout=timeout if timeout > 0 else None)
+
+
+class LimitedTool(BaseTool):
+    """A tool run within its agent's ``ToolLimits``, with the latency of every call recorded."""
+
+    def __init__(self, tool: BaseTool, limits: ToolLimits, agent_name: str):
+        super().__init__(tool.args_type(), tool.return_type(), tool.name, tool.description)
+        self._tool = tool
+        self._limits = limits
+        self._agent_name = agent_name
+
+    @property
+    def schema(self) -> ToolSchema:
+        return self._tool.schema
+
+    def state_type(self):
+        return self._tool.state_type()
+
+    def return_value_as_string(self, value: Any) -> str:
+        return self._tool.return_value_as_string(value)
+
+    async def run(self, args, cancellation_token: CancellationToken) -> Any:
+        return await self._tool.run(args, cancellation_token)
+
+    async def run_json(self, args: Mapping[str, Any], cancellation_token: CancellationToken) -> Any:
+        async with self._limits.semaphore:
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                with span("agent.tool_call", agent=self._agent_name, tool=self.name):
+                    result = await asyncio.wait_for(self._tool.run_json(args, cancellation_token), self._limits.timeout)
+                outcome = "ok"
+                return result
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                raise TimeoutError(f"Tool {self.name} did not finish within {self._limits.timeout:g} seconds.")
+            finally:
+                labels = {"agent": self._agent_name, "tool": self.name}
+                AGENT_TOOL_CALL_SECONDS.observe(time.perf_counter() - started, **labels)
+                AGENT_TOOL_CALLS_TOTAL.inc(outcome=outcome, **labels)
+
+    async def save_state_json(self) -> Mapping[str, Any]:
+        return await self._tool.save_state_json()
+
+    async def load_state_json(self, state: Mapping[str, Any]) -> None:
+        await self._tool.load_state_json(state)
+
+
+def limit_tools(tools: Sequence[Union[BaseTool, Callable]], agent_name: str,
+                limits: Optional[ToolLimits] = None) -> List[BaseTool]:
+    """Wrap an agent's tools (functions become ``FunctionTool``s, as in AssistantAgent) in shared ``limits``."""
+    limits = limits or ToolLimits.from_config()
+    wrapped = []
+    for tool in tools:
+        if not isinstance(tool, BaseTool):
+            tool = FunctionTool(tool, description=tool.__doc__ or "")
+        wrapped.append(LimitedTool(tool, limits, agent_name))
+    return wrapped
@@ -8,6 +8,34 @@ from autogen_core.tools import FunctionTool
 from bs4 import BeautifulSoup
 
 
+def html_to_markdown(html: str, base_url: str, include_images: bool = True) -> str:
+    """Convert an HTML page to markdown, with links and images made absolute against ``base_url``."""
+    # Parse HTML
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Remove script and style elements
+    for script in soup(["script", "style"]):
+        script.decompose()
+
+    # Convert relative URLs to absolute
+    for tag in soup.find_all(["a", "img"]):
+        if tag.get("href"):
+            tag["href"] = urljoin(base_url, tag["href"])
+        if tag.get("src"):
+            tag["src"] = urljoin(base_url, tag["src"])
+
+    # Configure HTML to Markdown converter
+    h2t = html2text.HTML2Text()
+    h2t.body_width = 0  # No line wrapping
+    h2t.ignore_images = not include_images
+    h2t.ignore_emphasis = False
+    h2t.ignore_links = False
+    h2t.ignore_tables = False
+
+    # Convert to markdown
+    return h2t.handle(str(soup))
+
+
 async def fetch_webpage(
     url: str,
     include_images: bool = True,
@@ -38,30 +66,7 @@ async def fetch_webpage(
             response = await client.get(url, headers=headers, timeout=10)
             response.raise_for_status()
 
-            # Parse HTML
-            soup = BeautifulSoup(response.text, "html.parser")
-
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-
-            # Convert relative URLs to absolute
-            for tag in soup.find_all(["a", "img"]):
-                if tag.get("href"):
-                    tag["href"] = urljoin(url, tag["href"])
-                if tag.get("src"):
-                    tag["src"] = urljoin(url, tag["src"])
-
-            # Configure HTML to Markdown converter
-            h2t = html2text.HTML2Text()
-            h2t.body_width = 0  # No line wrapping
-            h2t.ignore_images = not include_images
-            h2t.ignore_emphasis = False
-            h2t.ignore_links = False
-            h2t.ignore_tables = False
-
-            # Convert to markdown
-            markdown = h2t.handle(str(soup))
+            markdown = html_to_markdown(response.text, url, include_images=include_images)
 
             # Trim if max_length is specified
             if max_length and len(markdown) > max_length:
@@ -0,0 +1,388 @@
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Sequence
+
+if TYPE_CHECKING:
+    from opentelemetry.sdk.trace.export import SpanExportResult
+
+# Context key under which the active SessionTrace travels with the OpenTelemetry context.
+_SESSION_KEY = "magentic.session_trace"
+
+_tracer = None
+_provider = None
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def tracing_enabled() -> bool:
+    return os.getenv("TRACING_ENABLED", "true").lower() == "true"
+
+
+def trace_dir() -> str:
+    return os.getenv("TRACE_DIR", "./logs/traces")
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes) -> List[dict]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in (attributes or {}).items()]
+
+
+def span_to_otlp(span) -> dict:
+    """One finished SDK span as an OTLP/JSON ``Span`` object."""
+    ctx = span.get_span_context()
+    data = {
+        "traceId": format(ctx.trace_id, "032x"),
+        "spanId": format(ctx.span_id, "016x"),
+        "name": span.name,
+        # SpanKind enum values are one lower than the OTLP ones (OTLP 0 is UNSPECIFIED)
+        "kind": span.kind.value + 1,
+        "startTimeUnixNano": str(span.start_time),
+        "endTimeUnixNano": str(span.end_time),
+        "attributes": _otlp_attributes(span.attributes),
+        "events": [
+            {"timeUnixNano": str(e.timestamp), "name": e.name, "attributes": _otlp_attributes(e.attributes)}
+            for e in span.events
+        ],
+        "status": {"code": span.status.status_code.value, "message": span.status.description or ""},
+    }
+    if span.parent is not None:
+        data["parentSpanId"] = format(span.parent.span_id, "016x")
+    return data
+
+
+def _trace_file(directory: str, session_id: str) -> str:
+    safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in session_id)
+    return os.path.join(directory, f"{safe}.jsonl")
+
+
+class SessionFileSpanExporter:
+    """Writes finished spans to ``<directory>/<session_id>.jsonl``.
+
+    Every line is an OTLP/JSON ``ExportTraceServiceRequest`` (the format of
+    the OpenTelemetry Collector file exporter), so a file can be replayed
+    into any OTLP backend. Spans are grouped by their ``session.id``
+    attribute; spans outside a session go to ``_unscoped.jsonl``.
+    """
+
+    def __init__(self, directory: str, service_name: str = "magentic-backend"):
+        self.directory = directory
+        self.service_name = service_name
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence) -> "SpanExportResult":
+        from opentelemetry.sdk.trace.export import SpanExportResult
+
+        by_session: Dict[str, List[dict]] = {}
+        for span in spans:
+            session_id = (span.attributes or {}).get("session.id") or "_unscoped"
+            by_session.setdefault(str(session_id), []).append(span_to_otlp(span))
+        try:
+            with self._lock:
+                for session_id, otlp_spans in by_session.items():
+                    request = {
+                        "resourceSpans": [{
+                            "resource": {"attributes": _otlp_attributes({
+                                "service.name": self.service_name, "process.pid": os.getpid(),
+                            })},
+                            "scopeSpans": [{"scope": {"name": "magentic"}, "spans": otlp_spans}],
+                        }]
+                    }
+                    with open(self.path(session_id), "a", encoding="utf-8") as f:
+                        f.write(json.dumps(request, separators=(",", ":")) + "\n")
+        except OSError as e:
+            logging.getLogger("tracing").warning(f"Could not write spans: {e}")
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def path(self, session_id: str) -> str:
+        return _trace_file(self.directory, session_id)
+
+    def shutdown(self) -> None:
+        pass
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+
+def get_tracer():
+    """The backend's tracer, or None when tracing is off or opentelemetry-sdk is missing.
+
+    The provider is private to the backend (not installed globally), so
+    autogen's own runtime instrumentation stays off.
+    """
+    global _tracer, _provider, _initialized
+    if _initialized:
+        return _tracer
+    with _init_lock:
+        if _initialized:
+            return _tracer
+        _initialized = True
+        if not tracing_enabled():
+            return None
+        try:
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        except ImportError:
+            logging.getLogger("tracing").warning("opentelemetry-sdk is not installed, tracing is disabled.")
+            return None
+        exporter = SessionFileSpanExporter(trace_dir())
+        _provider = TracerProvider()
+        _provider.add_span_processor(BatchSpanProcessor(exporter, schedule_delay_millis=1000))
+        _tracer = _provider.get_tracer("magentic")
+        return _tracer
+
+
+def flush() -> None:
+    if _provider is not None:
+        _provider.force_flush()
+
+
+def shutdown() -> None:
+    if _provider is not None:
+        _provider.shutdown()
+
+
+class SessionTrace:
+    """Root span of one session plus the span of the orchestrator round in progress.
+
+    ``activate`` makes the session current; spans opened with ``span`` in
+    that context (including in tasks started from it, such as the team's
+    runtime) become part of the session's trace. Agent turns run in their
+    own runtime tasks, so they are parented to the current round explicitly.
+    """
+
+    def __init__(self, session_id: str, user_id: Optional[str], name: str = "session", traceparent: Optional[str] = None):
+        from opentelemetry import trace
+        from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+
+        self.session_id = session_id
+        parent = TraceContextTextMapPropagator().extract({"traceparent": traceparent}) if traceparent else None
+        self.span = get_tracer().start_span(
+            name, context=parent, kind=trace.SpanKind.SERVER if parent is None else trace.SpanKind.INTERNAL,
+            attributes={"session.id": session_id, "user.id": user_id or ""},
+        )
+        self.round_span = None
+
+    def context(self):
+        from opentelemetry import context as otel_context, trace
+
+        ctx = trace.set_span_in_context(self.span)
+        return otel_context.set_value(_SESSION_KEY, self, ctx)
+
+    @contextmanager
+    def activate(self):
+        from opentelemetry import context as otel_context
+
+        token = otel_context.attach(self.context())
+        try:
+            yield self
+        finally:
+            try:
+                otel_context.detach(token)
+            except Exception:
+                pass
+
+    def start_round(self, round_no: int, **attributes) -> None:
+        from opentelemetry import trace
+
+        self.end_round()
+        self.round_span = get_tracer().start_span(
+            "orchestrator.round", context=trace.set_span_in_context(self.span),
+            attributes={"session.id": self.session_id, "round": round_no, **attributes},
+        )
+
+    def end_round(self) -> None:
+        if self.round_span is not None:
+            self.round_span.end()
+            self.round_span = None
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        from opentelemetry.trace import Status, StatusCode
+
+        self.end_round()
+        if error is not None:
+            self.span.record_exception(error)
+            self.span.set_status(Status(StatusCode.ERROR, str(error)))
+        self.span.end()
+
+
+def start_session_trace(session_id: str, user_id: Optional[str] = None, name: str = "session",
+                        traceparent: Optional[str] = None) -> Optional[SessionTrace]:
+    if get_tracer() is None:
+        return None
+    return SessionTrace(session_id, user_id, name=name, traceparent=traceparent)
+
+
+def activate(session: Optional[SessionTrace]):
+    """``session.activate()``, or a no-op context when the session is not traced."""
+    return session.activate() if session is not None else nullcontext()
+
+
+def current_session() -> Optional[SessionTrace]:
+    if _tracer is None:
+        return None
+    from opentelemetry import context as otel_context
+
+    return otel_context.get_value(_SESSION_KEY)
+
+
+def _parent_context(session: SessionTrace, parent_round: bool):
+    from opentelemetry import trace
+
+    if session.round_span is None:
+        return None
+    # autogen's runtime re-creates the propagated span as a NonRecordingSpan, so compare ids.
+    current_id = trace.get_current_span().get_span_context().span_id
+    if parent_round or current_id == session.span.get_span_context().span_id:
+        return trace.set_span_in_context(session.round_span)
+    return None
+
+
+def _set_error(current_span, error: BaseException) -> None:
+    from opentelemetry.trace import Status, StatusCode
+
+    current_span.record_exception(error)
+    current_span.set_status(Status(StatusCode.ERROR, str(error) or type(error).__name__))
+
+
+@contextmanager
+def span(name: str, parent_round: bool = False, **attributes):
+    """Child span of the current session; a no-op outside a traced session.
+
+    With ``parent_round`` (or when the current span is the session root) the
+    span is parented to the orchestrator round in progress.
+    """
+    session = current_session()
+    if session is None:
+        yield None
+        return
+    parent = _parent_context(session, parent_round)
+    with get_tracer().start_as_current_span(
+        name, context=parent, attributes={"session.id": session.session_id, **attributes},
+        record_exception=False, set_status_on_exception=False,
+    ) as current_span:
+        try:
+            yield current_span
+        except GeneratorExit:
+            raise
+        except BaseException as e:
+            _set_error(current_span, e)
+            raise
+
+
+async def span_stream(name: str, stream: AsyncIterator, parent_round: bool = False, **attributes):
+    """Relay ``stream`` inside a span covering its whole iteration.
+
+    The span is current only while the stream computes its next item, never
+    across a ``yield``, so it does not leak into the consumer's context.
+    """
+    session = current_session()
+    if session is None:
+        async for item in stream:
+            yield item
+        return
+    from opentelemetry import context as otel_context, trace
+
+    current_span = get_tracer().start_span(
+        name, context=_parent_context(session, parent_round),
+        attributes={"session.id": session.session_id, **attributes},
+    )
+    ctx = trace.set_span_in_context(current_span)
+    try:
+        while True:
+            token = otel_context.attach(ctx)
+            try:
+                item = await stream.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                otel_context.detach(token)
+            yield item
+    except GeneratorExit:
+        raise
+    except BaseException as e:
+        _set_error(current_span, e)
+        raise
+    finally:
+        current_span.end()
+
+
+def traced(name: str, **attributes):
+    """Decorator wrapping a sync or async function in ``span(name, **attributes)``."""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, **attributes):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, **attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def traceparent() -> Optional[str]:
+    """W3C ``traceparent`` of the current span, for propagation to other processes and MCP servers."""
+    if current_session() is None:
+        return None
+    from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+
+    carrier: Dict[str, str] = {}
+    TraceContextTextMapPropagator().inject(carrier)
+    return carrier.get("traceparent")
+
+
+def read_session_trace(session_id: str) -> List[dict]:
+    """Spans of a session from the trace file, ordered by start time."""
+    flush()
+    path = _trace_file(trace_dir(), session_id)
+    spans: List[dict] = []
+    if not os.path.exists(path):
+        return spans
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                continue
+            for resource_spans in request.get("resourceSpans", []):
+                for scope_spans in resource_spans.get("scopeSpans", []):
+                    spans.extend(scope_spans.get("spans", []))
+    spans.sort(key=lambda s: int(s["startTimeUnixNano"]))
+    return spans
+
+
+def summarize_trace(spans: List[dict]) -> dict:
+    """Span count and total time per span name, and the session's wall-clock duration."""
+    by_name: Dict[str, dict] = {}
+    for s in spans:
+        entry = by_name.setdefault(s["name"], {"count": 0, "total_ms": 0.0})
+        entry["count"] += 1
+        entry["total_ms"] += (int(s["endTimeUnixNano"]) - int(s["startTimeUnixNano"])) / 1e6
+    for entry in by_name.values():
+        entry["total_ms"] = round(entry["total_ms"], 1)
+    duration_ms = 0.0
+    if spans:
+        duration_ms = (max(int(s["endTimeUnixNano"]) for s in spans) - int(spans[0]["startTimeUnixNano"])) / 1e6
+    return {"spans": len(spans), "duration_ms": round(duration_ms, 1), "by_name": by_name}
@@ -23,6 +23,8 @@ const BASE_URL = import.meta.env.VITE_BASE_URL || "local";
 const ALLWAYS_LOGGED_IN =
   import.meta.env.VITE_ALLWAYS_LOGGED_IN === "true" ? true : false;
 const ACTIVATION_CODE = import.meta.env.VITE_ACTIVATON_CODE || "0000";
+const POLL_INTERVAL_MS = 2000;
+const FINISHED = ["completed", "failed", "cancelled"];
 
 export default function Bench() {
   const { teams } = useTeamsContext();
@@ -31,6 +33,7 @@ export default function Bench() {
   const [isAuthenticated, setIsAuthenticated] = useState(BASE_URL)
   const [output, setOutput] = useState<string>('');
   const [running, setRunning] = useState(false);
+  const [progress, setProgress] = useState<string>('');
 
   const handleLogin = (email: string, password: string) => {
     if (password === ACTIVATION_CODE || ALLWAYS_LOGGED_IN) {
@@ -45,17 +48,31 @@ export default function Bench() {
   const runBench = async () => {
     try {
       setRunning(true);
-      await axios.post(`${BASE_URL}/bench/run`, {
+      const submitted = await axios.post(`${BASE_URL}/bench/run`, {
         scenario: "scenarios/basic.jsonl",
         config: "OAI_CONFIG_LIST.json",
         repeats: 1
       });
-      const res = await axios.get(`${BASE_URL}/bench/results`);
+      // the run is a background job: wait for it to finish before tabulating
+      let job = submitted.data;
+      while (job?.job_id && !FINISHED.includes(job.status)) {
+        setProgress(`${job.done}/${job.total}`);
+        await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+        job = (await axios.get(`${BASE_URL}/bench/jobs/${job.job_id}`)).data;
+      }
+      if (job?.status === "failed") {
+        setOutput(`Benchmark failed: ${job.error}`);
+        return;
+      }
+      const res = await axios.get(`${BASE_URL}/bench/results`, {
+        params: job?.results_dir ? { results_dir: job.results_dir } : undefined
+      });
       setOutput(res.data.csv);
     } catch (err) {
       console.error(err);
     } finally {
       setRunning(false);
+      setProgress('');
     }
   }
 
@@ -93,7 +110,7 @@ export default function Bench() {
           <div className="min-h-[100vh] flex-1 rounded-xl bg-muted/50 md:min-h-min">
             <Separator className="mb-4" />
             <Button onClick={runBench} disabled={running} className="mb-4">
-              {running ? 'Running...' : 'Run Benchmark'}
+              {running ? `Running... ${progress}` : 'Run Benchmark'}
             </Button>
             <pre className="whitespace-pre-wrap text-sm p-4">{output}</pre>
           </div>
@@ -172,7 +172,8 @@ export default function App() {
       const response = await axios.post(`${BASE_URL}/start`, { 
         content: userMessage, 
         user_id: userInfo.email, // Use directly from context
-        agents: JSON.stringify(selectedAgents)
+        agents: JSON.stringify(selectedAgents),
+        team_id: selectedTeam?.team_id
       });
       const sessionId = response.data.response;  // Get the session ID from the response
       setSessionID(sessionId);
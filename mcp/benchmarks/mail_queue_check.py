@@ -0,0 +1,108 @@
+"""Delivery check of the mail queue against a local SMTP stub.
+
+Starts an SMTP stub on localhost that takes ``--smtp-delay`` seconds per
+message and answers the first ``--transient`` messages with ``451`` and any
+recipient starting with ``bad@`` with ``550``. Queues ``--messages`` emails
+through ``MailQueue`` and reports enqueue latency, time until every message
+reached a final state, SMTP connections opened and the status counts.
+
+    cd mcp
+    python -m benchmarks.mail_queue_check --messages 200 --workers 4
+"""
+import argparse
+import asyncio
+import sys
+import threading
+import time
+
+from mail_queue import MailQueue
+
+
+class _Stub:
+    def __init__(self, delay: float, transient: int):
+        self.delay = delay
+        self.transient = transient
+        self.connections = 0
+        self.delivered = 0
+        self.port = None
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        writer.write(b"220 stub ESMTP\r\n")
+        in_data = False
+        while line := await reader.readline():
+            if in_data:
+                if line in (b".\r\n", b".\n"):
+                    in_data = False
+                    await asyncio.sleep(self.delay)
+                    if self.transient > 0:
+                        self.transient -= 1
+                        writer.write(b"451 Try again later\r\n")
+                    else:
+                        self.delivered += 1
+                        writer.write(b"250 OK queued\r\n")
+            else:
+                command = line[:4].upper()
+                if command == b"DATA":
+                    in_data = True
+                    writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                elif command == b"RCPT" and b"<bad@" in line:
+                    writer.write(b"550 No such user\r\n")
+                elif command == b"QUIT":
+                    writer.write(b"221 Bye\r\n")
+                    await writer.drain()
+                    break
+                else:
+                    writer.write(b"250 OK\r\n")
+            await writer.drain()
+        writer.close()
+
+    def serve(self, ready: threading.Event) -> None:
+        loop = asyncio.new_event_loop()
+        server = loop.run_until_complete(asyncio.start_server(self.handle, "127.0.0.1", 0))
+        self.port = server.sockets[0].getsockname()[1]
+        ready.set()
+        loop.run_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mail queue delivery check")
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--smtp-delay", type=float, default=0.01, help="seconds the SMTP stub takes per message")
+    parser.add_argument("--transient", type=int, default=3, help="number of 451 replies before accepting mail")
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    stub = _Stub(args.smtp_delay, args.transient)
+    ready = threading.Event()
+    threading.Thread(target=stub.serve, args=(ready,), daemon=True).start()
+    ready.wait()
+
+    mail_queue = MailQueue(host="127.0.0.1", port=stub.port, workers=args.workers, batch_size=args.batch_size, backoff=0.1)
+    started = time.perf_counter()
+    for i in range(args.messages):
+        mail_queue.submit(f"user{i}@example.com", f"check {i}", "body")
+    mail_queue.submit("bad@example.com", "rejected", "body")
+    enqueued = time.perf_counter() - started
+
+    total = args.messages + 1
+    while time.perf_counter() - started < args.timeout:
+        counts = mail_queue.summary(0)["counts"]
+        if counts.get("sent", 0) + counts.get("failed", 0) == total:
+            break
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    counts = mail_queue.summary(0)["counts"]
+
+    print(f"messages={total} enqueue={enqueued * 1000:.1f}ms ({enqueued / total * 1e6:.0f}us/msg) "
+          f"drained={elapsed:.2f}s")
+    print(f"smtp connections={stub.connections} delivered={stub.delivered} status={counts}")
+    ok = counts.get("sent", 0) == args.messages and counts.get("failed", 0) == 1
+    print("OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Load test: many concurrent MCP clients against a local server.
+
+Starts the SSE server (``server.py``) as a subprocess with the mailer pointed
+at a local SMTP stub that answers slowly, then runs N concurrent MCP
+clients, each opening its own SSE session and calling ``show_tables``,
+``data_provider`` and ``mailer``. Reports calls per second and latency
+percentiles per tool, so single-process and multi-worker setups (and the
+effect of running blocking tools in threads) can be compared.
+
+    cd mcp
+    python -m benchmarks.sse_load_test --clients 50 --calls 10 --workers 1
+    python -m benchmarks.sse_load_test --clients 50 --calls 10 --workers 4
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+
+API_KEY = "load-test"
+
+
+async def _smtp_stub(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, delay: float) -> None:
+    """Just enough SMTP for smtplib.sendmail, with a slow reply to DATA."""
+    writer.write(b"220 stub ESMTP\r\n")
+    in_data = False
+    while line := await reader.readline():
+        if in_data:
+            if line in (b".\r\n", b".\n"):
+                in_data = False
+                await asyncio.sleep(delay)
+                writer.write(b"250 OK queued\r\n")
+        else:
+            command = line[:4].upper()
+            if command == b"DATA":
+                in_data = True
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+            elif command == b"QUIT":
+                writer.write(b"221 Bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"250 OK\r\n")
+        await writer.drain()
+    writer.close()
+
+
+async def _client(url: str, calls: int, latencies: dict, errors: dict) -> None:
+    async with sse_client(url, headers={"x-api-key": API_KEY}, timeout=30, sse_read_timeout=300) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            plan = [
+                ("show_tables", {}),
+                ("data_provider", {"tablename": "sensor", "aggregates": {"Temperature (°C)": "mean"}, "group_by": ["EquipmentID"]}),
+                ("mailer", {"to_address": "load@example.com", "subject": "load", "plain_text": "test"}),
+            ]
+            for i in range(calls):
+                name, arguments = plan[i % len(plan)]
+                started = time.perf_counter()
+                try:
+                    result = await session.call_tool(name, arguments)
+                    if result.isError:
+                        errors[name] += 1
+                except Exception:
+                    errors[name] += 1
+                latencies[name].append(time.perf_counter() - started)
+
+
+async def _wait_for_server(url: str, process: subprocess.Popen, timeout: float = 60) -> None:
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError("MCP server exited during start-up")
+            try:
+                await client.get(url.replace("/sse", "/docs"), timeout=1)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.3)
+    raise RuntimeError("MCP server did not start")
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))] if values else 0.0
+
+
+async def run(args) -> None:
+    smtp = await asyncio.start_server(lambda r, w: _smtp_stub(r, w, args.smtp_delay), "127.0.0.1", 0)
+    smtp_port = smtp.sockets[0].getsockname()[1]
+    env = dict(
+        os.environ,
+        MCP_SERVER_API_KEY=API_KEY,
+        MCP_PORT=str(args.port),
+        MCP_HOST="127.0.0.1",
+        MCP_WORKERS=str(args.workers),
+        MCP_LOG_LEVEL="warning",
+        SMTP_HOST="127.0.0.1",
+        SMTP_PORT=str(smtp_port),
+    )
+    server = subprocess.Popen([sys.executable, "server.py"], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), env=env)
+    url = f"http://127.0.0.1:{args.port}/sse"
+    try:
+        await _wait_for_server(url, server)
+        latencies, errors = defaultdict(list), defaultdict(int)
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *[_client(url, args.calls, latencies, errors) for _ in range(args.clients)], return_exceptions=True
+        )
+        elapsed = time.perf_counter() - started
+        failed_clients = sum(1 for r in results if isinstance(r, BaseException))
+        total = sum(len(v) for v in latencies.values())
+        print(f"workers={args.workers} clients={args.clients} calls={total} failed_clients={failed_clients} "
+              f"elapsed={elapsed:.2f}s throughput={total / elapsed:.1f} calls/s")
+        print(f"{'tool':<16} {'calls':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+        for name, values in sorted(latencies.items()):
+            print(f"{name:<16} {len(values):>6} {errors[name]:>6} {_percentile(values, 0.5) * 1000:>9.1f} "
+                  f"{_percentile(values, 0.95) * 1000:>9.1f} {max(values) * 1000:>9.1f}")
+    finally:
+        server.terminate()
+        server.wait(15)
+        smtp.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCP SSE server load test")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--calls", type=int, default=9, help="tool calls per client")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8399)
+    parser.add_argument("--smtp-delay", type=float, default=0.2, help="seconds the SMTP stub takes per message")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Parse vs. cached read benchmark for the MCP table cache.
+
+For every table in the catalog (and optionally a generated CSV/XLSX pair of
+the given size) it compares parsing the source file with opening the
+memory-mapped Arrow cache file, so the effect of the columnar cache can be
+checked on real data sizes.
+
+    cd mcp
+    python -m benchmarks.table_cache_bench --rounds 10 --synthetic-rows 200000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import pyarrow as pa
+
+from table_cache import ColumnarTableCache, read_source
+from table_catalog import TableCatalog
+
+
+def _write_synthetic(data_dir: str, rows: int, xlsx_rows: int) -> None:
+    rng = random.Random(0)
+    with open(os.path.join(data_dir, "synthetic.csv"), "w", encoding="utf-8") as f:
+        f.write("Timestamp,EquipmentID,Temperature,Vibration,Pressure,Status\n")
+        for i in range(rows):
+            f.write(
+                f"2024-04-01 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d},COMP-{i % 50:03d},"
+                f"{rng.uniform(60, 95):.2f},{rng.uniform(2, 5):.3f},{rng.uniform(10, 14):.2f},"
+                f"{rng.choice(['ok', 'warn', 'fail'])}\n"
+            )
+    if xlsx_rows:
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Readings")
+        sheet.append(["EquipmentID", "Temperature", "Vibration", "Status"])
+        for i in range(xlsx_rows):
+            sheet.append([f"COMP-{i % 50:03d}", rng.uniform(60, 95), rng.uniform(2, 5), rng.choice(["ok", "warn"])])
+        workbook.save(os.path.join(data_dir, "synthetic_book.xlsx"))
+
+
+def _time(fn, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCP table cache benchmark")
+    parser.add_argument("--data-dir", default=os.environ.get("MCP_DATA_DIR", "./data"))
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--synthetic-rows", type=int, default=0, help="also benchmark a generated CSV of this many rows")
+    parser.add_argument("--synthetic-xlsx-rows", type=int, default=0, help="also benchmark a generated XLSX sheet")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir
+        if args.synthetic_rows or args.synthetic_xlsx_rows:
+            synthetic_dir = os.path.join(tmp, "data")
+            os.makedirs(synthetic_dir)
+            _write_synthetic(synthetic_dir, args.synthetic_rows, args.synthetic_xlsx_rows)
+            data_dir = os.pathsep.join([data_dir, synthetic_dir])
+
+        catalog = TableCatalog(data_dir, poll_interval=0)
+        catalog.refresh()
+        cache = ColumnarTableCache(os.path.join(tmp, "cache"))
+        cache.ingest_all(catalog)
+
+        print(f"{'table':<28} {'rows':>9} {'format':>6} {'parse ms':>10} {'cached ms':>10} {'speedup':>8}")
+        for info in sorted(catalog.tables(), key=lambda t: t.name):
+            path = cache.cache_path(info)
+            parse = _time(lambda: read_source(info), args.rounds)
+            cached = _time(lambda: pa.ipc.open_file(pa.memory_map(path, "r")).read_all(), args.rounds)
+            print(
+                f"{info.name[:28]:<28} {info.rows:>9} {info.format:>6} "
+                f"{parse * 1000:>10.2f} {cached * 1000:>10.3f} {parse / max(cached, 1e-9):>7.0f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+import json
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import List, Optional
+
+# Socket errors after which delivery is tried again (refused, reset, timed out). SMTPException
+# is an OSError too, so SMTP errors are sorted out before these (4xx replies and dropped
+# connections are retried, the others are permanent).
+_TRANSIENT_ERRORS = (ConnectionError, TimeoutError, OSError)
+
+
+class OutgoingMail:
+    def __init__(self, to_address: str, subject: str, plain_text: str, html_content: str, sender: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.to_address = to_address
+        self.subject = subject
+        self.plain_text = plain_text
+        self.html_content = html_content
+        self.sender = sender
+        self.status = "queued"
+        self.attempts = 0
+        self.error: Optional[str] = None
+        self.queued_at = time.time()
+        self.sent_at: Optional[float] = None
+
+    def as_string(self) -> str:
+        if self.html_content:
+            msg = MIMEMultipart("alternative")
+            msg.attach(MIMEText(self.plain_text, "plain"))
+            msg.attach(MIMEText(self.html_content, "html"))
+        else:
+            msg = MIMEText(self.plain_text, "plain")
+        msg["Subject"] = self.subject
+        msg["From"] = self.sender
+        msg["To"] = self.to_address
+        return msg.as_string()
+
+    def to_json(self) -> dict:
+        return {
+            "id": self.id,
+            "to": self.to_address,
+            "subject": self.subject,
+            "status": self.status,
+            "attempts": self.attempts,
+            "error": self.error,
+            "queued_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.queued_at)),
+            "sent_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.sent_at)) if self.sent_at else None,
+        }
+
+
+class _SmtpConnection:
+    """One authenticated SMTP connection, reopened when the server drops it."""
+
+    def __init__(self, host: str, port: int, user: Optional[str], password: Optional[str], timeout: float):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.timeout = timeout
+        self._smtp: Optional[smtplib.SMTP] = None
+        self.last_used = 0.0
+        self.opened = 0
+
+    def get(self, check_after: float = 30.0) -> smtplib.SMTP:
+        if self._smtp is not None and time.monotonic() - self.last_used > check_after:
+            try:
+                if self._smtp.noop()[0] != 250:
+                    self.close()
+            except smtplib.SMTPException:
+                self.close()
+            except OSError:
+                self.close()
+        if self._smtp is None:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.user and self.password:
+                smtp.login(self.user, self.password)
+            self._smtp = smtp
+            self.opened += 1
+        return self._smtp
+
+    def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+
+class MailQueue:
+    """Background delivery of mailer tool emails.
+
+    ``submit`` only records the message and returns its id. ``workers``
+    threads each keep one authenticated SMTP connection open, take up to
+    ``batch_size`` queued messages at a time and send them over that
+    connection. Transient failures are retried with exponential backoff up
+    to ``max_attempts``; permanent ones (5xx) fail at once. Outcomes are kept
+    for the last ``history`` messages for the status tool.
+
+    The queue lives in the memory of this process: emails still waiting when
+    it stops are not sent. With ``status_dir`` the status of each message is
+    also written there when it is queued and when an attempt ends, so it can
+    be looked up from the other MCP worker processes and after a restart
+    (records older than ``status_ttl`` seconds are removed on start).
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 25,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        sender: str = "noreply@example.com",
+        workers: int = 2,
+        batch_size: int = 20,
+        max_attempts: int = 5,
+        backoff: float = 2.0,
+        max_backoff: float = 300.0,
+        idle_timeout: float = 60.0,
+        timeout: float = 30.0,
+        history: int = 1000,
+        status_dir: Optional[str] = None,
+        status_ttl: float = 7 * 24 * 3600,
+    ):
+        self.sender = sender
+        self.batch_size = max(1, batch_size)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.idle_timeout = idle_timeout
+        self._connection_args = (host, port, user, password, timeout)
+        self._queue: "queue.Queue[OutgoingMail]" = queue.Queue()
+        self._messages: "OrderedDict[str, OutgoingMail]" = OrderedDict()
+        self._history = history
+        self.status_dir = status_dir
+        self.status_ttl = status_ttl
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._worker_count = max(1, workers)
+        self.connections_opened = 0
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        if self.status_dir:
+            os.makedirs(self.status_dir, exist_ok=True)
+            self._prune_records()
+        for i in range(self._worker_count):
+            thread = threading.Thread(target=self._work, name=f"mail-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, to_address: str, subject: str, plain_text: str, html_content: str = "") -> OutgoingMail:
+        self.start()
+        mail = OutgoingMail(to_address, subject, plain_text, html_content, self.sender)
+        with self._lock:
+            self._messages[mail.id] = mail
+            # Forget the oldest finished messages.
+            while len(self._messages) > self._history:
+                oldest_id, oldest = next(iter(self._messages.items()))
+                if oldest.status in ("queued", "retrying", "sending"):
+                    break
+                del self._messages[oldest_id]
+        self._record(mail)
+        self._queue.put(mail)
+        return mail
+
+    def status(self, message_id: str) -> Optional[dict]:
+        with self._lock:
+            mail = self._messages.get(message_id)
+            if mail:
+                return mail.to_json()
+        # queued by another worker process, or before a restart
+        return self._read_record(message_id)
+
+    def _record_path(self, message_id: str) -> str:
+        return os.path.join(self.status_dir, f"{message_id}.json")
+
+    def _record(self, mail: OutgoingMail) -> None:
+        if not self.status_dir:
+            return
+        path = self._record_path(mail.id)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(mail.to_json(), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.getLogger("mail_queue").warning(f"Could not record status of email {mail.id}: {e}")
+
+    def _read_record(self, message_id: str) -> Optional[dict]:
+        # ids are hex; anything else cannot name a record
+        if not self.status_dir or not message_id.isalnum():
+            return None
+        try:
+            with open(self._record_path(message_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _prune_records(self) -> None:
+        cutoff = time.time() - self.status_ttl
+        for name in os.listdir(self.status_dir):
+            path = os.path.join(self.status_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def summary(self, recent: int = 20) -> dict:
+        with self._lock:
+            messages = list(self._messages.values())
+        counts = {}
+        for mail in messages:
+            counts[mail.status] = counts.get(mail.status, 0) + 1
+        return {
+            "counts": counts,
+            "queue_depth": self._queue.qsize(),
+            "connections_opened": self.connections_opened,
+            "recent": [mail.to_json() for mail in messages[-recent:]] if recent > 0 else [],
+        }
+
+    def _next_batch(self) -> List[OutgoingMail]:
+        batch = [self._queue.get(timeout=self.idle_timeout)]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _work(self) -> None:
+        logger = logging.getLogger("mail_queue")
+        connection = _SmtpConnection(*self._connection_args)
+        while not self._stop.is_set():
+            try:
+                batch = self._next_batch()
+            except queue.Empty:
+                connection.close()  # idle: do not hold the server's connection slot
+                continue
+            for mail in batch:
+                mail.status = "sending"
+                mail.attempts += 1
+                try:
+                    opened = connection.opened
+                    smtp = connection.get()
+                    if connection.opened != opened:
+                        with self._lock:
+                            self.connections_opened += 1
+                    smtp.sendmail(mail.sender, [mail.to_address], mail.as_string())
+                    connection.last_used = time.monotonic()
+                    mail.status = "sent"
+                    mail.error = None
+                    mail.sent_at = time.time()
+                    self._record(mail)
+                    logger.info(f"Email {mail.id} sent to {mail.to_address}")
+                except smtplib.SMTPResponseException as e:
+                    if 400 <= e.smtp_code < 500:
+                        connection.close()  # e.g. 421: the server is closing the channel
+                        self._retry(mail, f"{e.smtp_code} {e.smtp_error!r}")
+                    else:
+                        self._fail(mail, f"{e.smtp_code} {e.smtp_error!r}")
+                except smtplib.SMTPRecipientsRefused as e:
+                    self._fail(mail, f"Recipient refused: {e.recipients}")
+                except smtplib.SMTPServerDisconnected as e:
+                    connection.close()
+                    self._retry(mail, str(e) or type(e).__name__)
+                except smtplib.SMTPException as e:
+                    # e.g. SMTPNotSupportedError: sending again will not help
+                    connection.close()
+                    self._fail(mail, str(e) or type(e).__name__)
+                except _TRANSIENT_ERRORS as e:
+                    connection.close()
+                    self._retry(mail, str(e) or type(e).__name__)
+                except Exception as e:
+                    connection.close()
+                    self._fail(mail, str(e))
+        connection.close()
+
+    def _retry(self, mail: OutgoingMail, error: str) -> None:
+        mail.error = error
+        if mail.attempts >= self.max_attempts:
+            self._fail(mail, f"Giving up after {mail.attempts} attempts: {error}")
+            return
+        mail.status = "retrying"
+        self._record(mail)
+        delay = min(self.max_backoff, self.backoff * 2 ** (mail.attempts - 1))
+        logging.getLogger("mail_queue").warning(f"Email {mail.id} failed ({error}), retrying in {delay:.0f}s")
+        timer = threading.Timer(delay, self._queue.put, args=(mail,))
+        timer.daemon = True
+        timer.start()
+
+    def _fail(self, mail: OutgoingMail, error: str) -> None:
+        mail.status = "failed"
+        mail.error = error
+        self._record(mail)
+        logging.getLogger("mail_queue").error(f"Email {mail.id} to {mail.to_address} failed: {error}")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+_mail_queue: Optional[MailQueue] = None
+_mail_queue_lock = threading.Lock()
+
+
+def get_mail_queue() -> MailQueue:
+    global _mail_queue
+    with _mail_queue_lock:
+        if _mail_queue is None:
+            _mail_queue = MailQueue(
+                host=os.environ.get("SMTP_HOST", "localhost"),
+                port=int(os.environ.get("SMTP_PORT", "25")),
+                user=os.environ.get("SMTP_USER"),
+                password=os.environ.get("SMTP_PASSWORD"),
+                sender=os.environ.get("SMTP_SENDER", "noreply@example.com"),
+                workers=int(os.environ.get("MAIL_WORKERS", "2")),
+                batch_size=int(os.environ.get("MAIL_BATCH_SIZE", "20")),
+                max_attempts=int(os.environ.get("MAIL_MAX_ATTEMPTS", "5")),
+                backoff=float(os.environ.get("MAIL_RETRY_BACKOFF", "2")),
+                status_dir=os.environ.get("MAIL_STATUS_DIR", "./.cache/mail") or None,
+            )
+            _mail_queue.start()
+        return _mail_queue
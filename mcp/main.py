@@ -3,8 +3,9 @@ from mcp.server.sse import SseServerTransport
 from starlette.routing import Mount
 # from weather import mcp
 from mcp_general_server import mcp
+from table_catalog import get_catalog
+from table_cache import get_table_cache
 from api_key_auth import ensure_valid_api_key
-import uvicorn
 import logging
 logging.basicConfig(level=logging.INFO)
 
@@ -16,8 +17,22 @@ load_dotenv(override=True)
 app = FastAPI(docs_url=None, redoc_url=None, dependencies=[Depends(ensure_valid_api_key)])
 # app = FastAPI(docs_url=None, redoc_url=None)
 
-sse = SseServerTransport("/messages/")
-app.router.routes.append(Mount("/messages", app=sse.handle_post_message))
+# Behind the multi-worker front (server.py) each worker posts messages under its own
+# prefix, so a client's POSTs are routed back to the worker that holds its SSE session.
+WORKER_INDEX = os.environ.get("MCP_WORKER_INDEX")
+
+@app.on_event("startup")
+async def build_table_catalog():
+    # Index ./data once at start and convert the tables to the columnar cache;
+    # the catalog keeps itself current afterwards and changed files are re-cached on read.
+    # The cache is shared on disk, so behind the front only the first worker fills it.
+    catalog = get_catalog()
+    if WORKER_INDEX in (None, "0"):
+        get_table_cache().ingest_all(catalog)
+MESSAGES_PATH = f"/workers/{WORKER_INDEX}/messages/" if WORKER_INDEX is not None else "/messages/"
+
+sse = SseServerTransport(MESSAGES_PATH)
+app.router.routes.append(Mount(MESSAGES_PATH.rstrip("/"), app=sse.handle_post_message))
 
 @app.get("/sse", tags=["MCP"])
 async def handle_sse(request: Request):
@@ -35,6 +50,6 @@ async def handle_sse(request: Request):
         )
 
 
-        if __name__ == "__main__":
-
-            uvicorn.run(app, host="0.0.0.0", port=8333, log_level="info")
\ No newline at end of file
+if __name__ == "__main__":
+    from server import main
+    main()
@@ -1,5 +1,5 @@
 
-from typing import Any
+from typing import Any, Dict, List, Optional, Union
 import httpx
 from mcp.server.fastmcp import FastMCP
 
@@ -10,11 +10,37 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+import functools
 import json
 import os
 
+import anyio
 
-# MCP tool for sending email using Azure Communication Services
+from mail_queue import get_mail_queue
+from table_catalog import get_catalog
+from table_cache import get_table_cache
+from table_query import QueryError, load_table, run_query, to_csv
+
+_tool_limiter = None
+
+
+def run_in_thread(fn):
+    """Run a blocking tool in a worker thread so it does not stall the event loop.
+
+    FastMCP calls plain functions directly on the loop, so a slow SMTP send or
+    table scan would freeze every other client's stream. At most
+    MCP_TOOL_THREADS blocking tool calls run at the same time.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        global _tool_limiter
+        if _tool_limiter is None:
+            _tool_limiter = anyio.CapacityLimiter(int(os.environ.get("MCP_TOOL_THREADS", "16")))
+        return await anyio.to_thread.run_sync(functools.partial(fn, *args, **kwargs), limiter=_tool_limiter)
+    return wrapper
+
+
+# MCP tool for sending email through the background mail queue
 @mcp.tool()
 def mailer(
     to_address: str = "",
@@ -23,7 +49,10 @@ def mailer(
     html_content: str = ""
 ) -> str:
     """
-    Sends an email using Azure Communication Services EmailClient.
+    Queues an email for delivery over SMTP and returns its message id.
+
+    Delivery happens in the background (pooled SMTP connections, retries with
+    backoff); use the mail_status tool with the id to check the outcome.
 
     Args:
         to_address (str): Recipient email address.
@@ -31,125 +60,157 @@ def mailer(
         plain_text (str): Plain text content.
         html_content (str): HTML content (optional).
     Returns:
-        str: Result of the send operation or error message.
+        str: The queued message id or an error message.
     """
     logger = logging.getLogger("mailer")
 
-    smtp_host = os.environ.get("SMTP_HOST", "localhost")
-    smtp_port = int(os.environ.get("SMTP_PORT", "25"))
-    smtp_user = os.environ.get("SMTP_USER")
-    smtp_password = os.environ.get("SMTP_PASSWORD")
-    sender_address = os.environ.get("SMTP_SENDER", "noreply@example.com")
-
-    logger.info("Mailer tool started.")
-    logger.info(f"SMTP host: {smtp_host}:{smtp_port}")
-    logger.info(f"Sender address: {sender_address}")
-    logger.info(f"Recipient address: {to_address}")
-    logger.info(f"Subject: {subject}")  
-    logger.info(f"Plain text: {plain_text}")
-    logger.info(f"HTML content: {html_content}")
-    logger.info(f"Environment variables: {os.environ}")
-
     if not to_address:
         logger.error("No recipient address provided")
         return "Recipient address is required"
     if not subject:
         subject = "Message from local agent"
 
-    logger.info(f"Sending email to {to_address}...")
-    try:
-        import smtplib
-        from email.mime.text import MIMEText
-
-        msg = MIMEText(plain_text, "plain")
-        msg["Subject"] = subject
-        msg["From"] = sender_address
-        msg["To"] = to_address
-
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
-            if smtp_user and smtp_password:
-                server.login(smtp_user, smtp_password)
-            server.sendmail(sender_address, [to_address], msg.as_string())
-        logger.info("Email sent.")
-        return "Email sent. \n\nTERMINATE."
-    except Exception as e:
-        logger.error(f"Failed to send email: {e}")
-        return f"Failed to send email: {e} \n\nTERMINATE."
+    mail = get_mail_queue().submit(to_address, subject, plain_text, html_content)
+    logger.info(f"Email {mail.id} to {to_address} queued.")
+    return f"Email queued for delivery with message id {mail.id}. \n\nTERMINATE."
+
+
+@mcp.tool(description="Delivery status of emails queued by the mailer tool")
+def mail_status(message_id: str = "") -> str:
+    """Report the delivery outcome of a queued email.
 
-@mcp.tool(description="Fetch table data by name")
-def data_provider(tablename: str) -> str:
+    Args:
+        message_id (str): Id returned by the mailer tool. Empty for a summary
+            of the queue and the most recent messages.
+    Returns:
+        str: JSON with status (queued, sending, retrying, sent or failed), attempts and the last error.
+    """
+    mail_queue = get_mail_queue()
+    if not message_id:
+        return json.dumps(mail_queue.summary(), indent=2)
+    status = mail_queue.status(message_id)
+    if status is None:
+        return f"Unknown message id '{message_id}'."
+    return json.dumps(status, indent=2)
+
+@mcp.tool(description="Query table data by name: select columns, filter rows, group and aggregate, sort and page through results")
+@run_in_thread
+def data_provider(
+    tablename: str,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[Dict[str, Any]]] = None,
+    group_by: Optional[List[str]] = None,
+    aggregates: Optional[Dict[str, Union[str, List[str]]]] = None,
+    order_by: Optional[List[str]] = None,
+    descending: bool = False,
+    limit: Optional[int] = None,
+    offset: int = 0,
+) -> str:
     """A tool that provides data from database based on given table name as parameter.
-    
+
+    The query runs on the server, so only the requested rows are returned.
+    Call show_tables first to see the column names of each table.
+
     Args:
         tablename (str): The table to read data from.
-        
+        columns (list[str]): Columns to return (default: all).
+        filters (list[dict]): Row conditions, all must match. Each is
+            {"column": ..., "op": ..., "value": ...} with op one of
+            =, !=, <, <=, >, >=, in, not in, contains, startswith, endswith, is_null, not_null.
+        group_by (list[str]): Columns to group by.
+        aggregates (dict): Column -> function or list of functions
+            (count, count_distinct, sum, mean, min, max, stddev); use "*": "count" to count rows.
+        order_by (list[str]): Columns to sort by (after aggregation, aggregate
+            columns are named "<column>_<function>").
+        descending (bool): Sort in descending order.
+        limit (int): Maximum number of rows to return (capped by DATA_PROVIDER_MAX_ROWS).
+        offset (int): Number of rows to skip, to page through a large result.
+
     Returns:
-        str: The content of the file.
+        str: A summary line followed by the matching rows as CSV.
 
     """
     logger = logging.getLogger("file_provider")
-    # This is a placeholder for the actual data provider logic
-    data = "This is some data."
-    logger.warning(f"Table '{tablename}' requested.")
+    logger.info(f"Table '{tablename}' requested.")
 
     try:
-        tablename = tablename.strip() + ".csv"
-        # locate the file in .data folder recursively
-        _file_json = find_file(tablename)
-        _file_info = json.loads(_file_json)
-        _file_path = _file_info["path"]
-        if not _file_path:
-            logger.error(f"File '{tablename}' not found.")
-            return f"File '{tablename}' not found."
-        logger.warning(f"File '{tablename}' found at '{_file_path}'.")
-        # read from a file
-        with open(_file_path, "r") as file:
-            data = file.read()
-    
+        tablename = tablename.strip()
+        if tablename.lower().endswith((".csv", ".xlsx")):
+            tablename = os.path.splitext(tablename)[0]
+        # look the table up in the catalog instead of walking ./data
+        table_info = get_catalog().get(tablename)
+        if table_info is None:
+            logger.error(f"Table '{tablename}' not found.")
+            return f"File '{tablename}.csv' not found."
+        logger.info(f"Table '{tablename}' found at '{table_info.path}'.")
+
+        max_rows = int(os.environ.get("DATA_PROVIDER_MAX_ROWS", "200"))
+        limit = max_rows if limit is None else max(0, min(limit, max_rows))
+        result, total = run_query(
+            load_table(table_info),
+            columns=columns,
+            filters=filters,
+            group_by=group_by,
+            aggregates=aggregates,
+            order_by=order_by,
+            descending=descending,
+            limit=limit,
+            offset=offset,
+        )
+        first = min(offset, total)
+        summary = f"Table '{tablename}': {total} matching rows, showing {result.num_rows}"
+        if result.num_rows:
+            summary += f" (rows {first + 1}-{first + result.num_rows})"
+        data = summary + ".\n" + to_csv(result)
+        remaining = total - first - result.num_rows
+        if remaining > 0:
+            data += f"[truncated: {remaining} more rows, use offset={first + result.num_rows} to continue]\n"
         return data
+    except QueryError as e:
+        logger.warning(f"Invalid query on '{tablename}': {e}")
+        return f"Invalid query: {e}"
     except Exception as e:
         logger.error(f"Error reading file '{tablename}': {e}")
         return None
 
 def find_file(filename: str) -> str:
     """
-    Searches recursively within the ./data folder for an exact filename match.
+    Looks up a table file by its exact filename in the table catalog of the ./data folder.
     Returns a JSON string with the full relative path and the original filename.
     """
-    logger = logging.getLogger("find_file")
-    for root, _, files in os.walk("./data"):
-        if filename in files:
-            full_path = os.path.join(root, filename)
-            logger.warning(f"Found file: {full_path}")
-            return json.dumps({
-                "path": full_path,
-                "filename": filename
-            })
-    logging.warning(f"File '{filename}' not found in './data' directory.")
+    stem, _ = os.path.splitext(filename)
+    table = get_catalog().get(stem)
+    if table is None or os.path.basename(table.path) != filename:
+        logging.warning(f"File '{filename}' not found in './data' directory.")
+        return json.dumps({
+            "path": None,
+            "filename": filename
+        })
     return json.dumps({
-        "path": None,
+        "path": table.path,
         "filename": filename
     })
 
 @mcp.tool()
+@run_in_thread
 def show_tables() -> list:
     """
-    Searches for all CSV files in the ./data folder and returns a list of table names (without .csv extension).
+    Lists the tables (CSV files and XLSX sheets) available in the ./data folder with their schema.
     Returns:
-        list: List of table names found in the ./data directory.
+        list: One entry per table with its name, column names, row count, file size and last modification time.
     """
     logger = logging.getLogger("show_tables")
-    table_names = []
-    for root, _, files in os.walk("./data"):
-        for file in files:
-            if file.lower().endswith(".csv"):
-                table_name = file[:-4]  # Remove .csv extension
-                table_names.append(table_name)
-                logger.info(f"Found table: {table_name}")
-    if not table_names:
-        logger.warning("No CSV tables found in './data' directory.")
-    return table_names
+    tables = []
+    for table in sorted(get_catalog().tables(), key=lambda t: t.name):
+        info = table.to_json()
+        info.pop("path", None)
+        tables.append(info)
+    if not tables:
+        logger.warning("No CSV/XLSX tables found in the data directory.")
+    return tables
 
 if __name__ == "__main__":
+    # Build the table catalog and convert the tables to the columnar cache before accepting requests
+    get_table_cache().ingest_all(get_catalog())
     # Initialize and run the server
     mcp.run(transport='stdio')
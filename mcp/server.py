@@ -0,0 +1,198 @@
+"""Production entry point of the MCP SSE server.
+
+    python server.py                  # MCP_HOST / MCP_PORT, default 0.0.0.0:8333
+    MCP_WORKERS=4 python server.py    # one front process + 4 worker processes
+
+An SSE session lives in the memory of the process that accepted the GET
+/sse stream, so the POSTs of that client have to reach the same process.
+With MCP_WORKERS > 1 every worker runs ``main:app`` on a private port and
+announces ``/workers/<n>/messages/`` as its message endpoint. The front
+process streams each new /sse connection from the least busy worker and
+routes message POSTs by that path prefix, which keeps affinity without
+any shared session table.
+"""
+import asyncio
+import contextlib
+import logging
+import os
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from api_key_auth import check_api_key
+
+# Hop-by-hop headers are not forwarded by the front process.
+_HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "te", "trailer", "upgrade", "host", "content-length"}
+
+
+class _Worker:
+    def __init__(self, index: int, port: int):
+        self.index = index
+        self.port = port
+        self.process: Optional[subprocess.Popen] = None
+        self.streams = 0
+        self.restarts = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def spawn(self, log_level: str) -> None:
+        env = dict(os.environ, MCP_WORKER_INDEX=str(self.index))
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(self.port),
+             "--log-level", log_level, "--no-access-log"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=env,
+        )
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+
+class WorkerFront:
+    """Starlette app that spreads SSE sessions over worker processes."""
+
+    def __init__(self, workers: int, base_port: int, log_level: str = "info"):
+        self.workers: List[_Worker] = [_Worker(i, base_port + i) for i in range(workers)]
+        self.log_level = log_level
+        self._client: Optional[httpx.AsyncClient] = None
+        self._monitor: Optional[asyncio.Task] = None
+        self.app = Starlette(
+            routes=[
+                Route("/sse", self.handle_sse, methods=["GET"]),
+                Route("/workers/{index:int}/messages/", self.handle_message, methods=["POST"]),
+                Route("/workers", self.handle_stats, methods=["GET"]),
+            ],
+            lifespan=self.lifespan,
+        )
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self, app):
+        await self.startup()
+        yield
+        await self.shutdown()
+
+    async def startup(self) -> None:
+        # SSE streams stay open for the whole session, so there is no read timeout.
+        self._client = httpx.AsyncClient(timeout=httpx.Timeout(30.0, read=None), limits=httpx.Limits(max_connections=None))
+        for worker in self.workers:
+            worker.spawn(self.log_level)
+        await asyncio.gather(*[self._wait_ready(worker) for worker in self.workers])
+        self._monitor = asyncio.create_task(self._watch())
+        print(f"MCP front ready with {len(self.workers)} workers.")
+
+    async def _wait_ready(self, worker: _Worker, timeout: float = 60) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and worker.alive():
+            try:
+                # Any HTTP answer (403 without an API key included) means the worker is serving.
+                await self._client.get(f"{worker.url}/workers/{worker.index}/messages/", timeout=1)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+        logging.getLogger("mcp_front").warning(f"MCP worker {worker.index} did not become ready.")
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(2)
+            for worker in self.workers:
+                if not worker.alive():
+                    logging.getLogger("mcp_front").warning(
+                        f"MCP worker {worker.index} exited with code {worker.process.returncode}, restarting."
+                    )
+                    worker.restarts += 1
+                    worker.streams = 0
+                    worker.spawn(self.log_level)
+                    await self._wait_ready(worker)
+
+    async def shutdown(self) -> None:
+        if self._monitor is not None:
+            self._monitor.cancel()
+        for worker in self.workers:
+            if worker.alive():
+                worker.process.terminate()
+        for worker in self.workers:
+            if worker.process is not None:
+                try:
+                    await asyncio.to_thread(worker.process.wait, 10)
+                except subprocess.TimeoutExpired:
+                    worker.process.kill()
+        await self._client.aclose()
+
+    @staticmethod
+    def _forward_headers(request: Request) -> dict:
+        return {k: v for k, v in request.headers.items() if k.lower() not in _HOP_HEADERS}
+
+    async def handle_sse(self, request: Request) -> Response:
+        live = [w for w in self.workers if w.alive()]
+        if not live:
+            return JSONResponse({"detail": "No MCP workers available"}, status_code=503)
+        worker = min(live, key=lambda w: w.streams)
+        upstream = await self._client.send(
+            self._client.build_request("GET", f"{worker.url}/sse", headers=self._forward_headers(request)),
+            stream=True,
+        )
+        worker.streams += 1
+
+        async def close():
+            worker.streams = max(0, worker.streams - 1)
+            await upstream.aclose()
+
+        headers = {k: v for k, v in upstream.headers.items() if k.lower() not in _HOP_HEADERS}
+        return StreamingResponse(
+            upstream.aiter_raw(), status_code=upstream.status_code, headers=headers, background=BackgroundTask(close)
+        )
+
+    async def handle_message(self, request: Request) -> Response:
+        index = request.path_params["index"]
+        if index >= len(self.workers) or not self.workers[index].alive():
+            # The worker holding this session is gone; the client has to reconnect.
+            return Response("Could not find session", status_code=404)
+        worker = self.workers[index]
+        upstream = await self._client.post(
+            f"{worker.url}{request.url.path}",
+            params=request.query_params,
+            content=await request.body(),
+            headers=self._forward_headers(request),
+        )
+        headers = {k: v for k, v in upstream.headers.items() if k.lower() not in _HOP_HEADERS}
+        return Response(upstream.content, status_code=upstream.status_code, headers=headers)
+
+    async def handle_stats(self, request: Request) -> Response:
+        # answered by the front itself, so it checks the key the workers check
+        if not check_api_key(request.headers.get("x-api-key", "")):
+            return JSONResponse({"detail": "Invalid API key"}, status_code=403)
+        return JSONResponse([
+            {"index": w.index, "port": w.port, "alive": w.alive(), "streams": w.streams, "restarts": w.restarts}
+            for w in self.workers
+        ])
+
+
+def main() -> None:
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    host = os.environ.get("MCP_HOST", "0.0.0.0")
+    port = int(os.environ.get("MCP_PORT", "8333"))
+    workers = int(os.environ.get("MCP_WORKERS", "1"))
+    log_level = os.environ.get("MCP_LOG_LEVEL", "info")
+    if workers <= 1:
+        uvicorn.run("main:app", host=host, port=port, log_level=log_level)
+        return
+    base_port = int(os.environ.get("MCP_WORKER_BASE_PORT", str(port + 1)))
+    front = WorkerFront(workers, base_port, log_level=log_level)
+    uvicorn.run(front.app, host=host, port=port, log_level=log_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import glob
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+from table_catalog import TableCatalog, TableInfo, header_names, xlsx_rows
+
+
+def read_source(info: TableInfo) -> pa.Table:
+    """Parse a table from its source file (CSV text or an XLSX sheet)."""
+    if info.sheet is None:
+        return pa_csv.read_csv(info.path)
+    rows = xlsx_rows(info.path, info.sheet)
+    names = header_names(next(rows, ()))
+    values = [[] for _ in names]
+    for row in rows:
+        for i in range(len(names)):
+            values[i].append(row[i] if i < len(row) else None)
+    arrays = []
+    for column in values:
+        try:
+            arrays.append(pa.array(column))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # mixed cell types in one column: keep the text form
+            arrays.append(pa.array([None if v is None else str(v) for v in column], type=pa.string()))
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+class ColumnarTableCache:
+    """On-disk Arrow cache of parsed tables, keyed by source file and mtime.
+
+    Each table is parsed from CSV/XLSX once and written as an uncompressed
+    Arrow IPC file. Reads memory-map that file, so the returned table's
+    buffers point straight into the page cache (no parsing, no copy) and
+    are shared by every process of the server. A new mtime or size of the
+    source produces a new cache file; the stale one is removed.
+
+    Arrow IPC is used rather than Parquet because Parquet pages have to be
+    decoded and cannot be mapped zero-copy.
+    """
+
+    def __init__(self, cache_dir: str = "./.cache/tables"):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._tables: Dict[str, pa.Table] = {}
+        self._lock = threading.Lock()
+        self.conversions = 0
+
+    def _key(self, info: TableInfo) -> str:
+        source = f"{os.path.abspath(info.path)}|{info.sheet or ''}"
+        return hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+
+    def cache_path(self, info: TableInfo) -> str:
+        return os.path.join(self.cache_dir, f"{self._key(info)}-{info.size}-{int(info.mtime * 1e6)}.arrow")
+
+    def ingest(self, info: TableInfo) -> str:
+        """Convert ``info`` to the cache unless an up-to-date copy exists; returns the cache file."""
+        path = self.cache_path(info)
+        if os.path.exists(path):
+            return path
+        started = time.perf_counter()
+        table = read_source(info)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+        self.conversions += 1
+        for stale in glob.glob(os.path.join(self.cache_dir, f"{self._key(info)}-*.arrow")):
+            if stale != path:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+        logging.getLogger("table_cache").info(
+            f"Cached table '{info.name}' ({table.num_rows} rows) in {time.perf_counter() - started:.3f}s"
+        )
+        return path
+
+    def load(self, info: TableInfo) -> pa.Table:
+        path = self.cache_path(info)
+        with self._lock:
+            table = self._tables.get(path)
+        if table is not None:
+            return table
+        self.ingest(info)
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        with self._lock:
+            # Drop the mapping of an older version of the same table.
+            prefix = os.path.join(self.cache_dir, self._key(info))
+            for old in [p for p in self._tables if p.startswith(prefix)]:
+                del self._tables[old]
+            self._tables[path] = table
+        return table
+
+    def ingest_all(self, catalog: TableCatalog) -> int:
+        """Convert every catalog table whose cache is missing or stale; returns the number converted."""
+        before = self.conversions
+        for info in catalog.tables():
+            try:
+                self.ingest(info)
+            except Exception as e:
+                logging.getLogger("table_cache").warning(f"Could not cache table '{info.name}': {e}")
+        return self.conversions - before
+
+
+_cache: Optional[ColumnarTableCache] = None
+
+
+def get_table_cache() -> ColumnarTableCache:
+    global _cache
+    if _cache is None:
+        _cache = ColumnarTableCache(os.environ.get("TABLE_CACHE_DIR", "./.cache/tables"))
+    return _cache
@@ -0,0 +1,198 @@
+import csv
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+TABLE_EXTENSIONS = (".csv", ".xlsx")
+
+
+def xlsx_sheet_names(path: str) -> List[str]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def xlsx_rows(path: str, sheet: str):
+    """Yield the non-empty rows of an XLSX sheet as tuples of cell values."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for row in workbook[sheet].iter_rows(values_only=True):
+            if any(value is not None and value != "" for value in row):
+                yield row
+    finally:
+        workbook.close()
+
+
+def header_names(row) -> List[str]:
+    """Column names from a header row: blanks get a positional name, duplicates a suffix."""
+    names = []
+    for i, value in enumerate(row):
+        name = str(value).strip() if value is not None and str(value).strip() else f"column_{i + 1}"
+        base, n = name, 1
+        while name in names:
+            n += 1
+            name = f"{base}_{n}"
+        names.append(name)
+    return names
+
+
+class TableInfo:
+    """Catalog entry for one table: a CSV file or one sheet of an XLSX workbook."""
+
+    def __init__(self, name: str, path: str, size: int, mtime: float, sheet: Optional[str] = None):
+        self.name = name
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.sheet = sheet
+        self.columns: List[str] = []
+        self.rows = 0
+        self.indexed = False
+
+    @property
+    def format(self) -> str:
+        return "xlsx" if self.sheet is not None else "csv"
+
+    def load_schema(self) -> None:
+        """Read the header and count the rows (only done when the file changed)."""
+        if self.sheet is not None:
+            rows = xlsx_rows(self.path, self.sheet)
+            self.columns = header_names(next(rows, ()))
+            self.rows = sum(1 for _ in rows)
+            return
+        # utf-8-sig drops the BOM some of the exported CSVs start with
+        with open(self.path, "r", encoding="utf-8-sig", errors="replace", newline="") as f:
+            reader = csv.reader(f)
+            self.columns = next(reader, [])
+            self.rows = sum(1 for row in reader if row)
+
+    def to_json(self) -> dict:
+        return {
+            "name": self.name,
+            "path": self.path,
+            "sheet": self.sheet,
+            "format": self.format,
+            "columns": self.columns,
+            "rows": self.rows,
+            "size": self.size,
+            "modified": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.mtime)),
+        }
+
+
+class TableCatalog:
+    """In-memory index of the tables under the data folders.
+
+    The directory trees are scanned once at start and then re-scanned by a
+    background thread every ``poll_interval`` seconds; only files whose size
+    or mtime changed are re-read. Lookups by table name are dictionary hits
+    instead of an ``os.walk`` per tool call.
+
+    A CSV file is one table named after the file. Every sheet of an XLSX
+    workbook is a table; a single-sheet workbook is named after the file,
+    otherwise tables are named ``<file>.<sheet>``.
+    """
+
+    def __init__(self, data_dir: str = "./data", poll_interval: float = 5.0):
+        # several folders may be given, separated like PATH entries
+        self.data_dirs = [d for d in data_dir.split(os.pathsep) if d]
+        self.poll_interval = poll_interval
+        self._tables: Dict[str, TableInfo] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.scans = 0
+
+    def _entries(self, path: str, stem: str, ext: str, st) -> List[TableInfo]:
+        """Catalog entries of one file, reusing the current ones if the file is unchanged."""
+        with self._lock:
+            current = [t for t in self._tables.values() if t.path == path]
+        if current and all((t.size, t.mtime) == (st.st_size, st.st_mtime) for t in current):
+            return current
+        if ext == ".xlsx":
+            sheets = xlsx_sheet_names(path)
+            return [
+                TableInfo(stem if len(sheets) == 1 else f"{stem}.{sheet}", path, st.st_size, st.st_mtime, sheet=sheet)
+                for sheet in sheets
+            ]
+        return [TableInfo(stem, path, st.st_size, st.st_mtime)]
+
+    def refresh(self) -> None:
+        logger = logging.getLogger("table_catalog")
+        found: Dict[str, TableInfo] = {}
+        for data_dir in self.data_dirs:
+            for root, dirs, files in os.walk(data_dir):
+                dirs.sort()
+                for fname in sorted(files):
+                    stem, ext = os.path.splitext(fname)
+                    ext = ext.lower()
+                    if ext not in TABLE_EXTENSIONS or fname.startswith("~$"):
+                        continue
+                    path = os.path.join(root, fname)
+                    try:
+                        st = os.stat(path)
+                        entries = self._entries(path, stem, ext, st)
+                    except Exception as e:
+                        # e.g. password/IRM protected workbooks
+                        logger.warning(f"Skipping unreadable table file '{path}': {e}")
+                        continue
+                    for info in entries:
+                        if info.name in found:
+                            continue
+                        if not info.indexed:
+                            try:
+                                info.load_schema()
+                            except Exception as e:
+                                logger.warning(f"Could not read schema of '{info.name}' in '{path}': {e}")
+                            info.indexed = True
+                            logger.info(f"Indexed table '{info.name}' ({info.rows} rows) at '{path}'")
+                        found[info.name] = info
+        with self._lock:
+            self._tables = found
+        self.scans += 1
+
+    def start(self) -> None:
+        """Build the catalog and keep it up to date from a daemon thread."""
+        self.refresh()
+        if self.poll_interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._poll, name="table-catalog", daemon=True)
+            self._thread.start()
+
+    def _poll(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.getLogger("table_catalog").warning(f"Catalog refresh failed: {e}")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def get(self, name: str) -> Optional[TableInfo]:
+        with self._lock:
+            return self._tables.get(name)
+
+    def tables(self) -> List[TableInfo]:
+        with self._lock:
+            return list(self._tables.values())
+
+
+_catalog: Optional[TableCatalog] = None
+
+
+def get_catalog() -> TableCatalog:
+    global _catalog
+    if _catalog is None:
+        _catalog = TableCatalog(
+            data_dir=os.environ.get("MCP_DATA_DIR", "./data"),
+            poll_interval=float(os.environ.get("TABLE_CATALOG_POLL_INTERVAL", "5")),
+        )
+        _catalog.start()
+    return _catalog
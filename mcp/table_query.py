@@ -0,0 +1,147 @@
+import io
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+from table_cache import get_table_cache
+from table_catalog import TableInfo
+
+AGGREGATE_FUNCTIONS = ("count", "count_distinct", "sum", "mean", "min", "max", "stddev")
+
+_COMPARISONS = {
+    "=": pc.equal,
+    "==": pc.equal,
+    "!=": pc.not_equal,
+    "<": pc.less,
+    "<=": pc.less_equal,
+    ">": pc.greater,
+    ">=": pc.greater_equal,
+}
+
+
+class QueryError(ValueError):
+    """Raised for a query the table cannot answer (unknown column, operator, ...)."""
+
+
+def load_table(info: TableInfo) -> pa.Table:
+    """The table as a memory-mapped Arrow table from the columnar cache."""
+    return get_table_cache().load(info)
+
+
+def _column(table: pa.Table, name: str) -> pa.ChunkedArray:
+    if name not in table.column_names:
+        raise QueryError(f"Unknown column '{name}'. Available columns: {', '.join(table.column_names)}")
+    return table[name]
+
+
+def _scalar(value: Any, type_: pa.DataType) -> pa.Scalar:
+    """Convert a filter value (as sent by the model, often a string) to the column's type."""
+    try:
+        if isinstance(value, str) and not pa.types.is_string(type_):
+            return pc.cast(pa.scalar(value), type_)
+        return pa.scalar(value, type=type_)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+        raise QueryError(f"Value {value!r} is not valid for a column of type {type_}") from None
+
+
+def _predicate(table: pa.Table, condition: Dict[str, Any]) -> pa.ChunkedArray:
+    column = _column(table, condition.get("column", ""))
+    op = str(condition.get("op", "=")).strip().lower()
+    value = condition.get("value")
+    if op in _COMPARISONS:
+        return _COMPARISONS[op](column, _scalar(value, column.type))
+    if op in ("in", "not in"):
+        values = value if isinstance(value, list) else [value]
+        mask = pc.is_in(column, value_set=pa.array([_scalar(v, column.type).as_py() for v in values], type=column.type))
+        return pc.invert(mask) if op == "not in" else mask
+    if op in ("contains", "startswith", "endswith"):
+        text = pc.cast(column, pa.string())
+        if op == "contains":
+            return pc.match_substring(text, str(value), ignore_case=True)
+        if op == "startswith":
+            return pc.starts_with(text, str(value), ignore_case=True)
+        return pc.ends_with(text, str(value), ignore_case=True)
+    if op == "is_null":
+        return pc.is_null(column)
+    if op == "not_null":
+        return pc.is_valid(column)
+    raise QueryError(
+        f"Unknown operator '{op}'. Use one of {', '.join(list(_COMPARISONS) + ['in', 'not in', 'contains', 'startswith', 'endswith', 'is_null', 'not_null'])}"
+    )
+
+
+def _aggregations(table: pa.Table, aggregates: Dict[str, Union[str, List[str]]]) -> List[Tuple[str, str]]:
+    specs = []
+    for column, funcs in aggregates.items():
+        if column != "*":
+            _column(table, column)
+        for func in [funcs] if isinstance(funcs, str) else funcs:
+            func = func.strip().lower()
+            if func not in AGGREGATE_FUNCTIONS:
+                raise QueryError(f"Unknown aggregate '{func}'. Use one of {', '.join(AGGREGATE_FUNCTIONS)}")
+            if column == "*":
+                if func != "count":
+                    raise QueryError("Only 'count' can be applied to '*'")
+                specs.append(([], "count_all"))
+            else:
+                specs.append((column, func))
+    return specs
+
+
+def run_query(
+    table: pa.Table,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[Dict[str, Any]]] = None,
+    group_by: Optional[List[str]] = None,
+    aggregates: Optional[Dict[str, Union[str, List[str]]]] = None,
+    order_by: Optional[List[str]] = None,
+    descending: bool = False,
+    limit: Optional[int] = None,
+    offset: int = 0,
+) -> Tuple[pa.Table, int]:
+    """Apply filters, grouping/aggregates, sorting and column selection.
+
+    Returns the requested page of rows and the total number of rows before
+    ``limit``/``offset`` were applied.
+    """
+    for condition in filters or []:
+        table = table.filter(_predicate(table, condition))
+
+    if aggregates or group_by:
+        keys = list(group_by or [])
+        for key in keys:
+            _column(table, key)
+        specs = _aggregations(table, aggregates or {"*": "count"})
+        if keys:
+            table = table.group_by(keys, use_threads=False).aggregate(specs)
+            # Arrow puts the keys last; show them first.
+            table = table.select(keys + [name for name in table.column_names if name not in keys])
+        else:
+            table = table.group_by([]).aggregate(specs)
+        table = table.rename_columns(["count" if name == "count_all" else name for name in table.column_names])
+
+    if order_by:
+        for key in order_by:
+            _column(table, key)
+        table = table.sort_by([(key, "descending" if descending else "ascending") for key in order_by])
+
+    if columns and not (aggregates or group_by):
+        for name in columns:
+            _column(table, name)
+        table = table.select(columns)
+
+    total = table.num_rows
+    offset = max(0, offset or 0)
+    if limit is not None:
+        table = table.slice(offset, max(0, limit))
+    elif offset:
+        table = table.slice(offset)
+    return table, total
+
+
+def to_csv(table: pa.Table) -> str:
+    buffer = io.BytesIO()
+    pa_csv.write_csv(table, buffer)
+    return buffer.getvalue().decode("utf-8")